@@ -0,0 +1,63 @@
+import hmac
+from collections.abc import AsyncIterator
+from datetime import datetime, timezone
+
+from aiogram.utils.web_app import safe_parse_webapp_init_data
+from fastapi import Depends, Header, HTTPException
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.db.models import User
+from app.db.session import get_async_session, get_read_session
+
+async def db_session() -> AsyncIterator[AsyncSession]:
+    async with get_async_session() as session:
+        yield session
+
+async def read_db_session(user_id: int | None = None) -> AsyncIterator[AsyncSession]:
+    """Только чтение: реплика, если настроена (user_id — из пути, для read-your-writes)."""
+    async with get_read_session(user_id) as session:
+        yield session
+
+def _webapp_tg_id(init_data: str) -> int:
+    if not settings.BOT_TOKEN:
+        raise HTTPException(status_code=401, detail="webapp auth is not configured")
+    try:
+        data = safe_parse_webapp_init_data(settings.BOT_TOKEN, init_data)
+    except ValueError:
+        raise HTTPException(status_code=401, detail="invalid init data") from None
+    auth_date = data.auth_date
+    if auth_date.tzinfo is None:
+        auth_date = auth_date.replace(tzinfo=timezone.utc)
+    age = (datetime.now(timezone.utc) - auth_date).total_seconds()
+    if data.user is None or age > settings.WEBAPP_AUTH_MAX_AGE_SEC:
+        raise HTTPException(status_code=401, detail="expired init data")
+    return data.user.id
+
+async def authorize_user(
+    user_id: int,
+    authorization: str | None = Header(default=None),
+    session: AsyncSession = Depends(read_db_session),
+) -> None:
+    """
+    Доступ к данным пользователя user_id (users.id):
+    - `Authorization: Bearer <API_TOKEN>` — сервисный токен, любой пользователь;
+    - `Authorization: tma <initData>` — Telegram Mini App: подпись initData
+      проверяется токеном бота, читать можно только свои данные.
+    """
+    scheme, _, credentials = (authorization or "").partition(" ")
+    scheme = scheme.lower()
+    if scheme == "bearer" and settings.API_TOKEN:
+        if hmac.compare_digest(credentials.encode(), settings.API_TOKEN.encode()):
+            return
+        raise HTTPException(status_code=401, detail="invalid token")
+    if scheme == "tma":
+        tg_id = _webapp_tg_id(credentials)
+        owner = (await session.exec(select(User.id).where(User.tg_id == tg_id))).first()
+        if owner != user_id:
+            raise HTTPException(status_code=403, detail="not your data")
+        return
+    raise HTTPException(
+        status_code=401, detail="authorization required", headers={"WWW-Authenticate": "Bearer"}
+    )
@@ -1,12 +1,87 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from collections.abc import AsyncIterator
+
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
 from time import time
 
-app = FastAPI(title="Telegram Gym Coach Bot API", version="0.1.0")
+from app.api.deps import authorize_user, read_db_session
+from app.api.metrics import HttpMetricsMiddleware
+from app.core.config import settings
+from app.core.metrics import CONTENT_TYPE, metrics
+from app.services.journal import MAX_PAGE_SIZE, PAGE_SIZE, fetch_page
+from app.telegram.webhook import WebhookFeeder
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    app.state.webhook = None
+    if settings.WEBHOOK_URL:
+        from app.telegram.bot import build_bot, build_dispatcher
+
+        assert settings.WEBHOOK_SECRET  # проверено в Settings
+        feeder = WebhookFeeder(
+            build_bot(), build_dispatcher(),
+            secret=settings.WEBHOOK_SECRET, max_in_flight=settings.UPDATES_MAX_IN_FLIGHT,
+        )
+        await feeder.setup(settings.WEBHOOK_URL.rstrip("/") + settings.WEBHOOK_PATH)
+        app.state.webhook = feeder
+    try:
+        yield
+    finally:
+        if app.state.webhook is not None:
+            await app.state.webhook.shutdown()
+
+app = FastAPI(title="Telegram Gym Coach Bot API", version="0.1.0", lifespan=lifespan)
+app.add_middleware(HttpMetricsMiddleware)
 
 @app.get("/healthz")
 def healthz() -> dict:
     return {"status": "ok", "ts": time()}
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics() -> Response:
+    # async — рендер в event loop, рядом с теми, кто пишет метрики (не из тредпула)
+    # в webhook-режиме здесь же и метрики бота: dispatcher живёт в этом процессе
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
+
 @app.get("/")
 def root() -> dict:
-    return {"app": "telegram-gym-coach-bot", "ok": True}
\ No newline at end of file
+    return {"app": "telegram-gym-coach-bot", "ok": True}
+
+@app.get("/users/{user_id}/journal", dependencies=[Depends(authorize_user)])
+async def user_journal(
+    user_id: int,
+    cursor: str | None = None,
+    limit: int = Query(default=PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    session: AsyncSession = Depends(read_db_session),
+) -> dict:
+    try:
+        page = await fetch_page(session, user_id, cursor=cursor, limit=limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid cursor") from None
+    return {
+        "sessions": [
+            {
+                "session_id": g.session_id,
+                "started_at": g.started_at,
+                "sets": [st._asdict() for st in g.sets],
+            }
+            for g in page.sessions
+        ],
+        "next_cursor": page.next_cursor,
+    }
+
+@app.post(settings.WEBHOOK_PATH, include_in_schema=False)
+async def telegram_webhook(
+    request: Request,
+    x_telegram_bot_api_secret_token: str | None = Header(default=None),
+) -> dict:
+    feeder: WebhookFeeder | None = getattr(request.app.state, "webhook", None)
+    if feeder is None:
+        raise HTTPException(status_code=404, detail="webhook mode is disabled")
+    if not feeder.check_secret(x_telegram_bot_api_secret_token):
+        raise HTTPException(status_code=403, detail="invalid secret token")
+
+    # хендлеры крутятся фоном — Telegram получает 200 сразу (если не упёрлись в лимит)
+    await feeder.feed(await request.json())
+    return {"ok": True}
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from app.core.metrics import metrics
+
+HTTP_SECONDS = metrics.histogram(
+    "http_request_seconds", "API request latency", ("method", "route", "status")
+)
+
+Scope = dict[str, Any]
+Message = dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
+
+class HttpMetricsMiddleware:
+    """
+    Чистый ASGI (без BaseHTTPMiddleware и лишней задачи на запрос): латентность по
+    шаблону маршрута (/users/{user_id}/journal), а не по конкретному пути.
+    """
+
+    def __init__(self, app: Callable[[Scope, Receive, Send], Awaitable[None]]) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            HTTP_SECONDS.labels(
+                scope["method"], getattr(route, "path", "unmatched"), status
+            ).observe(time.perf_counter() - t0)
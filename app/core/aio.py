@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+import asyncio
+
+
+async def sleep_or_wakeup(event: asyncio.Event, timeout: float | None) -> None:
+    """
+    Спать до timeout (None — без срока) или до event.set(), что раньше.
+    Событие сбрасывается перед ожиданием: set() до вызова не будит.
+    Не wait_for: на 3.11 он теряет cancel(), если событие пришло одновременно.
+    """
+    event.clear()
+    timer = None if timeout is None else asyncio.get_running_loop().call_later(timeout, event.set)
+    try:
+        await event.wait()
+    finally:
+        if timer is not None:
+            timer.cancel()
@@ -1,3 +1,4 @@
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -7,13 +8,110 @@ class Settings(BaseSettings):
     DEBUG: bool = True
 
     BOT_TOKEN: str | None = None
+    # webhook-режим: WEBHOOK_URL — публичный адрес API (без пути); апдейты
+    # принимает FastAPI (app.api.main) на WEBHOOK_PATH; WEBHOOK_SECRET обязателен —
+    # без него любой, кто знает адрес, может слать боту поддельные апдейты
+    WEBHOOK_URL: str | None = None
+    WEBHOOK_PATH: str = "/telegram/webhook"
+    WEBHOOK_SECRET: str | None = None
+
+    # доступ к /users/{id}/...: сервисный токен (Bearer) или initData Telegram Mini App (tma);
+    # initData старше MAX_AGE не принимаем
+    API_TOKEN: str | None = None
+    WEBAPP_AUTH_MAX_AGE_SEC: int = 86_400
+
+    # /metrics в polling-режиме (в webhook-режиме метрики отдаёт API); 0 — выключено
+    METRICS_PORT: int = 0
 
     DATABASE_URL: str | None = None
+    # реплика для только-читающей работы (журнал, выгрузки); пусто — всё на primary
+    DATABASE_REPLICA_URL: str | None = None
+    # пользователя, писавшего меньше STICKY_SEC назад, читаем с primary (лаг репликации);
+    # отметки записей — в памяти процесса, между процессами (бот и API) не передаются
+    DB_REPLICA_STICKY_SEC: float = 5.0
+    # пул на процесс (и на реплику — такой же): size + overflow <= max_connections / процессов
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SEC: float = 10
+    DB_POOL_RECYCLE_SEC: int = 1800
+    # проверка соединения при выдаче из пула: always (каждый checkout, +round-trip) |
+    # idle (только пролежавшие дольше PRE_PING_IDLE_SEC) | off
+    DB_PRE_PING: str = "idle"
+    DB_PRE_PING_IDLE_SEC: float = 30
     REDIS_URL: str | None = None
     S3_ENDPOINT: str | None = None
     S3_BUCKET: str | None = None
     S3_REGION: str | None = None
     S3_ACCESS_KEY_ID: str | None = None
     S3_SECRET_ACCESS_KEY: str | None = None
+    # выгрузка данных (/privacy): локальная папка, если S3_BUCKET не задан
+    EXPORT_DIR: str = "/tmp/gymcoach-exports"
+    EXPORT_CHUNK_ROWS: int = 5000
+
+    # кэш профилей: локальный TTL держим коротким (реплики не шлют друг другу инвалидации)
+    USER_CACHE_MAXSIZE: int = 10_000
+    USER_CACHE_LOCAL_TTL_SEC: int = 60
+    USER_CACHE_REDIS_TTL_SEC: int = 600
+
+    # активные планы в памяти; версия (Plan.updated_at) перепроверяется не чаще раза в TRUST_SEC
+    PLAN_CACHE_MAXSIZE: int = 10_000
+    PLAN_CACHE_TRUST_SEC: float = 2.0
+
+    # FSM в Redis: брошенный онбординг живёт сутки
+    FSM_KEY_PREFIX: str = "gymcoach:fsm"
+    FSM_STATE_TTL_SEC: int = 86_400
+    FSM_DATA_TTL_SEC: int = 86_400
+
+    # дедупликация апдейтов: окно id в процессе и TTL ключей в Redis
+    DEDUP_WINDOW: int = 10_000
+    DEDUP_TTL_SEC: int = 3600
+
+    # шардированные очереди апдейтов: порядок внутри пользователя, параллелизм между
+    SCHEDULER_SHARDS: int = 16
+    SCHEDULER_QUEUE_SIZE: int = 100
+    # апдейтов в обработке на процесс (polling и webhook): дальше приём ждёт
+    UPDATES_MAX_IN_FLIGHT: int = 1000
+
+    # буферизованная запись SetLog: размер пачки и максимальная задержка
+    SETLOG_BATCH_SIZE: int = 500
+    SETLOG_FLUSH_DELAY_SEC: float = 0.05
+    # set_logs в Postgres секционирована по месяцам: сколько месяцев вперёд держать созданными
+    SETLOG_PARTITIONS_AHEAD: int = 3
+    SETLOG_PARTITION_CHECK_SEC: float = 6 * 3600
+
+    # формула e1RM для личных рекордов: epley | brzycki
+    PR_FORMULA: str = "epley"
+    # лучший e1RM в памяти; рекорд перед записью всё равно сверяется с таблицей prs
+    PR_BEST_CACHE_TTL_SEC: float = 300
+    # цели /today считаются по сессиям не старше стольких недель (запрос не растёт с историей)
+    PROGRESSION_HISTORY_WEEKS: int = 12
+
+    # напоминания: в памяти держим только то, что сработает в ближайший horizon;
+    # пропущенные за простой дольше grace не досылаем
+    REMINDER_HORIZON_SEC: int = 3600
+    REMINDER_PAGE_SIZE: int = 1000
+    REMINDER_MISFIRE_GRACE_SEC: int = 900
+
+    # исходящие сообщения: лимиты Telegram ~30/с на бота и ~1/с в чат (с коротким запасом)
+    OUTBOUND_GLOBAL_RATE: float = 30
+    OUTBOUND_CHAT_RATE: float = 1.0
+    OUTBOUND_CHAT_BURST: float = 3
+    OUTBOUND_MAX_ATTEMPTS: int = 5
+
+    # идущие тренировки: таймеры отдыха — одно колесо на процесс (TICK_SEC x SLOTS);
+    # незавершённые тренировки старше MAX_AGE считаем брошенными
+    WORKOUT_REST_DEFAULT_SEC: int = 120
+    WORKOUT_TIMER_TICK_SEC: float = 1.0
+    WORKOUT_TIMER_SLOTS: int = 512
+    WORKOUT_SESSION_MAX_AGE_SEC: int = 6 * 3600
+
+    # каталог упражнений в памяти: как часто сверять отпечаток таблицы exercises
+    EXERCISE_CATALOG_REFRESH_SEC: float = 30
+
+    @model_validator(mode="after")
+    def _webhook_needs_secret(self) -> "Settings":
+        if self.WEBHOOK_URL and not self.WEBHOOK_SECRET:
+            raise ValueError("WEBHOOK_SECRET is required when WEBHOOK_URL is set")
+        return self
 
 settings = Settings()
\ No newline at end of file
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import logging
+import math
+import re
+from bisect import bisect_left
+from collections.abc import Callable, Iterator, Mapping, Sequence
+from typing import Any
+
+log = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# секунды: от запроса к БД по индексу до медленного хендлера
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# штуки: запросов к БД на апдейт и т.п.
+COUNT_BUCKETS = (0, 1, 2, 3, 4, 6, 8, 12, 16, 32, 64)
+
+_BAD_NAME = re.compile(r"[^a-zA-Z0-9_]")
+
+# stats() сервисов: {"hits": 1, ...} или {"main_kb": {"hits": 1, ...}, ...}
+StatsSource = Callable[[], Mapping[str, Any]]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _labels(names: Sequence[str], values: Sequence[Any]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values, strict=True)) + "}"
+
+
+def _num(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _Buckets:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        # только счётчик своей корзины; кумулятивные суммы — при выдаче
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Metric:
+    """
+    Метрика с метками. Дочерние значения по кортежу меток создаются один раз —
+    на горячем пути только dict.get и сложение, без блокировок (один event loop).
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:  # noqa: A002
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._children: dict[tuple[Any, ...], Any] = {}
+
+    def _new(self) -> Any:
+        return _Value()
+
+    def labels(self, *values: Any) -> Any:
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(f"{self.name}: expected labels {self.label_names}, got {values!r}")
+            child = self._children[values] = self._new()
+        return child
+
+    def samples(self) -> Iterator[str]:
+        for values, child in self._children.items():
+            yield f"{self.name}{_labels(self.label_names, values)} {_num(child.value)}"
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,  # noqa: A002
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new(self) -> _Buckets:
+        return _Buckets(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def samples(self) -> Iterator[str]:
+        names = (*self.label_names, "le")
+        for values, child in self._children.items():
+            total = 0
+            for bound, count in zip((*self.buckets, math.inf), child.counts, strict=True):
+                total += count
+                yield f"{self.name}_bucket{_labels(names, (*values, _num(bound)))} {total}"
+            labels = _labels(self.label_names, values)
+            yield f"{self.name}_sum{labels} {_num(child.sum)}"
+            yield f"{self.name}_count{labels} {total}"
+
+
+class Registry:
+    """
+    Метрики процесса в текстовом формате Prometheus. Помимо своих метрик —
+    stats() сервисов (кэши, очереди, шедулеры): читаются только при выдаче,
+    каждое числовое поле становится gauge <prefix>_<source>_<поле>.
+    """
+
+    def __init__(self, prefix: str = "gymcoach") -> None:
+        self.prefix = prefix
+        self._metrics: dict[str, Metric] = {}
+        self._stats: dict[str, StatsSource] = {}
+
+    def _add(self, cls: type[Metric], name: str, *args: Any, **kwargs: Any) -> Any:
+        full = f"{self.prefix}_{name}"
+        metric = self._metrics.get(full)
+        if metric is None:
+            metric = self._metrics[full] = cls(full, *args, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"metric {full} is already registered as {metric.kind}")
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:  # noqa: A002
+        return self._add(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:  # noqa: A002
+        return self._add(Gauge, name, help, labels)
+
+    def histogram(
+        self,
+        name: str,
+        help: str,  # noqa: A002
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._add(Histogram, name, help, labels, buckets=buckets)
+
+    def register_stats(self, source: str, stats: StatsSource) -> None:
+        self._stats[source] = stats
+
+    def _stat(
+        self, out: dict[str, list[str]], source: str, field: str, value: Any, key: str | None
+    ) -> None:
+        if isinstance(value, bool):
+            value = int(value)
+        if not isinstance(value, (int, float)):
+            return
+        name = _BAD_NAME.sub("_", f"{self.prefix}_{source}_{field}")
+        labels = _labels(("key",), (key,)) if key is not None else ""
+        out.setdefault(name, []).append(f"{name}{labels} {_num(value)}")
+
+    def _stats_samples(self) -> dict[str, list[str]]:
+        out: dict[str, list[str]] = {}
+        for source, stats in self._stats.items():
+            try:
+                data = stats()
+            except Exception:
+                log.exception("metrics: stats source %r failed", source)
+                continue
+            for key, value in data.items():
+                # вложенный словарь — по объекту на ключ, ключ уходит в метку
+                if isinstance(value, Mapping):
+                    for field, v in value.items():
+                        self._stat(out, source, field, v, key)
+                else:
+                    self._stat(out, source, key, value, None)
+        return out
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        for name, samples in self._stats_samples().items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+metrics = Registry()
+
+
+async def serve_metrics(port: int, host: str = "0.0.0.0") -> Any:
+    """/metrics для процесса без API (polling): aiohttp уже есть в зависимостях aiogram."""
+    from aiohttp import web
+
+    async def handle(_: web.Request) -> web.Response:
+        return web.Response(body=metrics.render().encode(), headers={"Content-Type": CONTENT_TYPE})
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
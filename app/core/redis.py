@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from typing import Any
+
+from app.core.config import settings
+
+_clients: dict[str, Any] = {}
+
+
+def get_redis(url: str | None = None) -> Any:
+    """
+    Общий (на процесс) async-клиент Redis для кэшей/дедупликации.
+    None, если Redis не сконфигурирован — вызывающий код работает без L2.
+    """
+    url = url if url is not None else settings.REDIS_URL
+    if not url:
+        return None
+    client = _clients.get(url)
+    if client is None:
+        from redis.asyncio import Redis
+
+        client = _clients[url] = Redis.from_url(url)
+    return client
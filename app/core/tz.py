@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+UTC = ZoneInfo("UTC")
+
+
+@lru_cache(maxsize=1024)
+def zone(tz: str | None) -> ZoneInfo:
+    """ZoneInfo по IANA-имени; в онбординге TZ вводится руками — кривые значения считаем UTC."""
+    try:
+        return ZoneInfo(tz or "UTC")
+    except (ZoneInfoNotFoundError, ValueError):
+        return UTC
+
+
+def to_local(ts: datetime, tz: str | None) -> datetime:
+    """naive UTC (как хранится в БД) -> aware datetime в TZ пользователя."""
+    return ts.replace(tzinfo=timezone.utc).astimezone(zone(tz))
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from typing import Any
+
+from sqlalchemy import Table
+
+
+def upsert(dialect: str, table: Table) -> Any:
+    """
+    INSERT с поддержкой .on_conflict_do_update() для текущего диалекта.
+    Прод — PostgreSQL; SQLite — для тестов/бенчей (синтаксис ON CONFLICT тот же).
+    """
+    if dialect == "postgresql":
+        from sqlalchemy.dialects import postgresql
+
+        return postgresql.insert(table)
+    if dialect == "sqlite":
+        from sqlalchemy.dialects import sqlite
+
+        return sqlite.insert(table)
+    raise NotImplementedError(f"upsert is not supported for {dialect!r}")
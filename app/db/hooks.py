@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import logging
+from collections.abc import Callable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+log = logging.getLogger(__name__)
+
+# session.info: колбэки, ждущие commit сессии
+_AFTER_COMMIT = "after_commit_callbacks"
+
+
+def after_commit(session: AsyncSession | Session, callback: Callable[[], None]) -> None:
+    """
+    Выполнить callback после commit сессии, при откате — забыть. Для состояния
+    в памяти процесса (кэши, куча напоминаний): оно должно меняться только вслед
+    за тем, что действительно записано в БД.
+    """
+    session.info.setdefault(_AFTER_COMMIT, []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit(session: Session) -> None:
+    for callback in session.info.pop(_AFTER_COMMIT, ()):
+        # данные уже закоммичены — ошибка колбэка не должна выглядеть как ошибка commit
+        try:
+            callback()
+        except Exception:
+            log.exception("after-commit callback %r failed", callback)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_after_commit(session: Session) -> None:
+    session.info.pop(_AFTER_COMMIT, None)
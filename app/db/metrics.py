@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import time
+from contextvars import ContextVar
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.metrics import metrics
+
+QUERIES = metrics.counter("db_queries_total", "SQL statements executed", ("op",))
+QUERY_SECONDS = metrics.histogram("db_query_seconds", "SQL statement execution time")
+CHECKOUT_SECONDS = metrics.histogram(
+    "db_pool_checkout_seconds", "Wait for a pooled connection (incl. connect)"
+)
+
+
+class QueryUsage:
+    """Запросы и время в БД внутри одного апдейта (см. UpdateMetricsMiddleware)."""
+
+    __slots__ = ("queries", "seconds", "writes")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.seconds = 0.0
+        # INSERT/UPDATE/DELETE — по ним DbSessionMiddleware отмечает запись для ReadRouter
+        self.writes = 0
+
+
+_OPS = frozenset(("SELECT", "INSERT", "UPDATE", "DELETE", "WITH"))
+_WRITE_OPS = frozenset(("INSERT", "UPDATE", "DELETE"))
+
+# async-движок выполняет sync-события в greenlet'е с контекстом вызывающей задачи,
+# поэтому значение, выставленное в middleware, видно в хуках ниже
+query_usage: ContextVar[QueryUsage | None] = ContextVar("query_usage", default=None)
+
+
+def _before(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+) -> None:
+    conn.info.setdefault("query_t0", []).append(time.perf_counter())
+
+
+def _after(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+) -> None:
+    elapsed = time.perf_counter() - conn.info["query_t0"].pop()
+    head = statement.lstrip()[:7].split(None, 1)
+    op = head[0].upper() if head else ""
+    QUERIES.labels(op if op in _OPS else "OTHER").inc()
+    QUERY_SECONDS.observe(elapsed)
+    usage = query_usage.get()
+    if usage is not None:
+        usage.queries += 1
+        usage.seconds += elapsed
+        if op in _WRITE_OPS:
+            usage.writes += 1
+
+
+def _on_error(context: Any) -> None:
+    # упавший запрос не дошёл до after_cursor_execute — снимаем его отметку
+    stack = context.connection.info.get("query_t0") if context.connection is not None else None
+    if stack:
+        stack.pop()
+
+
+def _pool_stats(pool: Any) -> dict[str, int]:
+    # размер/занятость есть у QueuePool; у Static/Null пулов их нет
+    return {
+        name: getattr(pool, name)()
+        for name in ("size", "checkedout", "overflow", "checkedin")
+        if callable(getattr(pool, name, None))
+    }
+
+
+def instrument_engine(engine: Engine, name: str = "db") -> None:
+    """
+    Хуки SQLAlchemy: число и время запросов (всего и на апдейт), ожидание соединения
+    из пула. Для async-движка передавать engine.sync_engine. Повторный вызов — no-op.
+    """
+    if event.contains(engine, "before_cursor_execute", _before):
+        return
+    event.listen(engine, "before_cursor_execute", _before)
+    event.listen(engine, "after_cursor_execute", _after)
+    event.listen(engine, "handle_error", _on_error)
+
+    # у пула нет события «начал ждать»: оборачиваем получение соединения
+    pool = engine.pool
+    do_get = pool._do_get
+
+    def timed_do_get() -> Any:
+        t0 = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            CHECKOUT_SECONDS.observe(time.perf_counter() - t0)
+
+    pool._do_get = timed_do_get  # type: ignore[method-assign]
+    metrics.register_stats(f"{name}_pool", lambda: _pool_stats(pool))
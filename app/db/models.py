@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from datetime import datetime, date
+from datetime import datetime, date as date_type
 from typing import Optional, Any
 
 from sqlalchemy import (
@@ -63,7 +63,7 @@ class Plan(Timestamped, SQLModel, table=True):
     user_id: int = Field(
         sa_column=Column(
             Integer,
-            ForeignKey("users.id"),  # добавим ON DELETE CASCADE в миграции
+            ForeignKey("users.id", ondelete="CASCADE"),
             nullable=False,
             index=True,
         )
@@ -73,7 +73,7 @@ class Plan(Timestamped, SQLModel, table=True):
     split_type: Optional[str] = Field(default=None)  # full-body / PPL / ...
     state: str = Field(default="active")             # active / archived / draft
 
-    user: "User" = Relationship()
+    user: User = Relationship()
 
 
 class WorkoutDay(SQLModel, table=True):
@@ -83,7 +83,7 @@ class WorkoutDay(SQLModel, table=True):
     plan_id: int = Field(
         sa_column=Column(
             Integer,
-            ForeignKey("plans.id"),  # ON DELETE CASCADE в миграции
+            ForeignKey("plans.id", ondelete="CASCADE"),
             nullable=False,
             index=True,
         )
@@ -102,7 +102,7 @@ class WorkoutItem(SQLModel, table=True):
     day_id: int = Field(
         sa_column=Column(
             Integer,
-            ForeignKey("workout_days.id"),  # ON DELETE CASCADE в миграции
+            ForeignKey("workout_days.id", ondelete="CASCADE"),
             nullable=False,
             index=True,
         )
@@ -148,7 +148,7 @@ class WorkoutSession(Timestamped, SQLModel, table=True):
     user_id: int = Field(
         sa_column=Column(
             Integer,
-            ForeignKey("users.id"),  # ON DELETE CASCADE в миграции
+            ForeignKey("users.id", ondelete="CASCADE"),
             nullable=False,
             index=True,
         )
@@ -165,6 +165,12 @@ class WorkoutSession(Timestamped, SQLModel, table=True):
         ),
     )
     notes: Optional[str] = Field(default=None)
+    # итог тренировки — пишется при завершении (app.services.workout_runtime)
+    sets_count: Optional[int] = Field(default=None)
+    tonnage_kg: Optional[float] = Field(
+        default=None,
+        sa_column=Column(Numeric(10, 2), nullable=True)
+    )
 
     # user: User = Relationship(back_populates="sessions")
 
@@ -179,7 +185,7 @@ class SetLog(SQLModel, table=True):
     user_id: int = Field(
         sa_column=Column(
             Integer,
-            ForeignKey("users.id"),  # ON DELETE CASCADE в миграции
+            ForeignKey("users.id", ondelete="CASCADE"),
             nullable=False,
             index=True,
         )
@@ -187,7 +193,7 @@ class SetLog(SQLModel, table=True):
     session_id: int = Field(
         sa_column=Column(
             Integer,
-            ForeignKey("workout_sessions.id"),  # ON DELETE CASCADE в миграции
+            ForeignKey("workout_sessions.id", ondelete="CASCADE"),
             nullable=False,
             index=True,
         )
@@ -218,10 +224,18 @@ class SetLog(SQLModel, table=True):
     rpe: Optional[float] = Field(default=None)  # шкала 1..10
     rest_sec: Optional[int] = Field(default=None)
     notes: Optional[str] = Field(default=None)
+    # неделя (понедельник по User.tz на момент записи), в которую сет попал в
+    # weekly_muscle_volume; правка сета вычитает его именно отсюда, даже если TZ сменилась
+    week_start: Optional[date_type] = Field(default=None)
 
     __table_args__ = (
         Index("ix_set_logs_user_session", "user_id", "session_id"),
         Index("ix_set_logs_user_ex_date", "user_id", "workout_item_id", "ts"),
+        # keyset-пагинация журнала: WHERE user_id = ? AND (ts, id) < (?, ?) ORDER BY ts DESC, id DESC
+        Index("ix_set_logs_user_ts_id", "user_id", "ts", "id"),
+        # сканы по времени (rollups, бэкфиллы); в Postgres таблица секционирована
+        # по месяцам ts и PK там (id, ts) — см. migrations/versions/0003
+        Index("ix_set_logs_ts_brin", "ts", postgresql_using="brin", postgresql_with={"pages_per_range": 32}),
         CheckConstraint("reps >= 0", name="ck_setlog_reps"),
         CheckConstraint("weight_kg >= 0", name="ck_setlog_weight_nonneg"),
         CheckConstraint("(rpe IS NULL) OR (rpe >= 0 AND rpe <= 10)", name="ck_setlog_rpe_0_10"),
@@ -238,7 +252,7 @@ class PR(SQLModel, table=True):
     user_id: int = Field(
         sa_column=Column(
             Integer,
-            ForeignKey("users.id"),  # ON DELETE CASCADE в миграции
+            ForeignKey("users.id", ondelete="CASCADE"),
             nullable=False,
             index=True,
         )
@@ -255,8 +269,72 @@ class PR(SQLModel, table=True):
         default=0.0,
         sa_column=Column(Numeric(7, 2), nullable=False, server_default="0")
     )
-    date: date = Field(index=True)
+    date: date_type = Field(index=True)
 
     __table_args__ = (
         UniqueConstraint("user_id", "exercise_id", "date", name="uq_pr_user_exercise_date"),
-    )
\ No newline at end of file
+    )
+
+# --- Агрегаты (rollup'ы) -----------------------------------------------------
+
+class WeeklyMuscleVolume(SQLModel, table=True):
+    """
+    Объём за ISO-неделю (в TZ пользователя) по группе мышц.
+    Поддерживается инкрементально при записи/правке SetLog (app/services/rollups.py).
+    """
+    __tablename__ = "weekly_muscle_volume"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(
+        sa_column=Column(
+            Integer,
+            ForeignKey("users.id", ondelete="CASCADE"),
+            nullable=False,
+        )
+    )
+    week_start: date_type = Field(description="Monday of the ISO week in User.tz")
+    muscle: str = Field(default="", description="'' — сеты без упражнения/группы")
+
+    sets: int = Field(default=0)
+    reps: int = Field(default=0)
+    tonnage_kg: float = Field(
+        default=0.0,
+        sa_column=Column(Numeric(14, 2), nullable=False, server_default="0")
+    )
+
+    __table_args__ = (
+        # покрывает и точечное чтение (user, week, muscle), и «вся неделя» (user, week)
+        UniqueConstraint("user_id", "week_start", "muscle", name="uq_weekly_volume_user_week_muscle"),
+    )
+
+
+# --- Напоминания -------------------------------------------------------------
+
+class Reminder(Timestamped, SQLModel, table=True):
+    """
+    Расписание напоминаний пользователя: дни недели + время по его часам (User.tz).
+    next_fire_at (naive UTC) считает и сдвигает app/services/reminders.py — по нему
+    шедулер постранично подгружает ближайшие срабатывания и переживает рестарты.
+    """
+    __tablename__ = "reminders"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(
+        sa_column=Column(
+            Integer,
+            ForeignKey("users.id", ondelete="CASCADE"),
+            nullable=False,
+            unique=True,
+        )
+    )
+    weekdays: int = Field(default=0, description="bitmask: bit 0 = Monday ... bit 6 = Sunday")
+    minute_of_day: int = Field(default=0, description="local wall time, 0..1439")
+    enabled: bool = Field(default=True)
+    next_fire_at: Optional[datetime] = Field(default=None, description="naive UTC")
+
+    __table_args__ = (
+        # окно «что сработает до T» читается range scan'ом: WHERE enabled AND (next_fire_at, id) > (?, ?)
+        Index("ix_reminders_enabled_next_fire", "enabled", "next_fire_at", "id"),
+        CheckConstraint("minute_of_day >= 0 AND minute_of_day < 1440", name="ck_reminder_minute"),
+        CheckConstraint("weekdays >= 0 AND weekdays < 128", name="ck_reminder_weekdays"),
+    )
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import time
+from typing import Any
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine, make_url
+
+from app.core.metrics import metrics
+
+PINGS = metrics.counter("db_pings_total", "Liveness pings on pool checkout", ("result",))
+
+PRE_PING_MODES = ("always", "idle", "off")
+
+
+def engine_options(
+    url: str,
+    *,
+    pool_size: int,
+    max_overflow: int,
+    pool_timeout: float,
+    pool_recycle: int,
+    pre_ping: str,
+) -> dict[str, Any]:
+    """
+    Аргументы create_(async_)engine для пула. Размеры — только для серверных БД:
+    SQLite в памяти живёт на StaticPool, которому они не положены.
+    """
+    if pre_ping not in PRE_PING_MODES:
+        raise ValueError(f"unknown pre-ping mode: {pre_ping!r} (expected one of {PRE_PING_MODES})")
+    options: dict[str, Any] = {"echo": False, "pool_pre_ping": pre_ping == "always"}
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+        )
+    return options
+
+
+def install_idle_ping(engine: Engine, idle_sec: float) -> None:
+    """
+    Пинг только соединений, пролежавших в пуле дольше idle_sec: под нагрузкой
+    соединения возвращаются через миллисекунды, и pool_pre_ping добавлял бы
+    round-trip к каждому апдейту. Мёртвое соединение (рестарт/failover БД,
+    idle-timeout pgbouncer) пул выбрасывает и берёт новое — как при pre_ping.
+    Для async-движка передавать engine.sync_engine.
+    """
+
+    def on_checkin(dbapi_connection: Any, record: Any) -> None:
+        record.info["checkin_at"] = time.monotonic()
+
+    def on_checkout(dbapi_connection: Any, record: Any, proxy: Any) -> None:
+        # свежее соединение (checkin ещё не было) только что прошло connect
+        checkin_at = record.info.get("checkin_at")
+        if checkin_at is None or time.monotonic() - checkin_at < idle_sec:
+            return
+        try:
+            engine.dialect.do_ping(dbapi_connection)
+        except Exception as e:
+            PINGS.labels("dead").inc()
+            # DisconnectionError: пул инвалидирует соединение и повторит checkout
+            raise exc.DisconnectionError("stale pooled connection") from e
+        PINGS.labels("ok").inc()
+
+    event.listen(engine, "checkin", on_checkin)
+    event.listen(engine, "checkout", on_checkout)
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import time
+from collections.abc import Callable
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+SessionFactory = Callable[[], AsyncSession]
+
+
+class ReadRouter:
+    """
+    Куда отправлять чтения. Только-читающая работа (журнал, выгрузки, аналитика)
+    идёт на реплику, если она настроена. Исключение — пользователь, который писал
+    меньше sticky_sec назад: его читаем с primary (read-your-writes), иначе из-за
+    лага репликации /log сразу после сета показал бы журнал без него.
+    Запись — всегда primary (async_session_factory), роутер её не касается.
+
+    Отметки записей живут в памяти процесса: read-your-writes гарантирован только
+    для чтений в том же процессе, что и запись (бот). Другой процесс (API, второй
+    инстанс бота) о свежей записи не знает и может прочитать с реплики данные
+    с отставанием до лага репликации.
+    """
+
+    def __init__(
+        self,
+        primary: SessionFactory,
+        replica: SessionFactory | None = None,
+        sticky_sec: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._primary = primary
+        self._replica = replica
+        self.sticky_sec = sticky_sec
+        self._clock = clock
+        # user_id -> время последней записи; порядок вставки = порядок по времени
+        self._writes: dict[int, float] = {}
+        self.replica_reads = 0
+        self.sticky_reads = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._replica is not None
+
+    def mark_write(self, user_id: int) -> None:
+        if self._replica is None:
+            return
+        now = self._clock()
+        self._writes.pop(user_id, None)
+        self._writes[user_id] = now
+        # протухшие отметки — с начала словаря, амортизированно O(1)
+        while self._writes:
+            oldest = next(iter(self._writes))
+            if now - self._writes[oldest] < self.sticky_sec:
+                break
+            del self._writes[oldest]
+
+    def use_replica(self, user_id: int | None = None) -> bool:
+        if self._replica is None:
+            return False
+        if user_id is not None:
+            at = self._writes.get(user_id)
+            if at is not None and self._clock() - at < self.sticky_sec:
+                self.sticky_reads += 1
+                return False
+        self.replica_reads += 1
+        return True
+
+    def session(self, user_id: int | None = None) -> AsyncSession:
+        """Сессия для чтения данных пользователя user_id (None — не пользовательские данные)."""
+        if self.use_replica(user_id):
+            assert self._replica is not None
+            return self._replica()
+        return self._primary()
+
+    def replica_session(self) -> AsyncSession:
+        if self._replica is None:
+            raise RuntimeError("read replica is not configured")
+        return self._replica()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "replica": int(self.enabled),
+            "replica_reads": self.replica_reads,
+            "sticky_reads": self.sticky_reads,
+            "sticky_users": len(self._writes),
+        }
@@ -0,0 +1,171 @@
+# app/services/analytics.py
+from __future__ import annotations
+
+from datetime import datetime
+from typing import NamedTuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlmodel import col
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db.models import Exercise, SetLog, WorkoutItem
+from app.services.pr_engine import MAX_REPS_FOR_E1RM
+
+NO_EXERCISE = -1
+NO_MUSCLE = ""
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class SetColumns(NamedTuple):
+    """
+    История сетов пользователя в колоночном виде (по массиву на поле).
+    muscle — коды в `muscles` (категориальное кодирование), NaN в rpe — «не указан».
+    """
+
+    ts: np.ndarray            # datetime64[s]
+    weight: np.ndarray        # float64
+    reps: np.ndarray          # int64
+    rpe: np.ndarray           # float64
+    exercise_id: np.ndarray   # int64, NO_EXERCISE для ad-hoc сетов
+    muscle: np.ndarray        # int64 — индекс в muscles
+    muscles: np.ndarray       # object: названия групп мышц
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+
+SetRow = tuple[datetime, float, int, float | None, int | None, str | None]
+
+
+def to_columns(rows: list[SetRow]) -> SetColumns:
+    """Строки (ts, weight, reps, rpe, exercise_id, muscle) -> SetColumns."""
+    if not rows:
+        empty_f = np.empty(0, dtype=np.float64)
+        empty_i = np.empty(0, dtype=np.int64)
+        return SetColumns(
+            np.empty(0, dtype="datetime64[s]"), empty_f, empty_i, empty_f, empty_i, empty_i,
+            np.empty(0, dtype=object),
+        )
+    n = len(rows)
+    ts, weight, reps, rpe, ex_id, muscle = zip(*rows, strict=True)
+    # np.array(datetime-список) конвертирует поштучно и медленно — считаем секунды сами
+    seconds = np.fromiter(((t - _EPOCH).total_seconds() for t in ts), dtype=np.float64, count=n)
+    codes: dict[str, int] = {}
+    muscle_codes = np.fromiter(
+        (codes.setdefault(m or NO_MUSCLE, len(codes)) for m in muscle), dtype=np.int64, count=n
+    )
+    ex = np.array(ex_id, dtype=np.float64)  # None -> NaN
+    return SetColumns(
+        ts=seconds.astype("datetime64[s]"),
+        weight=np.array(weight, dtype=np.float64),
+        reps=np.array(reps, dtype=np.int64),
+        rpe=np.array(rpe, dtype=np.float64),
+        exercise_id=np.where(np.isnan(ex), NO_EXERCISE, ex).astype(np.int64),
+        muscle=muscle_codes,
+        muscles=np.array(list(codes), dtype=object),
+    )
+
+
+async def load_user_sets(
+    session: AsyncSession, user_id: int, since: datetime | None = None
+) -> SetColumns:
+    """
+    Все сеты пользователя одним запросом: set_logs ⟕ workout_items ⟕ exercises.
+    Только чтение — сессию лучше брать из get_read_session(user_id) (реплика).
+    """
+    stmt = (
+        select(
+            col(SetLog.ts), col(SetLog.weight_kg), col(SetLog.reps), col(SetLog.rpe),
+            col(WorkoutItem.exercise_id), col(Exercise.muscle),
+        )
+        .select_from(SetLog)
+        .outerjoin(WorkoutItem, col(WorkoutItem.id) == col(SetLog.workout_item_id))
+        .outerjoin(Exercise, col(Exercise.id) == col(WorkoutItem.exercise_id))
+        .where(col(SetLog.user_id) == user_id)
+        .order_by(col(SetLog.ts))
+    )
+    if since is not None:
+        stmt = stmt.where(col(SetLog.ts) >= since)
+    conn = await session.connection()
+    result = await conn.execute(stmt)
+    return to_columns([tuple(r) for r in result])
+
+
+# --------- метрики ----------
+
+def e1rm(cols: SetColumns, formula: str = "epley") -> np.ndarray:
+    """e1RM на каждый сет (0 там, где оценка не имеет смысла) — как estimate_1rm, но вектором."""
+    w, r = cols.weight, cols.reps.astype(np.float64)
+    valid = (w > 0) & (cols.reps >= 1) & (cols.reps <= MAX_REPS_FOR_E1RM)
+    if formula == "epley":
+        est = w * (1 + r / 30)
+    elif formula == "brzycki":
+        est = w * 36 / np.where(valid, 37 - r, 1)
+    else:
+        raise ValueError(f"unknown e1RM formula: {formula!r}")
+    est = np.where(cols.reps == 1, w, est)
+    return np.where(valid, np.round(est, 2), 0.0)
+
+
+def e1rm_trend(
+    cols: SetColumns, formula: str = "epley"
+) -> dict[int, tuple[np.ndarray, np.ndarray]]:
+    """exercise_id -> (дни, лучший e1RM за день)."""
+    est = e1rm(cols, formula)
+    mask = (cols.exercise_id != NO_EXERCISE) & (est > 0)
+    if not mask.any():
+        return {}
+    days = cols.ts[mask].astype("datetime64[D]").astype(np.int64)
+    # (упражнение, день) -> один int64-ключ: 1-D unique/сортировка на порядок быстрее axis=0
+    key = cols.exercise_id[mask] << 32 | (days - days.min())
+    uniq, inverse = np.unique(key, return_inverse=True)
+    best = np.zeros(len(uniq))
+    np.maximum.at(best, inverse, est[mask])
+
+    ex_ids = uniq >> 32
+    group_days = (uniq & 0xFFFFFFFF) + days.min()
+    bounds = np.flatnonzero(np.diff(ex_ids)) + 1  # uniq отсортирован -> упражнения подряд
+    return {
+        int(ex[0]): (d.astype("datetime64[D]"), b)
+        for ex, d, b in zip(
+            np.split(ex_ids, bounds), np.split(group_days, bounds), np.split(best, bounds),
+            strict=True,
+        )
+    }
+
+
+def week_start(ts: np.ndarray) -> np.ndarray:
+    """Понедельник ISO-недели для каждого datetime64 (1970-01-01 — четверг)."""
+    days = ts.astype("datetime64[D]").astype(np.int64)
+    return (days - (days + 3) % 7).astype("datetime64[D]")
+
+
+def weekly_tonnage(cols: SetColumns) -> tuple[np.ndarray, np.ndarray]:
+    """(понедельники недель, тоннаж кг) по возрастанию недели."""
+    if not len(cols):
+        return np.empty(0, dtype="datetime64[D]"), np.empty(0)
+    weeks, inverse = np.unique(week_start(cols.ts), return_inverse=True)
+    return weeks, np.bincount(inverse, weights=cols.weight * cols.reps, minlength=len(weeks))
+
+
+def muscle_volume(cols: SetColumns) -> dict[str, dict[str, float]]:
+    """Группа мышц -> {sets, reps, tonnage}. Ad-hoc сеты — под ключом ""."""
+    n = len(cols.muscles)
+    sets = np.bincount(cols.muscle, minlength=n)
+    reps = np.bincount(cols.muscle, weights=cols.reps, minlength=n)
+    tonnage = np.bincount(cols.muscle, weights=cols.weight * cols.reps, minlength=n)
+    return {
+        str(m): {"sets": int(sets[i]), "reps": int(reps[i]), "tonnage": float(tonnage[i])}
+        for i, m in enumerate(cols.muscles)
+    }
+
+
+def rpe_distribution(cols: SetColumns, step: float = 0.5) -> dict[float, int]:
+    """RPE (округлённый до step) -> число сетов; сеты без RPE не учитываются."""
+    rpe = cols.rpe[~np.isnan(cols.rpe)]
+    if not len(rpe):
+        return {}
+    buckets, counts = np.unique(np.round(rpe / step) * step, return_counts=True)
+    return {float(b): int(c) for b, c in zip(buckets, counts, strict=True)}
@@ -0,0 +1,333 @@
+# app/services/exercise_catalog.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Collection
+from itertools import chain
+from typing import Any, NamedTuple
+
+import numpy as np
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.aio import sleep_or_wakeup
+from app.core.config import settings
+from app.db.models import Exercise
+from app.db.session import async_session_factory
+
+log = logging.getLogger(__name__)
+
+# кириллица -> латиница: «жим лёжа» и «zhim lezha» попадают в один ключ
+_TRANSLIT = str.maketrans({
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e", "ж": "zh",
+    "з": "z", "и": "i", "й": "i", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o",
+    "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "h", "ц": "c",
+    "ч": "ch", "ш": "sh", "щ": "sch", "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu",
+    "я": "ya",
+})
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def canon(text: str) -> str:
+    """Ключ для поиска: нижний регистр, без пунктуации, транслитом в латиницу."""
+    return " ".join(_NON_WORD.sub(" ", text.lower()).translate(_TRANSLIT).split())
+
+
+def trigrams(key: str) -> set[str]:
+    # как в pg_trgm: каждое слово дополняется «  » слева и « » справа
+    out: set[str] = set()
+    for word in key.split():
+        padded = f"  {word} "
+        out.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return out
+
+
+class ExerciseRef(NamedTuple):
+    id: int
+    name: str
+    muscle: str | None
+    equipment: str | None
+
+
+class _Index:
+    """
+    Неизменяемый снимок каталога; при перезагрузке строится новый и подменяется целиком.
+    Позиции упражнений — индексы в items; списки вхождений и маски — numpy-массивы,
+    поэтому подсчёт и ранжирование идут векторно, без цикла по кандидатам.
+    """
+
+    __slots__ = (
+        "items", "by_id", "name_len", "n_trgm", "postings",
+        "token_keys", "token_pos", "by_muscle", "by_equipment", "no_equipment",
+    )
+
+    def __init__(self, items: list[ExerciseRef]) -> None:
+        self.items = items
+        self.by_id = {ex.id: pos for pos, ex in enumerate(items)}
+        self.name_len = np.fromiter(
+            (len(ex.name) for ex in items), dtype=np.int32, count=len(items)
+        )
+        n_trgm = np.zeros(len(items), dtype=np.float64)
+        postings: dict[str, list[int]] = {}
+        tokens: list[tuple[str, int]] = []
+        by_muscle: dict[str, list[int]] = {}
+        by_equipment: dict[str, list[int]] = {}
+        no_equipment: list[int] = []
+        for pos, ex in enumerate(items):
+            key = canon(ex.name)
+            grams = trigrams(key)
+            n_trgm[pos] = len(grams)
+            for g in grams:
+                postings.setdefault(g, []).append(pos)
+            tokens.extend((tok, pos) for tok in set(key.split()))
+            if ex.muscle:
+                by_muscle.setdefault(ex.muscle.lower(), []).append(pos)
+            if ex.equipment:
+                by_equipment.setdefault(ex.equipment.lower(), []).append(pos)
+            else:
+                no_equipment.append(pos)
+        tokens.sort()
+        self.n_trgm = n_trgm
+        self.postings = {g: np.array(p, dtype=np.int32) for g, p in postings.items()}
+        # слова названий по алфавиту: все слова с префиксом — один срез через bisect
+        self.token_keys = [tok for tok, _ in tokens]
+        self.token_pos = np.array([pos for _, pos in tokens], dtype=np.int32)
+        self.by_muscle = {k: self.mask(v) for k, v in by_muscle.items()}
+        self.by_equipment = {k: self.mask(v) for k, v in by_equipment.items()}
+        self.no_equipment = self.mask(no_equipment)
+
+    def mask(self, positions: Any) -> np.ndarray:
+        m = np.zeros(len(self.items), dtype=bool)
+        m[positions] = True
+        return m
+
+    def prefixed(self, prefix: str) -> np.ndarray:
+        lo = bisect_left(self.token_keys, prefix)
+        hi = bisect_left(self.token_keys, prefix + "\U0010ffff", lo)
+        return self.mask(self.token_pos[lo:hi])
+
+
+class ExerciseCatalog:
+    """
+    Каталог упражнений в памяти: таблица маленькая и почти не меняется, поэтому
+    грузим её целиком и ищем без БД — триграммы (опечатки) + префиксы слов,
+    фильтры по muscle/equipment. Перезагрузка — при коммите ORM-изменений Exercise
+    в этом процессе и по отпечатку таблицы (count/max(id)/длины) раз в refresh_interval.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession] = async_session_factory,
+        refresh_interval: float = 30,
+        min_similarity: float = 0.5,
+    ) -> None:
+        self._session_factory = session_factory
+        self.refresh_interval = refresh_interval
+        self.min_similarity = min_similarity
+        self._index = _Index([])
+        self._fingerprint: tuple[Any, ...] | None = None
+        self._stale = True
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._orm_hooks: list[tuple[str, Callable[..., None]]] = []
+        self.loads = 0
+        self.searches = 0
+        self.search_ns = 0
+
+    # --- загрузка ---
+
+    @staticmethod
+    def _fingerprint_stmt() -> Any:
+        t = Exercise.__table__  # type: ignore[attr-defined]
+        return select(
+            func.count(),
+            func.max(t.c.id),
+            func.sum(
+                func.length(t.c.name)
+                + func.length(func.coalesce(t.c.muscle, ""))
+                + func.length(func.coalesce(t.c.equipment, ""))
+            ),
+        ).select_from(t)
+
+    async def load(self) -> None:
+        t = Exercise.__table__  # type: ignore[attr-defined]
+        async with self._lock:
+            # флаг снимаем до чтения: изменение, пришедшее во время загрузки, вызовет ещё одну
+            self._stale = False
+            async with self._session_factory() as s:
+                conn = await s.connection()
+                fingerprint = tuple((await conn.execute(self._fingerprint_stmt())).one())
+                rows = await conn.execute(
+                    select(t.c.id, t.c.name, t.c.muscle, t.c.equipment).order_by(t.c.id)
+                )
+                items = [ExerciseRef(*r) for r in rows]
+            self._index = _Index(items)
+            self._fingerprint = fingerprint
+            self.loads += 1
+        log.info("exercise catalog loaded: %d exercises", len(items))
+
+    async def refresh(self) -> bool:
+        """Перечитать таблицу, если она поменялась. True — если перезагрузили."""
+        if not self._stale:
+            async with self._session_factory() as s:
+                conn = await s.connection()
+                fingerprint = tuple((await conn.execute(self._fingerprint_stmt())).one())
+            if fingerprint == self._fingerprint:
+                return False
+        await self.load()
+        return True
+
+    def mark_stale(self) -> None:
+        self._stale = True
+        self._wakeup.set()
+
+    def track_orm_changes(self) -> None:
+        """Помечаем каталог устаревшим после commit сессии, в которой менялись Exercise."""
+        if self._orm_hooks:
+            return
+
+        def after_flush(session: Session, _ctx: Any) -> None:
+            touched = chain(session.new, session.dirty, session.deleted)
+            if any(isinstance(o, Exercise) for o in touched):
+                session.info["exercises_changed"] = True
+
+        def after_commit(session: Session) -> None:
+            if session.info.pop("exercises_changed", False):
+                self.mark_stale()
+
+        self._orm_hooks = [("after_flush", after_flush), ("after_commit", after_commit)]
+        for name, fn in self._orm_hooks:
+            event.listen(Session, name, fn)
+
+    # --- поиск ---
+
+    def get(self, exercise_id: int) -> ExerciseRef | None:
+        pos = self._index.by_id.get(exercise_id)
+        return None if pos is None else self._index.items[pos]
+
+    def all(self) -> list[ExerciseRef]:
+        return list(self._index.items)
+
+    def muscles(self) -> list[str]:
+        return sorted(self._index.by_muscle)
+
+    def equipment(self) -> list[str]:
+        return sorted(self._index.by_equipment)
+
+    def select(self, muscle: str, equipment: Collection[str] | None = None) -> list[ExerciseRef]:
+        """
+        Упражнения на мышцу в порядке каталога. equipment — допустимый инвентарь
+        (None — любой); упражнения без инвентаря подходят всегда.
+        """
+        idx = self._index
+        m = idx.by_muscle.get(muscle.lower())
+        if m is None:
+            return []
+        if equipment is not None:
+            allowed = idx.no_equipment.copy()
+            for eq in equipment:
+                if eq.lower() in idx.by_equipment:
+                    allowed |= idx.by_equipment[eq.lower()]
+            m = m & allowed
+        return [idx.items[p] for p in np.flatnonzero(m)]
+
+    def search(
+        self,
+        query: str,
+        muscle: str | None = None,
+        equipment: str | None = None,
+        limit: int = 10,
+    ) -> list[ExerciseRef]:
+        t0 = time.perf_counter_ns()
+        idx = self._index  # снимок: перезагрузка посреди поиска нам не мешает
+        allowed: np.ndarray | None = None
+        if muscle is not None:
+            allowed = idx.by_muscle.get(muscle.lower(), idx.mask([]))
+        if equipment is not None:
+            eq = idx.by_equipment.get(equipment.lower(), idx.mask([]))
+            allowed = eq if allowed is None else allowed & eq
+
+        key = canon(query)
+        if not key:
+            positions = np.arange(len(idx.items)) if allowed is None else np.flatnonzero(allowed)
+            found = [idx.items[p] for p in positions[:limit]]
+        else:
+            scores = self._score(idx, key)
+            if allowed is not None:
+                scores[~allowed] = 0.0
+            candidates = np.flatnonzero(scores)
+            if len(candidates) > limit:
+                candidates = candidates[np.argpartition(-scores[candidates], limit)[:limit]]
+            # выше балл, при равенстве — короче название
+            order = np.lexsort((idx.name_len[candidates], -scores[candidates]))
+            found = [idx.items[p] for p in candidates[order]]
+        self.searches += 1
+        self.search_ns += time.perf_counter_ns() - t0
+        return found
+
+    def _score(self, idx: _Index, key: str) -> np.ndarray:
+        q_grams = trigrams(key)
+        hits = [idx.postings[g] for g in q_grams if g in idx.postings]
+        n = len(idx.items)
+        shared = np.bincount(np.concatenate(hits), minlength=n) if hits else np.zeros(n)
+
+        # доля триграмм запроса, найденных в названии (длинное название не штрафуется),
+        # плюс Жаккар — при равном покрытии выше то, где меньше лишнего
+        nq = len(q_grams)
+        scores = np.where(
+            shared >= self.min_similarity * nq,
+            shared / nq + shared / (nq + idx.n_trgm - shared),
+            0.0,
+        )
+
+        # все слова запроса — префиксы слов названия: «жим ле» -> «Жим лёжа»
+        words = key.split()
+        prefix_hits = idx.prefixed(words[0])
+        for word in words[1:]:
+            prefix_hits &= idx.prefixed(word)
+        scores += prefix_hits
+        return scores
+
+    # --- фоновая перезагрузка ---
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                log.exception("exercise catalog refresh failed")
+            await sleep_or_wakeup(self._wakeup, self.refresh_interval)
+
+    async def start(self) -> None:
+        """dp.startup-хук: первая загрузка синхронно, дальше — фоновая сверка."""
+        self.track_orm_changes()
+        await self.load()
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for name, fn in self._orm_hooks:
+            event.remove(Session, name, fn)
+        self._orm_hooks = []
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "size": len(self._index.items),
+            "loads": self.loads,
+            "searches": self.searches,
+            "avg_search_us": self.search_ns / self.searches / 1000 if self.searches else 0.0,
+        }
+
+
+exercise_catalog = ExerciseCatalog(refresh_interval=settings.EXERCISE_CATALOG_REFRESH_SEC)
@@ -0,0 +1,399 @@
+# app/services/export.py
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import logging
+import os
+import zlib
+from collections.abc import AsyncIterator, Awaitable, Callable
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, BinaryIO, Protocol
+
+from sqlalchemy import Select
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.db.models import PR, SetLog, User, WorkoutSession
+from app.db.session import db_router
+
+log = logging.getLogger(__name__)
+
+FORMATS = ("jsonl", "csv")
+# S3 требует части >= 5 MiB (кроме последней)
+S3_PART_SIZE = 8 * 1024 * 1024
+
+
+# --------- Sinks: куда пишем сжатые байты ----------
+
+class Sink(Protocol):
+    async def write(self, data: bytes) -> None: ...
+    async def close(self) -> str: ...
+    async def abort(self) -> None: ...
+
+
+class FileSink:
+    """Файл в EXPORT_DIR. Выгрузка идёт в процессе бота — файловые вызовы уходят в thread pool."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._fh: BinaryIO | None = None
+
+    def _open(self) -> BinaryIO:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        return open(self.path, "wb")
+
+    async def _file(self) -> BinaryIO:
+        if self._fh is None:
+            self._fh = await asyncio.to_thread(self._open)
+        return self._fh
+
+    async def write(self, data: bytes) -> None:
+        await asyncio.to_thread((await self._file()).write, data)
+
+    async def close(self) -> str:
+        await asyncio.to_thread((await self._file()).close)
+        return self.path
+
+    def _abort(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    async def abort(self) -> None:
+        await asyncio.to_thread(self._abort)
+
+
+class S3MultipartSink:
+    """
+    Multipart upload в S3-совместимое хранилище (S3, MinIO): в памяти держим
+    не больше одной части (part_size), boto3-вызовы уходят в thread pool.
+    """
+
+    def __init__(self, client: Any, bucket: str, key: str, part_size: int = S3_PART_SIZE) -> None:
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self._buf = bytearray()
+        self._parts: list[dict[str, Any]] = []
+        self._upload_id: str | None = None
+
+    async def _upload_part(self, body: bytes) -> None:
+        if self._upload_id is None:
+            resp = await asyncio.to_thread(
+                self.client.create_multipart_upload, Bucket=self.bucket, Key=self.key
+            )
+            self._upload_id = resp["UploadId"]
+        number = len(self._parts) + 1
+        resp = await asyncio.to_thread(
+            self.client.upload_part,
+            Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+            PartNumber=number, Body=body,
+        )
+        self._parts.append({"PartNumber": number, "ETag": resp["ETag"]})
+
+    async def write(self, data: bytes) -> None:
+        self._buf += data
+        # части ровно по part_size: компрессор может отдать сразу большой блок
+        while len(self._buf) >= self.part_size:
+            body = bytes(self._buf[:self.part_size])
+            del self._buf[:self.part_size]
+            await self._upload_part(body)
+
+    async def close(self) -> str:
+        if self._buf or not self._parts:
+            await self._upload_part(bytes(self._buf))
+            self._buf.clear()
+        await asyncio.to_thread(
+            self.client.complete_multipart_upload,
+            Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+            MultipartUpload={"Parts": self._parts},
+        )
+        return f"s3://{self.bucket}/{self.key}"
+
+    async def abort(self) -> None:
+        if self._upload_id is not None:
+            await asyncio.to_thread(
+                self.client.abort_multipart_upload,
+                Bucket=self.bucket, Key=self.key, UploadId=self._upload_id,
+            )
+
+
+def s3_client_from_settings() -> Any:
+    import boto3  # импорт тяжёлый — только когда выгрузка действительно идёт в S3
+
+    return boto3.client(
+        "s3",
+        endpoint_url=settings.S3_ENDPOINT,
+        region_name=settings.S3_REGION,
+        aws_access_key_id=settings.S3_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+    )
+
+
+def presigned_url(location: str, expires_in: int = 86_400) -> str:
+    """s3://bucket/key -> временная ссылка на скачивание; локальный путь возвращается как есть."""
+    if not location.startswith("s3://"):
+        return location
+    bucket, key = location[len("s3://"):].split("/", 1)
+    return s3_client_from_settings().generate_presigned_url(
+        "get_object", Params={"Bucket": bucket, "Key": key}, ExpiresIn=expires_in
+    )
+
+
+def remove_local(locations: list[str]) -> None:
+    """Удалить локальные файлы выгрузки; объекты в S3 чистит lifecycle бакета."""
+    for location in locations:
+        if location.startswith("s3://"):
+            continue
+        try:
+            os.unlink(location)
+        except FileNotFoundError:
+            pass
+
+
+SinkFactory = Callable[[str], Sink]
+# отправка готовой выгрузки пользователю; ошибка — None вместо списка файлов
+Deliver = Callable[[list[str] | None], Awaitable[Any]]
+
+
+def default_sink_factory() -> SinkFactory:
+    """S3, если задан S3_BUCKET, иначе файлы в EXPORT_DIR. Аргумент фабрики — имя файла."""
+    bucket = settings.S3_BUCKET
+    if bucket:
+        client = s3_client_from_settings()
+        return lambda name: S3MultipartSink(client, bucket, f"exports/{name}")
+    return lambda name: FileSink(os.path.join(settings.EXPORT_DIR, name))
+
+
+# --------- Потоковая запись gzip ----------
+
+class GzipStream:
+    """
+    Инкрементальный gzip поверх Sink: память — только буфер компрессора.
+    Сжатие пачки — в thread pool (zlib отпускает GIL), event loop бота не стоит.
+    """
+
+    def __init__(self, sink: Sink) -> None:
+        self.sink = sink
+        self._z = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip-контейнер
+
+    def _compress(self, text: str) -> bytes:
+        return self._z.compress(text.encode())
+
+    async def write(self, text: str) -> None:
+        chunk = await asyncio.to_thread(self._compress, text)
+        if chunk:
+            await self.sink.write(chunk)
+
+    async def close(self) -> str:
+        await self.sink.write(await asyncio.to_thread(self._z.flush))
+        return await self.sink.close()
+
+
+def _json_default(v: Any) -> Any:
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    if isinstance(v, Decimal):
+        return float(v)
+    raise TypeError(f"not JSON serializable: {type(v).__name__}")
+
+
+# --------- Что выгружаем ----------
+
+def _tables(user_id: int) -> list[tuple[str, Select[Any]]]:
+    # выбираем колонки таблиц, а не ORM-объекты: без identity map и валидации моделей
+    users, sessions, sets, prs = (
+        m.__table__ for m in (User, WorkoutSession, SetLog, PR)  # type: ignore[union-attr]
+    )
+    return [
+        ("profile", select(users).where(users.c.id == user_id)),
+        ("sessions", select(sessions).where(sessions.c.user_id == user_id).order_by(sessions.c.id)),
+        ("sets", select(sets).where(sets.c.user_id == user_id).order_by(sets.c.id)),
+        ("prs", select(prs).where(prs.c.user_id == user_id).order_by(prs.c.id)),
+    ]
+
+
+class Exporter:
+    """
+    Выгрузка данных пользователя: серверный курсор (stream + yield_per) ->
+    пачки по chunk_rows строк -> gzip -> Sink. В памяти одновременно только
+    одна пачка строк и одна часть multipart-загрузки, сколько бы ни было истории.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession] | None = None,
+        sink_factory: SinkFactory | None = None,
+        chunk_rows: int = 5000,
+    ) -> None:
+        self._session_factory = session_factory
+        self._sink_factory = sink_factory
+        self.chunk_rows = chunk_rows
+        self._jobs: dict[int, asyncio.Task[None]] = {}
+
+    def _session(self, user_id: int | None = None) -> AsyncSession:
+        # по умолчанию выгрузка читает с реплики (недавно писавшие — с primary)
+        if self._session_factory is not None:
+            return self._session_factory()
+        return db_router.session(user_id)
+
+    @property
+    def sink_factory(self) -> SinkFactory:
+        if self._sink_factory is None:
+            self._sink_factory = default_sink_factory()
+        return self._sink_factory
+
+    async def _stream_rows(
+        self, s: AsyncSession, stmt: Select[Any]
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        conn = await s.connection()
+        result = await conn.stream(stmt.execution_options(yield_per=self.chunk_rows))
+        async for partition in result.mappings().partitions(self.chunk_rows):
+            yield [dict(r) for r in partition]
+
+    async def export_user(self, user_id: int, fmt: str = "jsonl") -> list[str]:
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown export format: {fmt!r}")
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        prefix = f"user-{user_id}-{stamp}"
+
+        async with self._session(user_id) as s:
+            if fmt == "jsonl":
+                out = GzipStream(self.sink_factory(f"{prefix}.jsonl.gz"))
+                try:
+                    for table, stmt in _tables(user_id):
+                        async for rows in self._stream_rows(s, stmt):
+                            await out.write("".join(
+                                json.dumps(
+                                    {"table": table, **r}, default=_json_default, ensure_ascii=False
+                                ) + "\n"
+                                for r in rows
+                            ))
+                    return [await out.close()]
+                except BaseException:
+                    await out.sink.abort()
+                    raise
+
+            locations: list[str] = []
+            for table, stmt in _tables(user_id):
+                out = GzipStream(self.sink_factory(f"{prefix}-{table}.csv.gz"))
+                try:
+                    header_written = False
+                    async for rows in self._stream_rows(s, stmt):
+                        buf = io.StringIO()
+                        writer = csv.DictWriter(buf, fieldnames=list(rows[0]))
+                        if not header_written:
+                            writer.writeheader()
+                            header_written = True
+                        writer.writerows(
+                            {
+                                k: json.dumps(v, ensure_ascii=False) if isinstance(v, dict) else v
+                                for k, v in r.items()
+                            }
+                            for r in rows
+                        )
+                        await out.write(buf.getvalue())
+                    locations.append(await out.close())
+                except BaseException:
+                    await out.sink.abort()
+                    # недоделанная выгрузка не нужна: убираем и уже готовые части
+                    await asyncio.to_thread(remove_local, locations)
+                    raise
+            return locations
+
+    def start_user_export(self, user_id: int, fmt: str, deliver: Deliver) -> bool:
+        """
+        Выгрузка в фоне — не занимает шард апдейтов пользователя. Готовые файлы
+        (или None при ошибке) уходят в deliver, локальные после этого удаляются.
+        False — выгрузка этого пользователя уже идёт.
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown export format: {fmt!r}")
+        if user_id in self._jobs:
+            return False
+        task = asyncio.create_task(self._run_job(user_id, fmt, deliver))
+        self._jobs[user_id] = task
+        task.add_done_callback(lambda _: self._jobs.pop(user_id, None))
+        return True
+
+    async def _run_job(self, user_id: int, fmt: str, deliver: Deliver) -> None:
+        try:
+            locations = await self.export_user(user_id, fmt)
+        except Exception:
+            log.exception("export for user %s failed", user_id)
+            await self._deliver(deliver, None)
+            return
+        try:
+            await self._deliver(deliver, locations)
+        finally:
+            await asyncio.to_thread(remove_local, locations)
+
+    @staticmethod
+    async def _deliver(deliver: Deliver, locations: list[str] | None) -> None:
+        try:
+            await deliver(locations)
+        except Exception:
+            log.exception("export delivery failed")
+
+    async def close(self) -> None:
+        # на остановке недоделанные выгрузки отменяем: их файлы удаляет abort
+        for task in list(self._jobs.values()):
+            task.cancel()
+        await asyncio.gather(*self._jobs.values(), return_exceptions=True)
+
+    async def export_all(self, fmt: str = "jsonl", users_per_page: int = 500) -> int:
+        """Админская выгрузка всех: keyset по users.id, по одному пользователю за раз."""
+        done = 0
+        last_id = 0
+        while True:
+            async with self._session() as s:
+                user_ids: list[int] = [
+                    u for u in await s.exec(
+                        select(User.id)
+                        .where(col(User.id) > last_id)
+                        .order_by(col(User.id))
+                        .limit(users_per_page)
+                    )
+                    if u is not None
+                ]
+            if not user_ids:
+                return done
+            for user_id in user_ids:
+                await self.export_user(user_id, fmt)
+                done += 1
+            last_id = user_ids[-1]
+            log.info("export all: %d users done", done)
+
+
+exporter = Exporter(chunk_rows=settings.EXPORT_CHUNK_ROWS)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Export user data (gzip JSONL/CSV) to EXPORT_DIR or S3"
+    )
+    parser.add_argument("command", choices=["user", "all"])
+    parser.add_argument("user_id", type=int, nargs="?")
+    parser.add_argument("--format", choices=FORMATS, default="jsonl")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    if args.command == "user":
+        if args.user_id is None:
+            parser.error("user_id is required for 'user'")
+        for location in asyncio.run(exporter.export_user(args.user_id, args.format)):
+            log.info("exported: %s", location)
+    else:
+        log.info("export all finished: %d users", asyncio.run(exporter.export_all(args.format)))
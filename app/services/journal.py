@@ -0,0 +1,112 @@
+# app/services/journal.py
+from __future__ import annotations
+
+import base64
+import struct
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from sqlalchemy import literal, select as sa_select, tuple_
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db.models import Exercise, SetLog, WorkoutItem, WorkoutSession
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+_EPOCH = datetime(1970, 1, 1)
+_CURSOR = struct.Struct(">qq")  # (ts в микросекундах, set_logs.id)
+
+
+class JournalSet(NamedTuple):
+    id: int
+    ts: datetime
+    exercise: str | None
+    set_index: int
+    weight_kg: float
+    reps: int
+    rpe: float | None
+
+
+class JournalSession(NamedTuple):
+    session_id: int
+    started_at: datetime | None
+    sets: list[JournalSet]
+
+
+class JournalPage(NamedTuple):
+    sessions: list[JournalSession]
+    next_cursor: str | None
+
+
+def encode_cursor(ts: datetime, set_id: int) -> str:
+    """Непрозрачный курсор: 16 байт -> 22 символа base64url (влезает в callback_data)."""
+    micros = (ts - _EPOCH) // timedelta(microseconds=1)
+    return base64.urlsafe_b64encode(_CURSOR.pack(micros, set_id)).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        micros, set_id = _CURSOR.unpack(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        # подделанный курсор с огромным micros не влезает в datetime
+        return _EPOCH + timedelta(microseconds=micros), set_id
+    except (ValueError, OverflowError, struct.error) as e:
+        raise ValueError("invalid journal cursor") from e
+
+
+async def fetch_page(
+    session: AsyncSession, user_id: int, cursor: str | None = None, limit: int = PAGE_SIZE
+) -> JournalPage:
+    """
+    Страница журнала (новые сверху), сгруппированная по тренировкам.
+
+    Keyset-пагинация по (ts, id) на индексе ix_set_logs_user_ts_id: каждая
+    страница — range scan от курсора, без OFFSET, поэтому стоит одинаково
+    и на первой, и на тысячной странице.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    stmt = (
+        sa_select(
+            col(SetLog.id), col(SetLog.ts), col(SetLog.session_id), col(Exercise.name),
+            col(SetLog.set_index), col(SetLog.weight_kg), col(SetLog.reps), col(SetLog.rpe),
+        )
+        .outerjoin(WorkoutItem, col(WorkoutItem.id) == col(SetLog.workout_item_id))
+        .outerjoin(Exercise, col(Exercise.id) == col(WorkoutItem.exercise_id))
+        .where(col(SetLog.user_id) == user_id)
+        .order_by(col(SetLog.ts).desc(), col(SetLog.id).desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        ts, set_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            tuple_(col(SetLog.ts), col(SetLog.id)) < tuple_(literal(ts), literal(set_id))
+        )
+
+    conn = await session.connection()
+    rows = list(await conn.execute(stmt))
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not rows:
+        return JournalPage([], None)
+
+    session_ids = {r[2] for r in rows}
+    started = dict(
+        (
+            await session.exec(
+                select(WorkoutSession.id, WorkoutSession.started_at).where(
+                    col(WorkoutSession.id).in_(session_ids)
+                )
+            )
+        ).all()
+    )
+
+    groups: list[JournalSession] = []
+    for set_id, ts, session_id, exercise, set_index, weight, reps, rpe in rows:
+        if not groups or groups[-1].session_id != session_id:
+            groups.append(JournalSession(session_id, started.get(session_id), []))
+        item = JournalSet(set_id, ts, exercise, set_index, float(weight), reps, rpe)
+        groups[-1].sets.append(item)
+
+    last = rows[-1]
+    return JournalPage(groups, encode_cursor(last[1], last[0]) if has_more else None)
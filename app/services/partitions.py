@@ -0,0 +1,106 @@
+# app/services/partitions.py
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+from collections.abc import Callable
+
+from sqlalchemy import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.aio import sleep_or_wakeup
+from app.core.config import settings
+from app.db.session import async_session_factory
+
+log = logging.getLogger(__name__)
+
+
+class SetLogPartitions:
+    """
+    Месячные секции set_logs (Postgres, migrations/versions/0003): держим созданными
+    текущий месяц и months_ahead вперёд — INSERT в месяц без секции упал бы
+    (DEFAULT-секции нет намеренно, см. миграцию).
+    Проверка при старте и раз в check_interval. Функция в БД идемпотентна и берёт
+    advisory-лок, так что несколько процессов друг другу не мешают.
+    На других СУБД (SQLite в тестах) — no-op.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession] = async_session_factory,
+        months_ahead: int = 3,
+        check_interval: float = 6 * 3600,
+    ) -> None:
+        self._session_factory = session_factory
+        self.months_ahead = months_ahead
+        self.check_interval = check_interval
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self.checks = 0
+        self.created = 0
+
+    async def ensure(self) -> int:
+        """Создать недостающие секции; вернуть, сколько создано."""
+        async with self._session_factory() as s:
+            conn = await s.connection()
+            if conn.dialect.name != "postgresql":
+                return 0
+            created = (
+                await conn.execute(
+                    text("SELECT set_logs_ensure_partitions(:n)"), {"n": self.months_ahead}
+                )
+            ).scalar_one()
+            await s.commit()
+        self.checks += 1
+        self.created += created
+        if created:
+            log.info("set_logs: created %d monthly partitions", created)
+        return created
+
+    async def run(self) -> None:
+        while True:
+            await sleep_or_wakeup(self._wakeup, self.check_interval)
+            try:
+                await self.ensure()
+            except Exception:
+                log.exception("set_logs partition check failed")
+
+    async def start(self) -> None:
+        """dp.startup-хук: первая проверка до приёма апдейтов, дальше — по таймеру."""
+        try:
+            await self.ensure()
+        except Exception:
+            log.exception("set_logs partition check failed (migrations applied?)")
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict[str, int]:
+        return {"checks": self.checks, "created": self.created}
+
+
+set_log_partitions = SetLogPartitions(
+    months_ahead=settings.SETLOG_PARTITIONS_AHEAD,
+    check_interval=settings.SETLOG_PARTITION_CHECK_SEC,
+)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create upcoming monthly set_logs partitions")
+    parser.add_argument("command", choices=["ensure"])
+    parser.add_argument(
+        "--ahead", type=int, default=settings.SETLOG_PARTITIONS_AHEAD, help="months ahead"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    n = asyncio.run(SetLogPartitions(months_ahead=args.ahead).ensure())
+    log.info("partition check finished: %d created", n)
@@ -0,0 +1,256 @@
+# app/services/plan_cache.py
+from __future__ import annotations
+
+import json
+import sys
+import time
+from collections.abc import Callable, Mapping
+from datetime import datetime
+from typing import Any, NamedTuple
+
+from sqlalchemy import func, select as sa_select
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.cache import TTLLRUCache
+from app.core.config import settings
+from app.db.hooks import after_commit
+from app.db.models import Exercise, Plan, WorkoutDay, WorkoutItem
+
+# session.info: пользователи, чей план меняется в ещё не закоммиченной транзакции
+_PENDING_PLANS = "plan_cache_pending"
+
+
+class CachedItem(NamedTuple):
+    # имена полей — как у WorkoutItem: объект подходит и для движка прогрессий
+    id: int
+    exercise_id: int
+    exercise_name: str
+    muscle: str | None
+    order_idx: int
+    sets: int
+    reps_min: int
+    reps_max: int
+    rir_target: int | None
+    rest_sec: int
+    progression_json: Mapping[str, Any]
+
+
+class CachedDay(NamedTuple):
+    id: int
+    day_idx: int
+    items: tuple[CachedItem, ...]
+
+
+class CachedPlan:
+    """Снимок активного плана пользователя: только кортежи и строки, без ORM и сессии."""
+
+    __slots__ = ("days", "id", "name", "nbytes", "split_type", "updated_at", "user_id", "weeks")
+
+    def __init__(
+        self, id: int, user_id: int, name: str, weeks: int, split_type: str | None,  # noqa: A002
+        updated_at: datetime, days: tuple[CachedDay, ...],
+    ) -> None:
+        self.id = id
+        self.user_id = user_id
+        self.name = name
+        self.weeks = weeks
+        self.split_type = split_type
+        self.updated_at = updated_at
+        self.days = days
+        self.nbytes = _deep_sizeof(self)
+
+    @property
+    def version(self) -> tuple[int, datetime]:
+        return self.id, self.updated_at
+
+    def day(self, day_idx: int) -> CachedDay | None:
+        return next((d for d in self.days if d.day_idx == day_idx), None)
+
+    def items(self) -> list[tuple[CachedDay, CachedItem]]:
+        return [(d, item) for d in self.days for item in d.items]
+
+
+def _deep_sizeof(root: Any) -> int:
+    """Оценка памяти снимка: объект, кортежи, строки, словари правил (общие объекты — один раз)."""
+    seen: set[int] = set()
+    stack = [root]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, tuple):
+            stack.extend(obj)
+        elif isinstance(obj, Mapping):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif hasattr(obj, "__slots__") and not isinstance(obj, (str, int, float)):
+            stack.extend(
+                getattr(obj, name)
+                for name in obj.__slots__
+                if hasattr(obj, name) and name != "nbytes"
+            )
+    return total
+
+
+def _active_plan_id(user_id: int) -> Any:
+    return (
+        select(func.max(Plan.id))
+        .where(Plan.user_id == user_id, Plan.state == "active")
+        .scalar_subquery()
+    )
+
+
+class ActivePlanCache:
+    """
+    Активный план по user_id. Граф Plan -> WorkoutDay -> WorkoutItem -> Exercise
+    грузится одним запросом (outer join'ы) и хранится компактными кортежами.
+    Актуальность — по версии (Plan.id, Plan.updated_at): правки плана должны
+    обновлять updated_at (см. touch). Версию сверяем не чаще раза в trust_sec.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10_000,
+        trust_sec: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._plans: TTLLRUCache[int, tuple[float, CachedPlan]] = TTLLRUCache(maxsize=maxsize)
+        self.trust_sec = trust_sec
+        self._clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.validations = 0
+
+    async def _version(self, session: AsyncSession, user_id: int) -> tuple[int, datetime] | None:
+        self.validations += 1
+        row = (await session.exec(
+            select(Plan.id, Plan.updated_at).where(Plan.id == _active_plan_id(user_id))
+        )).first()
+        return None if row is None or row[0] is None else (row[0], row[1])
+
+    async def _load(self, session: AsyncSession, user_id: int) -> CachedPlan | None:
+        # select из sqlalchemy: у sqlmodel.select перегрузки только до 4 колонок
+        conn = await session.connection()
+        rows = (await conn.execute(
+            sa_select(
+                col(Plan.id), col(Plan.name), col(Plan.weeks), col(Plan.split_type),
+                col(Plan.updated_at), col(WorkoutDay.id), col(WorkoutDay.day_idx),
+                col(WorkoutItem.id), col(WorkoutItem.exercise_id), col(Exercise.name),
+                col(Exercise.muscle), col(WorkoutItem.order_idx), col(WorkoutItem.sets),
+                col(WorkoutItem.reps_min), col(WorkoutItem.reps_max), col(WorkoutItem.rir_target),
+                col(WorkoutItem.rest_sec), col(WorkoutItem.progression_json),
+            )
+            .select_from(Plan)
+            .outerjoin(WorkoutDay, col(WorkoutDay.plan_id) == col(Plan.id))
+            .outerjoin(WorkoutItem, col(WorkoutItem.day_id) == col(WorkoutDay.id))
+            .outerjoin(Exercise, col(Exercise.id) == col(WorkoutItem.exercise_id))
+            .where(col(Plan.id) == _active_plan_id(user_id))
+            .order_by(col(WorkoutDay.day_idx), col(WorkoutItem.order_idx))
+        )).all()
+        if not rows:
+            return None
+
+        plan_id, name, weeks, split_type, updated_at = rows[0][:5]
+        # одинаковые правила прогрессии и названия храним одним объектом
+        rules: dict[str, Mapping[str, Any]] = {}
+        days: list[tuple[int, int, list[CachedItem]]] = []
+        for row in rows:
+            day_id, day_idx, item_id = row[5], row[6], row[7]
+            if day_id is None:
+                continue
+            if not days or days[-1][0] != day_id:
+                days.append((day_id, day_idx, []))
+            if item_id is None:
+                continue
+            progression = row[17] or {}
+            progression = rules.setdefault(json.dumps(progression, sort_keys=True), progression)
+            days[-1][2].append(CachedItem(
+                id=item_id,
+                exercise_id=row[8],
+                exercise_name=sys.intern(row[9] or "Упражнение"),
+                muscle=row[10],
+                order_idx=row[11],
+                sets=row[12],
+                reps_min=row[13],
+                reps_max=row[14],
+                rir_target=row[15],
+                rest_sec=row[16],
+                progression_json=progression,
+            ))
+        return CachedPlan(
+            plan_id, user_id, name, weeks, split_type, updated_at,
+            tuple(CachedDay(day_id, day_idx, tuple(items)) for day_id, day_idx, items in days),
+        )
+
+    async def get(self, session: AsyncSession, user_id: int) -> CachedPlan | None:
+        if user_id in session.info.get(_PENDING_PLANS, ()):
+            # план меняется в транзакции этой сессии: читаем мимо кэша и не кэшируем
+            # незакоммиченное — после отката в кэше остался бы несуществующий план
+            return await self._load(session, user_id)
+        now = self._clock()
+        entry = self._plans.get(user_id)
+        if entry is not None:
+            checked_at, plan = entry
+            if now - checked_at < self.trust_sec:
+                self.hits += 1
+                return plan
+            if await self._version(session, user_id) == plan.version:
+                self._plans.set(user_id, (now, plan))
+                self.hits += 1
+                return plan
+
+        self.misses += 1
+        loaded = await self._load(session, user_id)
+        if loaded is None:
+            self._plans.pop(user_id)
+        else:
+            self._plans.set(user_id, (now, loaded))
+        return loaded
+
+    def invalidate(self, session: AsyncSession, user_id: int) -> None:
+        """
+        План пользователя меняется в транзакции session: из кэша он уходит после
+        её commit (тогда же вытесняется и старый план, успевший закэшироваться
+        из других сессий), при откате кэш остаётся как был.
+        """
+        pending = session.info.setdefault(_PENDING_PLANS, set())
+        if user_id in pending:
+            return
+        pending.add(user_id)
+
+        def committed() -> None:
+            pending.discard(user_id)
+            self._plans.pop(user_id)
+
+        after_commit(session, committed)
+
+    async def touch(self, session: AsyncSession, plan_id: int, user_id: int | None = None) -> None:
+        """Отметить правку плана (дни/упражнения): кэши во всех процессах увидят новую версию."""
+        plan = await session.get(Plan, plan_id)
+        if plan is not None:
+            plan.updated_at = datetime.utcnow()
+            session.add(plan)
+        if user_id is not None:
+            self.invalidate(session, user_id)
+
+    def stats(self) -> dict[str, float]:
+        sizes = [plan.nbytes for _, plan in self._plans.values()]
+        lookups = self.hits + self.misses
+        return {
+            "plans": len(sizes),
+            "hits": self.hits,
+            "misses": self.misses,
+            "validations": self.validations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bytes_total": sum(sizes),
+            "bytes_per_plan": sum(sizes) / len(sizes) if sizes else 0.0,
+        }
+
+
+plan_cache = ActivePlanCache(
+    maxsize=settings.PLAN_CACHE_MAXSIZE, trust_sec=settings.PLAN_CACHE_TRUST_SEC
+)
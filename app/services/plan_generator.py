@@ -0,0 +1,298 @@
+# app/services/plan_generator.py
+from __future__ import annotations
+
+import itertools
+import logging
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, NamedTuple
+
+from sqlalchemy import insert, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db.models import Plan, User, WorkoutDay, WorkoutItem
+from app.services.exercise_catalog import ExerciseCatalog, canon, exercise_catalog
+from app.services.plan_cache import plan_cache
+
+log = logging.getLogger(__name__)
+
+# значения User.goal / level / equipment — как их сохраняет онбординг
+DEFAULT_GOAL = "Гипертрофия"
+DEFAULT_LEVEL = "Новичок"
+DEFAULT_EQUIPMENT = "Смешанное"
+
+
+class Scheme(NamedTuple):
+    sets: int
+    reps_min: int
+    reps_max: int
+    rir_target: int
+    rest_sec: int
+    progression: Mapping[str, Any]
+
+
+# цель -> подходы/повторы/RIR/отдых и правило прогрессии (его разбирает движок прогрессий)
+GOAL_SCHEMES: dict[str, Scheme] = {
+    "Гипертрофия": Scheme(3, 8, 12, 2, 90, MappingProxyType({"type": "double", "step_kg": 2.5})),
+    "Сила": Scheme(
+        4, 3, 6, 2, 180, MappingProxyType({"type": "rpe", "target_rpe": 8, "step_kg": 2.5})
+    ),
+    "Выносливость": Scheme(3, 12, 20, 3, 60, MappingProxyType({"type": "double", "step_kg": 1.0})),
+    "Похудение": Scheme(3, 10, 15, 2, 60, MappingProxyType({"type": "double", "step_kg": 1.0})),
+}
+# опыт -> поправка к числу подходов
+LEVEL_SET_DELTA = {"Новичок": -1, "Средний": 0, "Продвинутый": 1}
+
+# опыт -> сплит: (split_type, [(день недели 0..6, название, мышцы по слотам)])
+SPLITS: dict[str, tuple[str, list[tuple[int, str, tuple[str, ...]]]]] = {
+    "Новичок": ("full-body", [
+        (0, "Всё тело A", ("legs", "chest", "back", "shoulders", "core")),
+        (2, "Всё тело B", ("legs", "back", "chest", "biceps", "triceps")),
+        (4, "Всё тело A", ("legs", "chest", "back", "shoulders", "core")),
+    ]),
+    "Средний": ("upper-lower", [
+        (0, "Верх", ("chest", "back", "shoulders", "chest", "back", "biceps", "triceps")),
+        (1, "Низ", ("legs", "legs", "legs", "core")),
+        (3, "Верх", ("back", "chest", "shoulders", "back", "chest", "triceps", "biceps")),
+        (4, "Низ", ("legs", "legs", "legs", "core")),
+    ]),
+    "Продвинутый": ("PPL", [
+        (0, "Толкающие", ("chest", "chest", "shoulders", "shoulders", "triceps")),
+        (1, "Тянущие", ("back", "back", "back", "biceps", "biceps")),
+        (2, "Ноги", ("legs", "legs", "legs", "legs", "core")),
+        (3, "Толкающие", ("chest", "shoulders", "chest", "triceps", "triceps")),
+        (4, "Тянущие", ("back", "back", "biceps", "back", "biceps")),
+        (5, "Ноги", ("legs", "legs", "legs", "core", "core")),
+    ]),
+}
+
+# оборудование пользователя -> допустимый инвентарь в каталоге (None — любой)
+EQUIPMENT_SETS: dict[str, frozenset[str] | None] = {
+    "Дом": frozenset({"dumbbell", "kettlebell", "band", "bodyweight"}),
+    "Зал": frozenset({"barbell", "dumbbell", "machine", "cable", "bodyweight"}),
+    "Только тело": frozenset({"bodyweight"}),
+    "Смешанное": None,
+}
+
+# травма (ключевое слово в свободном тексте) -> упражнения, которых избегаем (подстроки названия)
+_KNEE = ("присед", "выпад", "прыж", "squat", "lunge", "jump", "leg extension", "разгибание ног")
+_BACK = ("станов", "тяга в наклоне", "гудмор", "deadlift", "bent over", "good morning")
+_SHOULDER = ("жим стоя", "жим над головой", "армейский", "брусья", "overhead", "military", "dips")
+INJURY_RULES: dict[str, tuple[str, ...]] = {
+    "колен": _KNEE,
+    "knee": _KNEE,
+    "спин": _BACK,
+    "поясн": _BACK,
+    "back": _BACK,
+    "плеч": _SHOULDER,
+    "shoulder": _SHOULDER,
+}
+
+
+class ItemTemplate(NamedTuple):
+    muscle: str
+    candidates: tuple[int, ...]  # exercise_id в порядке предпочтения
+    row: Mapping[str, Any]       # готовые колонки WorkoutItem без exercise_id/order_idx
+
+
+class DayTemplate(NamedTuple):
+    day_idx: int
+    name: str
+    items: tuple[ItemTemplate, ...]
+
+
+class PlanTemplate(NamedTuple):
+    split_type: str
+    name: str
+    days: tuple[DayTemplate, ...]
+
+
+@dataclass(slots=True)
+class PlanDraft:
+    """Персональный план до записи: строки для bulk insert, без ORM-объектов."""
+
+    user_id: int
+    name: str
+    split_type: str
+    weeks: int
+    days: list[tuple[int, list[dict[str, Any]]]] = field(default_factory=list)
+
+
+class PlanGenerator:
+    """
+    Генерация плана из профиля. Шаблоны (сплит + кандидаты упражнений на каждый
+    слот) считаются один раз на (goal, level, equipment) и живут до перезагрузки
+    каталога; на пользователя остаётся только выбрать кандидатов с учётом травм
+    и скопировать схему. Запись — пачкой: план, дни и упражнения — по одному INSERT.
+    """
+
+    def __init__(self, catalog: ExerciseCatalog = exercise_catalog, weeks: int = 4) -> None:
+        self.catalog = catalog
+        self.weeks = weeks
+        self._templates: dict[tuple[str, str, str], PlanTemplate] = {}
+        self._excluded: dict[frozenset[str], frozenset[int]] = {}
+        self._catalog_version = -1
+        self.template_hits = 0
+        self.template_misses = 0
+
+    # --- шаблоны ---
+
+    def _check_catalog(self) -> None:
+        if self._catalog_version != self.catalog.loads:
+            self._templates.clear()
+            self._excluded.clear()
+            self._catalog_version = self.catalog.loads
+
+    @staticmethod
+    def profile_key(user: User) -> tuple[str, str, str]:
+        goal = user.goal if user.goal in GOAL_SCHEMES else DEFAULT_GOAL
+        level = user.level if user.level in SPLITS else DEFAULT_LEVEL
+        equipment = user.equipment if user.equipment in EQUIPMENT_SETS else DEFAULT_EQUIPMENT
+        return goal, level, equipment
+
+    def _build_template(self, goal: str, level: str, equipment: str) -> PlanTemplate:
+        base = GOAL_SCHEMES[goal]
+        scheme = base._replace(sets=max(2, base.sets + LEVEL_SET_DELTA[level]))
+        allowed = EQUIPMENT_SETS[equipment]
+        split_type, days = SPLITS[level]
+        # progression_json один на все строки шаблона: строки драфта только вставляются, не меняются
+        row = MappingProxyType({
+            "sets": scheme.sets, "reps_min": scheme.reps_min, "reps_max": scheme.reps_max,
+            "rir_target": scheme.rir_target, "rest_sec": scheme.rest_sec,
+            "progression_json": dict(scheme.progression),
+        })
+        candidates: dict[str, tuple[int, ...]] = {}
+        out = []
+        for day_idx, name, muscles in days:
+            items = []
+            for muscle in muscles:
+                if muscle not in candidates:
+                    candidates[muscle] = tuple(ex.id for ex in self.catalog.select(muscle, allowed))
+                items.append(ItemTemplate(muscle, candidates[muscle], row))
+            out.append(DayTemplate(day_idx, name, tuple(items)))
+        return PlanTemplate(split_type, f"{goal} · {split_type}", tuple(out))
+
+    def template(self, goal: str, level: str, equipment: str) -> PlanTemplate:
+        self._check_catalog()
+        key = (goal, level, equipment)
+        tpl = self._templates.get(key)
+        if tpl is None:
+            self.template_misses += 1
+            tpl = self._templates[key] = self._build_template(goal, level, equipment)
+        else:
+            self.template_hits += 1
+        return tpl
+
+    def precompute(self) -> int:
+        """Прогреть шаблоны на все сочетания профиля (после загрузки каталога)."""
+        for key in itertools.product(GOAL_SCHEMES, SPLITS, EQUIPMENT_SETS):
+            self.template(*key)
+        return len(self._templates)
+
+    def _excluded_ids(self, injuries: Mapping[str, Any] | None) -> frozenset[int]:
+        text = canon(str((injuries or {}).get("text") or ""))
+        if not text:
+            return frozenset()
+        rules = frozenset(k for k in INJURY_RULES if canon(k) in text)
+        if not rules:
+            return frozenset()
+        self._check_catalog()
+        excluded = self._excluded.get(rules)
+        if excluded is None:
+            needles = {canon(n) for rule in rules for n in INJURY_RULES[rule]}
+            excluded = self._excluded[rules] = frozenset(
+                ex.id for ex in self.catalog.all() if any(n in canon(ex.name) for n in needles)
+            )
+        return excluded
+
+    # --- план пользователя ---
+
+    def generate(self, user: User) -> PlanDraft:
+        tpl = self.template(*self.profile_key(user))
+        excluded = self._excluded_ids(user.injuries_json)
+        assert user.id is not None
+        draft = PlanDraft(
+            user_id=user.id, name=tpl.name, split_type=tpl.split_type, weeks=self.weeks
+        )
+        for day in tpl.days:
+            used: set[int] = set()
+            rows: list[dict[str, Any]] = []
+            for item in day.items:
+                ex_id = next(
+                    (c for c in item.candidates if c not in used and c not in excluded), None
+                )
+                if ex_id is None:  # в каталоге не нашлось подходящего — слот пропускаем
+                    continue
+                used.add(ex_id)
+                rows.append({"exercise_id": ex_id, "order_idx": len(rows), **item.row})
+            if rows:
+                draft.days.append((day.day_idx, rows))
+        return draft
+
+    async def save(self, session: AsyncSession, drafts: Sequence[PlanDraft]) -> list[int]:
+        """
+        Записать планы пачкой: прежние активные планы этих пользователей — в архив,
+        затем plans / workout_days / workout_items — по одному INSERT на таблицу.
+        """
+        if not drafts:
+            return []
+        if len({d.user_id for d in drafts}) != len(drafts):
+            raise ValueError("one plan per user in a batch")
+        plans = Plan.__table__  # type: ignore[attr-defined]
+        days = WorkoutDay.__table__  # type: ignore[attr-defined]
+        items = WorkoutItem.__table__  # type: ignore[attr-defined]
+        now = datetime.utcnow()
+        conn = await session.connection()
+        await conn.execute(
+            update(plans)
+            .where(plans.c.user_id.in_([d.user_id for d in drafts]), plans.c.state == "active")
+            .values(state="archived", updated_at=now)
+        )
+        # id сопоставляем по естественным ключам (user_id; plan_id+day_idx), а не по порядку строк:
+        # упорядоченный RETURNING в executemany SQLite выполняет построчно
+        plan_id_by_user = dict((await conn.execute(
+            insert(plans).returning(plans.c.user_id, plans.c.id),
+            [{"user_id": d.user_id, "name": d.name, "weeks": d.weeks, "split_type": d.split_type,
+              "state": "active", "created_at": now, "updated_at": now} for d in drafts],
+        )).tuples().all())
+        plan_ids = [plan_id_by_user[d.user_id] for d in drafts]
+
+        day_rows = [
+            {"plan_id": plan_id, "day_idx": day_idx}
+            for plan_id, d in zip(plan_ids, drafts, strict=True) for day_idx, _ in d.days
+        ]
+        if day_rows:
+            day_id_by_key = {
+                (plan_id, day_idx): day_id
+                for day_id, plan_id, day_idx in await conn.execute(
+                    insert(days).returning(days.c.id, days.c.plan_id, days.c.day_idx), day_rows
+                )
+            }
+            await conn.execute(insert(items), [
+                {"day_id": day_id_by_key[plan_id, day_idx], **row}
+                for plan_id, d in zip(plan_ids, drafts, strict=True)
+                for day_idx, rows in d.days
+                for row in rows
+            ])
+        for d in drafts:
+            plan_cache.invalidate(session, d.user_id)
+        return plan_ids
+
+    async def create_plan(self, session: AsyncSession, user: User) -> int:
+        return (await self.save(session, [self.generate(user)]))[0]
+
+    async def start(self) -> None:
+        """dp.startup-хук (после загрузки каталога): прогреваем шаблоны."""
+        log.info("plan templates precomputed: %d", self.precompute())
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "templates": len(self._templates),
+            "template_hits": self.template_hits,
+            "template_misses": self.template_misses,
+        }
+
+
+plan_generator = PlanGenerator()
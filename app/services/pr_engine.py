@@ -0,0 +1,293 @@
+# app/services/pr_engine.py
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+from collections.abc import Callable, Iterable, Sequence
+from datetime import date as date_type, datetime
+from typing import Any, NamedTuple
+
+from sqlalchemy import delete, func, insert, select as sa_select, tuple_
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.cache import TTLLRUCache
+from app.core.config import settings
+from app.db.dialect import upsert
+from app.db.models import PR, SetLog, User, WorkoutItem
+from app.db.session import async_session_factory
+
+log = logging.getLogger(__name__)
+
+# формулы e1RM на больших повторах врут — такие сеты в рекорды не идут
+MAX_REPS_FOR_E1RM = 12
+
+
+def epley(weight: float, reps: int) -> float:
+    return weight * (1 + reps / 30)
+
+
+def brzycki(weight: float, reps: int) -> float:
+    return weight * 36 / (37 - reps)
+
+
+FORMULAS: dict[str, Callable[[float, int], float]] = {"epley": epley, "brzycki": brzycki}
+
+
+def estimate_1rm(weight: float, reps: int, formula: str = "epley") -> float:
+    if weight <= 0 or not 1 <= reps <= MAX_REPS_FOR_E1RM:
+        return 0.0
+    if reps == 1:
+        return float(weight)
+    return round(FORMULAS[formula](float(weight), reps), 2)
+
+
+class Record(NamedTuple):
+    user_id: int
+    exercise_id: int
+    date: date_type
+    one_rm: float
+
+
+def _pr_upsert(dialect: str, records: list[Record]) -> Any:
+    """INSERT ... ON CONFLICT (user, exercise, date) DO UPDATE — оставляем максимум."""
+    greatest = func.greatest if dialect == "postgresql" else func.max
+    table = PR.__table__  # type: ignore[attr-defined]
+    stmt = upsert(dialect, table).values([r._asdict() for r in records])
+    return stmt.on_conflict_do_update(
+        index_elements=["user_id", "exercise_id", "date"],
+        set_={"one_rm": greatest(table.c.one_rm, stmt.excluded.one_rm)},
+    )
+
+
+class PREngine:
+    """
+    Инкрементальные личные рекорды по e1RM.
+
+    На каждую записанную пачку SetLog (слушатель SetLogWriter): считаем e1RM,
+    сравниваем с закэшированным лучшим результатом пользователя в упражнении
+    и пишем в `prs` только побитые рекорды. История set_logs не пересканируется:
+    при промахе кэша лучший результат берётся одним запросом из `prs`.
+
+    Кэш лучших — только фильтр «точно не рекорд»: его могли обогнать другие
+    процессы, поэтому кандидаты в рекорды перепроверяются по `prs` в той же
+    транзакции, что и запись, а сам кэш живёт не дольше best_ttl секунд.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession] = async_session_factory,
+        formula: str = "epley",
+        cache_size: int = 100_000,
+        best_ttl: float = 300,
+    ) -> None:
+        if formula not in FORMULAS:
+            raise ValueError(f"unknown e1RM formula: {formula!r}")
+        self._session_factory = session_factory
+        self.formula = formula
+        self._best: TTLLRUCache[tuple[int, int], float] = TTLLRUCache(
+            maxsize=cache_size, ttl=best_ttl
+        )
+        # пункт плана -> упражнение не меняется, кэшируем отдельно
+        self._item_exercise: TTLLRUCache[int, int] = TTLLRUCache(maxsize=cache_size)
+        self.records_broken = 0
+
+    async def _exercise_ids(self, s: AsyncSession, item_ids: set[int]) -> dict[int, int]:
+        out: dict[int, int] = {}
+        missing = set()
+        for item_id in item_ids:
+            ex_id = self._item_exercise.get(item_id)
+            if ex_id is None:
+                missing.add(item_id)
+            else:
+                out[item_id] = ex_id
+        if missing:
+            rows = await s.exec(
+                select(WorkoutItem.id, WorkoutItem.exercise_id).where(
+                    col(WorkoutItem.id).in_(missing)
+                )
+            )
+            for row_id, row_ex_id in rows:
+                if row_id is None:
+                    continue
+                self._item_exercise.set(row_id, row_ex_id)
+                out[row_id] = row_ex_id
+        return out
+
+    async def _bests(
+        self, s: AsyncSession, keys: set[tuple[int, int]], fresh: bool = False
+    ) -> dict[tuple[int, int], float]:
+        """Лучший e1RM по (user, exercise): из кэша, а fresh=True — всегда из `prs`."""
+        out: dict[tuple[int, int], float] = {}
+        missing = set()
+        for key in keys:
+            best = None if fresh else self._best.get(key)
+            if best is None:
+                missing.add(key)
+            else:
+                out[key] = best
+        if missing:
+            rows = await s.exec(
+                select(PR.user_id, PR.exercise_id, func.max(PR.one_rm))
+                .where(tuple_(col(PR.user_id), col(PR.exercise_id)).in_(list(missing)))
+                .group_by(col(PR.user_id), col(PR.exercise_id))
+            )
+            found = {(u, e): float(best) for u, e, best in rows}
+            for key in missing:
+                out[key] = found.get(key, 0.0)
+                self._best.set(key, out[key])
+        return out
+
+    async def on_sets(self, rows: list[dict[str, Any]]) -> list[Record]:
+        """Обработать записанные сеты; вернуть побитые рекорды."""
+        rows = [r for r in rows if r.get("workout_item_id") is not None]
+        if not rows:
+            return []
+
+        async with self._session_factory() as s:
+            item_ex = await self._exercise_ids(s, {r["workout_item_id"] for r in rows})
+
+            # лучший e1RM пачки на (user, exercise, date)
+            candidates: dict[tuple[int, int, date_type], float] = {}
+            for r in rows:
+                ex_id = item_ex.get(r["workout_item_id"])
+                e1rm = estimate_1rm(float(r["weight_kg"]), r["reps"], self.formula)
+                if ex_id is None or e1rm <= 0:
+                    continue
+                key = (r["user_id"], ex_id, _as_date(r["ts"]))
+                candidates[key] = max(candidates.get(key, 0.0), e1rm)
+            if not candidates:
+                return []
+
+            bests = await self._bests(s, {(u, e) for u, e, _ in candidates})
+            records = _broken(candidates, bests)
+            if records:
+                # кэш мог отстать (рекорд записал другой процесс) — сверяемся с `prs`
+                keys = {(r.user_id, r.exercise_id) for r in records}
+                bests = await self._bests(s, keys, fresh=True)
+                records = _broken(
+                    {k: v for k, v in candidates.items() if (k[0], k[1]) in bests}, bests
+                )
+            if not records:
+                return []
+
+            conn = await s.connection()
+            await conn.execute(_pr_upsert(conn.dialect.name, records))
+            await s.commit()
+
+        for best_key in {(r.user_id, r.exercise_id) for r in records}:
+            self._best.set(best_key, bests[best_key])
+        self.records_broken += len(records)
+        return records
+
+    async def backfill(self, users_per_chunk: int = 500) -> int:
+        """
+        Пересчитать `prs` по всей истории set_logs (например, после смены формулы).
+        Идём пачками пользователей (keyset по users.id), каждая пачка — своя
+        короткая транзакция: delete + bulk insert, без долгих блокировок.
+        """
+        total = 0
+        last_user_id = 0
+        while True:
+            async with self._session_factory() as s:
+                chunk = await s.exec(
+                    select(User.id)
+                    .where(col(User.id) > last_user_id)
+                    .order_by(col(User.id))
+                    .limit(users_per_chunk)
+                )
+                user_ids = [uid for uid in chunk if uid is not None]
+                if not user_ids:
+                    break
+
+                stream = await s.stream(
+                    sa_select(
+                        col(SetLog.user_id), col(WorkoutItem.exercise_id), col(SetLog.ts),
+                        col(SetLog.weight_kg), col(SetLog.reps),
+                    )
+                    .join(WorkoutItem, col(WorkoutItem.id) == col(SetLog.workout_item_id))
+                    .where(col(SetLog.user_id).in_(user_ids))
+                    .order_by(col(SetLog.user_id), col(WorkoutItem.exercise_id), col(SetLog.ts))
+                    .execution_options(yield_per=5000)
+                )
+                # строки идут серверным курсором и сворачиваются по мере чтения
+                best: dict[tuple[int, int], float] = {}
+                daily: dict[tuple[int, int, date_type], float] = {}
+                async for partition in stream.partitions(5000):
+                    self._scan(partition, best, daily)
+                records = [Record(u, e, d, v) for (u, e, d), v in daily.items()]
+
+                table = PR.__table__  # type: ignore[attr-defined]
+                conn = await s.connection()
+                await conn.execute(delete(table).where(table.c.user_id.in_(user_ids)))
+                if records:
+                    await conn.execute(insert(table), [r._asdict() for r in records])
+                await s.commit()
+
+            total += len(records)
+            last_user_id = user_ids[-1]
+            log.info("pr backfill: users <= %s done, %d records so far", last_user_id, total)
+
+        self._best.clear()
+        return total
+
+    def compute_records(self, rows: Iterable[Sequence[Any]]) -> list[Record]:
+        """rows отсортированы по (user, exercise, ts); рекорд — e1RM выше всех предыдущих."""
+        best: dict[tuple[int, int], float] = {}
+        daily: dict[tuple[int, int, date_type], float] = {}
+        self._scan(rows, best, daily)
+        return [Record(u, e, d, v) for (u, e, d), v in daily.items()]
+
+    def _scan(
+        self,
+        rows: Iterable[Sequence[Any]],
+        best: dict[tuple[int, int], float],
+        daily: dict[tuple[int, int, date_type], float],
+    ) -> None:
+        # (user_id, exercise_id, ts, weight, reps); best/daily переживают пачки строк
+        for user_id, ex_id, ts, weight, reps in rows:
+            e1rm = estimate_1rm(float(weight), reps, self.formula)
+            if e1rm > best.get((user_id, ex_id), 0.0):
+                best[(user_id, ex_id)] = e1rm
+                daily[(user_id, ex_id, _as_date(ts))] = e1rm
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "records_broken": self.records_broken,
+            "best_cache_hits": self._best.hits,
+            "best_cache_misses": self._best.misses,
+        }
+
+
+def _as_date(ts: datetime) -> date_type:
+    return ts.date()
+
+
+def _broken(
+    candidates: dict[tuple[int, int, date_type], float], bests: dict[tuple[int, int], float]
+) -> list[Record]:
+    """Кандидаты (лучший e1RM дня) по порядку дат -> побитые рекорды; bests обновляется."""
+    records: list[Record] = []
+    for (u, e, d), e1rm in sorted(candidates.items(), key=lambda kv: kv[0][2]):
+        if e1rm > bests[(u, e)]:
+            bests[(u, e)] = e1rm
+            records.append(Record(u, e, d, e1rm))
+    return records
+
+
+pr_engine = PREngine(formula=settings.PR_FORMULA, best_ttl=settings.PR_BEST_CACHE_TTL_SEC)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute personal records from set_logs")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--formula", choices=sorted(FORMULAS), default=settings.PR_FORMULA)
+    parser.add_argument("--chunk", type=int, default=500, help="users per transaction")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    n = asyncio.run(PREngine(formula=args.formula).backfill(users_per_chunk=args.chunk))
+    log.info("pr backfill finished: %d records", n)
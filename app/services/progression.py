@@ -0,0 +1,309 @@
+# app/services/progression.py
+from __future__ import annotations
+
+import json
+import logging
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, NamedTuple, Protocol
+
+from sqlalchemy import func, select
+from sqlmodel import col
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.db.models import SetLog, WorkoutItem
+from app.services.pr_engine import estimate_1rm
+
+log = logging.getLogger(__name__)
+
+# progression_json:
+#   {"type": "double", "step_kg": 2.5}                       — двойная прогрессия
+#   {"type": "rpe", "target_rpe": 8, "step_kg": 2.5}          — по RPE последнего тяжёлого сета
+#   {"type": "percent_e1rm", "percent": 75, "round_kg": 2.5}  — процент от e1RM за последние сессии
+#   у любого правила: "deload": {"after_stalls": 3, "drop_pct": 10}
+
+
+class ProgressionError(ValueError):
+    pass
+
+
+class SetRow(NamedTuple):
+    weight_kg: float
+    reps: int
+    rpe: float | None
+
+
+class Target(NamedTuple):
+    """Цель на следующую тренировку по пункту плана; weight_kg=None — истории нет."""
+
+    item_id: int
+    exercise_id: int
+    sets: int
+    reps_min: int
+    reps_max: int
+    weight_kg: float | None
+    delta_kg: float = 0.0
+    deload: bool = False
+
+
+# история упражнения: сессии от новой к старой, в каждой — сеты по порядку
+History = Sequence[Sequence[SetRow]]
+
+
+class PlanItem(Protocol):
+    """Поля пункта плана, которые читают правила (CachedItem из plan_cache, WorkoutItem)."""
+
+    @property
+    def id(self) -> int: ...
+    @property
+    def exercise_id(self) -> int: ...
+    @property
+    def sets(self) -> int: ...
+    @property
+    def reps_min(self) -> int: ...
+    @property
+    def reps_max(self) -> int: ...
+    @property
+    def progression_json(self) -> Mapping[str, Any] | None: ...
+
+
+def round_to(value: float, step: float) -> float:
+    return round(round(value / step) * step, 2) if step > 0 else round(value, 2)
+
+
+def _top(session: Sequence[SetRow]) -> tuple[float, list[SetRow]]:
+    top = max(s.weight_kg for s in session)
+    return top, [s for s in session if s.weight_kg == top]
+
+
+@dataclass(frozen=True, slots=True)
+class Deload:
+    after_stalls: int = 3
+    drop_pct: float = 10.0
+
+    def triggered(self, item: PlanItem, history: History) -> bool:
+        """Разгрузка — если after_stalls последних сессий подряд не добраны до reps_min."""
+        if len(history) < self.after_stalls:
+            return False
+        return all(
+            any(s.reps < item.reps_min for s in _top(session)[1])
+            for session in history[:self.after_stalls]
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class Rule(ABC):
+    deload: Deload
+
+    @abstractmethod
+    def next_weight(self, item: PlanItem, history: History, formula: str) -> float:
+        """Вес на следующую тренировку; history не пуста, разгрузку решает evaluate."""
+
+    def evaluate(self, item: PlanItem, history: History, formula: str) -> Target:
+        base = Target(item.id, item.exercise_id, item.sets, item.reps_min, item.reps_max, None)
+        if not history:
+            return base
+        last, _ = _top(history[0])
+        if self.deload.triggered(item, history):
+            weight = round_to(last * (1 - self.deload.drop_pct / 100), 0.5)
+            return base._replace(weight_kg=weight, delta_kg=round(weight - last, 2), deload=True)
+        weight = self.next_weight(item, history, formula)
+        return base._replace(weight_kg=weight, delta_kg=round(weight - last, 2))
+
+
+@dataclass(frozen=True, slots=True)
+class DoubleProgression(Rule):
+    step_kg: float = 2.5
+
+    def next_weight(self, item: PlanItem, history: History, formula: str) -> float:
+        # все рабочие подходы добраны до верхней границы — добавляем вес, иначе добираем повторы
+        last, top_sets = _top(history[0])
+        if len(top_sets) >= item.sets and all(s.reps >= item.reps_max for s in top_sets):
+            return last + self.step_kg
+        return last
+
+
+@dataclass(frozen=True, slots=True)
+class RpeProgression(Rule):
+    target_rpe: float = 8.0
+    step_kg: float = 2.5
+
+    def next_weight(self, item: PlanItem, history: History, formula: str) -> float:
+        last, top_sets = _top(history[0])
+        rpes = [s.rpe for s in top_sets if s.rpe is not None]
+        if not rpes:  # RPE не отмечали — ведём себя как двойная прогрессия
+            return DoubleProgression(self.deload, self.step_kg).next_weight(item, history, formula)
+        rpe = max(rpes)
+        if rpe <= self.target_rpe - 1:
+            return last + self.step_kg
+        if rpe >= self.target_rpe + 1.5:
+            return max(last - self.step_kg, 0.0)
+        return last
+
+
+@dataclass(frozen=True, slots=True)
+class PercentE1RM(Rule):
+    percent: float = 75.0
+    round_kg: float = 2.5
+
+    def next_weight(self, item: PlanItem, history: History, formula: str) -> float:
+        e1rm = max(
+            estimate_1rm(s.weight_kg, s.reps, formula) for session in history for s in session
+        )
+        if e1rm <= 0:
+            return _top(history[0])[0]
+        return round_to(e1rm * self.percent / 100, self.round_kg)
+
+
+RULES: dict[str, type[Rule]] = {
+    "double": DoubleProgression,
+    "rpe": RpeProgression,
+    "percent_e1rm": PercentE1RM,
+}
+# числовые поля правил -> допустимый диапазон
+_FIELDS: dict[str, tuple[float, float]] = {
+    "step_kg": (0, 50), "target_rpe": (5, 10), "percent": (30, 100), "round_kg": (0, 10),
+    "after_stalls": (1, 10), "drop_pct": (1, 50),
+}
+
+
+def _number(spec: Mapping[str, Any], key: str) -> float:
+    value = spec[key]
+    lo, hi = _FIELDS[key]
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not lo <= value <= hi:
+        raise ProgressionError(f"{key} must be a number in [{lo}, {hi}], got {value!r}")
+    return float(value)
+
+
+@lru_cache(maxsize=1024)
+def _compile(key: str) -> Rule:
+    spec = json.loads(key)
+    if not isinstance(spec, dict):
+        raise ProgressionError("progression must be an object")
+    kind = spec.get("type", "double")
+    cls = RULES.get(kind)
+    if cls is None:
+        raise ProgressionError(f"unknown progression type: {kind!r}")
+
+    deload_spec = spec.get("deload") or {}
+    if not isinstance(deload_spec, dict):
+        raise ProgressionError("deload must be an object")
+    unknown = set(deload_spec) - {"after_stalls", "drop_pct"}
+    if unknown:
+        raise ProgressionError(f"unknown deload fields: {sorted(unknown)}")
+    deload = Deload(
+        after_stalls=(
+            int(_number(deload_spec, "after_stalls")) if "after_stalls" in deload_spec else 3
+        ),
+        drop_pct=_number(deload_spec, "drop_pct") if "drop_pct" in deload_spec else 10.0,
+    )
+
+    allowed = {f for f in cls.__dataclass_fields__ if f != "deload"}
+    unknown = set(spec) - allowed - {"type", "deload"}
+    if unknown:
+        raise ProgressionError(f"unknown fields for {kind!r}: {sorted(unknown)}")
+    return cls(deload, **{k: _number(spec, k) for k in spec if k in allowed})
+
+
+def compile_rule(progression: Mapping[str, Any] | None) -> Rule:
+    """
+    progression_json -> проверенный неизменяемый объект правила. Кэш по
+    каноничному JSON: одинаковые правила (а их в планах — единицы) разбираются один раз.
+    """
+    return _compile(json.dumps(progression or {}, sort_keys=True))
+
+
+DEFAULT_RULE = compile_rule({"type": "double"})
+
+
+class ProgressionEngine:
+    """
+    Цели на следующую тренировку для целого дня плана: история всех его упражнений —
+    одним запросом (последние history_sessions сессий на упражнение), правила — из кэша.
+    История ограничена последними history_weeks неделями: стоимость /today не растёт
+    с возрастом аккаунта, а секции set_logs по ts старше окна не читаются.
+    """
+
+    def __init__(
+        self,
+        history_sessions: int = 4,
+        formula: str = "epley",
+        history_weeks: int = 12,
+        clock: Callable[[], datetime] = datetime.utcnow,
+    ) -> None:
+        self.history_sessions = history_sessions
+        self.formula = formula
+        self.history_weeks = history_weeks
+        self._clock = clock
+        self.invalid_rules = 0
+
+    async def history(
+        self, session: AsyncSession, user_id: int, exercise_ids: Sequence[int]
+    ) -> dict[int, list[list[SetRow]]]:
+        if not exercise_ids:
+            return {}
+        since = self._clock() - timedelta(weeks=self.history_weeks)
+        rank = func.dense_rank().over(
+            partition_by=col(WorkoutItem.exercise_id), order_by=col(SetLog.session_id).desc()
+        ).label("rank")
+        # select из sqlalchemy: у sqlmodel.select перегрузки только до 4 колонок
+        ranked = (
+            select(
+                col(WorkoutItem.exercise_id), col(SetLog.session_id), col(SetLog.set_index),
+                col(SetLog.id), col(SetLog.weight_kg), col(SetLog.reps), col(SetLog.rpe), rank,
+            )
+            .join(WorkoutItem, col(WorkoutItem.id) == col(SetLog.workout_item_id))
+            .where(
+                col(SetLog.user_id) == user_id,
+                col(SetLog.ts) >= since,
+                col(WorkoutItem.exercise_id).in_(set(exercise_ids)),
+            )
+            .subquery()
+        )
+        c = ranked.c
+        conn = await session.connection()
+        rows = await conn.execute(
+            select(c.exercise_id, c.session_id, c.weight_kg, c.reps, c.rpe)
+            .where(c.rank <= self.history_sessions)
+            .order_by(c.exercise_id, c.session_id.desc(), c.set_index, c.id)
+        )
+        out: dict[int, list[list[SetRow]]] = {}
+        last: tuple[int, int] | None = None
+        for exercise_id, session_id, weight, reps, rpe in rows:
+            sessions = out.setdefault(exercise_id, [])
+            if last != (exercise_id, session_id):
+                sessions.append([])
+                last = (exercise_id, session_id)
+            sessions[-1].append(SetRow(float(weight), reps, rpe))
+        return out
+
+    def rule_for(self, item: PlanItem) -> Rule:
+        try:
+            return compile_rule(item.progression_json)
+        except (ProgressionError, TypeError, ValueError) as e:
+            self.invalid_rules += 1
+            log.warning("workout item %s: bad progression_json (%s), using default", item.id, e)
+            return DEFAULT_RULE
+
+    async def evaluate_day(
+        self, session: AsyncSession, user_id: int, items: Sequence[PlanItem]
+    ) -> list[Target]:
+        history = await self.history(session, user_id, [i.exercise_id for i in items])
+        return [
+            self.rule_for(item).evaluate(item, history.get(item.exercise_id, []), self.formula)
+            for item in items
+        ]
+
+    def stats(self) -> dict[str, int]:
+        info = _compile.cache_info()
+        return {"rules_cached": info.currsize, "rule_hits": info.hits, "rule_misses": info.misses,
+                "invalid_rules": self.invalid_rules}
+
+
+progression_engine = ProgressionEngine(
+    formula=settings.PR_FORMULA, history_weeks=settings.PROGRESSION_HISTORY_WEEKS
+)
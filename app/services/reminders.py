@@ -0,0 +1,357 @@
+# app/services/reminders.py
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import re
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from sqlalchemy import case, literal, select as sa_select, tuple_, update
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.aio import sleep_or_wakeup
+from app.core.config import settings
+from app.core.tz import to_local, zone
+from app.db.hooks import after_commit
+from app.db.models import Reminder, User
+from app.db.session import async_session_factory
+
+log = logging.getLogger(__name__)
+
+_table = Reminder.__table__  # type: ignore[attr-defined]
+
+ALL_DAYS = 0b1111111
+WEEKDAY_NAMES = ("пн", "вт", "ср", "чт", "пт", "сб", "вс")
+REMINDER_TEXT = "⏰ Пора на тренировку! Начать — /today"
+
+_TIME_RE = re.compile(r"^([01]?\d|2[0-3])[:.]([0-5]\d)$")
+
+# (tg_id, text) -> доставка; в боте — постановка в очередь исходящих (app.telegram.outbound)
+Sender = Callable[[int, str], Awaitable[Any]]
+
+
+# --------- расписание ----------
+
+def next_fire(
+    after: datetime, tz: str | None, weekdays: int, minute_of_day: int
+) -> datetime | None:
+    """
+    Ближайшее срабатывание строго позже after (naive UTC) по часам пользователя.
+
+    Стенное время строим в зоне пользователя и переводим в UTC, поэтому смена
+    летнего/зимнего времени учитывается сама: несуществующее время (весенний
+    переход) сдвигается вперёд, повторяющееся (осенний) срабатывает один раз — первым.
+    """
+    if not weekdays & ALL_DAYS:
+        return None
+    z = zone(tz)
+    today = to_local(after, tz).date()
+    hh, mm = divmod(minute_of_day, 60)
+    for delta in range(8):
+        d = today + timedelta(days=delta)
+        if not weekdays >> d.weekday() & 1:
+            continue
+        local = datetime(d.year, d.month, d.day, hh, mm, tzinfo=z)
+        fire = local.astimezone(UTC).replace(tzinfo=None)
+        if fire > after:
+            return fire
+    return None
+
+
+def parse_schedule(text: str) -> tuple[int, int] | None:
+    """«пн ср пт 07:30» / «ежедневно 19:00» -> (weekdays, minute_of_day)."""
+    tokens = text.lower().replace(",", " ").split()
+    if not tokens or not (m := _TIME_RE.match(tokens[-1])):
+        return None
+    days = 0
+    for token in tokens[:-1]:
+        if token in ("ежедневно", "каждый", "день", "все"):
+            days = ALL_DAYS
+        elif token in WEEKDAY_NAMES:
+            days |= 1 << WEEKDAY_NAMES.index(token)
+        else:
+            return None
+    return days or ALL_DAYS, int(m.group(1)) * 60 + int(m.group(2))
+
+
+def format_schedule(weekdays: int, minute_of_day: int) -> str:
+    days = "ежедневно" if weekdays & ALL_DAYS == ALL_DAYS else " ".join(
+        name for i, name in enumerate(WEEKDAY_NAMES) if weekdays >> i & 1
+    )
+    return f"{days} в {minute_of_day // 60:02d}:{minute_of_day % 60:02d}"
+
+
+# --------- шедулер ----------
+
+class _Entry:
+    __slots__ = ("fire_at", "id", "minute_of_day", "tg_id", "tz", "weekdays")
+
+    def __init__(
+        self,
+        id: int,  # noqa: A002
+        fire_at: datetime,
+        tg_id: int,
+        tz: str | None,
+        weekdays: int,
+        minute_of_day: int,
+    ) -> None:
+        self.id = id
+        self.fire_at = fire_at
+        self.tg_id = tg_id
+        self.tz = tz
+        self.weekdays = weekdays
+        self.minute_of_day = minute_of_day
+
+
+class ReminderScheduler:
+    """
+    Напоминания по next_fire_at из БД + min-heap в памяти.
+
+    В памяти только то, что сработает в ближайшие horizon секунд: окно
+    подгружается страницами (keyset по (next_fire_at, id)) по мере движения
+    времени, так что 100k+ пользователей не означают 100k+ таймеров.
+    Срабатывание — один UPDATE на пачку: next_fire_at сдвигается на следующее
+    время только если в БД всё ещё то, что в куче («claim»), поэтому
+    несколько процессов (webhook-воркеры) не шлют одно напоминание дважды,
+    а после рестарта шедулер продолжает с сохранённых next_fire_at.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession] = async_session_factory,
+        horizon: float = 3600,
+        page_size: int = 1000,
+        misfire_grace: float = 900,
+        clock: Callable[[], datetime] = datetime.utcnow,
+    ) -> None:
+        self._session_factory = session_factory
+        self.horizon = timedelta(seconds=horizon)
+        self.page_size = page_size
+        self.misfire_grace = timedelta(seconds=misfire_grace)
+        self._clock = clock
+        self._heap: list[tuple[datetime, int]] = []
+        self._entries: dict[int, _Entry] = {}
+        # всё с next_fire_at <= loaded_until уже в куче
+        self._loaded_until: datetime | None = None
+        self._send: Sender | None = None
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self.fired = 0
+        self.missed = 0
+        self.pages_loaded = 0
+
+    # --- загрузка окна ---
+
+    async def _load(self, until: datetime) -> None:
+        start = self._loaded_until
+        cursor: tuple[datetime, int] | None = None
+        fire_at, reminder_id = col(Reminder.next_fire_at), col(Reminder.id)
+        async with self._session_factory() as s:
+            conn = await s.connection()
+            while True:
+                # select из sqlalchemy: у sqlmodel.select перегрузки только до 4 колонок
+                stmt = (
+                    sa_select(reminder_id, fire_at, col(User.tg_id), col(User.tz),
+                              col(Reminder.weekdays), col(Reminder.minute_of_day))
+                    .join(User, col(User.id) == col(Reminder.user_id))
+                    .where(col(Reminder.enabled), fire_at <= until)
+                    .order_by(fire_at, reminder_id)
+                    .limit(self.page_size)
+                )
+                if cursor is not None:
+                    after = tuple_(literal(cursor[0]), literal(cursor[1]))
+                    stmt = stmt.where(tuple_(fire_at, reminder_id) > after)
+                elif start is not None:
+                    stmt = stmt.where(fire_at > start)
+                rows = list(await conn.execute(stmt))
+                self.pages_loaded += 1
+                for row in rows:
+                    self._push(_Entry(*row))
+                if len(rows) < self.page_size:
+                    break
+                cursor = (rows[-1][1], rows[-1][0])
+        self._loaded_until = until
+
+    def _push(self, entry: _Entry) -> None:
+        self._entries[entry.id] = entry
+        heapq.heappush(self._heap, (entry.fire_at, entry.id))
+
+    def _pop_due(self, now: datetime) -> list[_Entry]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            fire_at, reminder_id = heapq.heappop(self._heap)
+            entry = self._entries.get(reminder_id)
+            # перевзвод оставляет старую запись в куче — пропускаем её
+            if entry is not None and entry.fire_at == fire_at:
+                del self._entries[reminder_id]
+                due.append(entry)
+        return due
+
+    # --- срабатывание ---
+
+    async def _claim(self, due: list[_Entry], now: datetime) -> dict[int, datetime | None]:
+        """Сдвинуть next_fire_at тем, у кого в БД он всё ещё наш; вернуть {id: новое время}."""
+        # пропущенные за простой считаем от now, а не догоняем по одному
+        nxt = {
+            e.id: next_fire(e.fire_at if now - e.fire_at <= self.misfire_grace else now,
+                            e.tz, e.weekdays, e.minute_of_day)
+            for e in due
+        }
+        async with self._session_factory() as s:
+            conn = await s.connection()
+            claimed = await conn.execute(
+                update(_table)
+                # id IN (...) — поиск по PK; сравнение с CASE проверяет, что next_fire_at не менялся
+                .where(
+                    _table.c.id.in_(nxt),
+                    _table.c.next_fire_at
+                    == case({e.id: e.fire_at for e in due}, value=_table.c.id),
+                )
+                .values(next_fire_at=case(nxt, value=_table.c.id))
+                .returning(_table.c.id)
+            )
+            ids = {row[0] for row in claimed}
+            await s.commit()
+        return {i: nxt[i] for i in ids}
+
+    async def tick(self, now: datetime | None = None) -> int:
+        """Одна итерация: дозагрузить окно, отправить наступившие; вернуть число отправленных."""
+        now = now or self._clock()
+        if self._loaded_until is None or self._loaded_until - now < self.horizon / 2:
+            await self._load(now + self.horizon)
+
+        assert self._loaded_until is not None
+        sent = 0
+        while due := self._pop_due(now):
+            for i in range(0, len(due), self.page_size):
+                chunk = due[i:i + self.page_size]
+                claimed = await self._claim(chunk, now)
+                for e in chunk:
+                    if e.id not in claimed:
+                        continue  # сдвинул другой процесс или пользователь перенастроил
+                    nxt = claimed[e.id]
+                    if nxt is not None and nxt <= self._loaded_until:
+                        self._push(_Entry(e.id, nxt, e.tg_id, e.tz, e.weekdays, e.minute_of_day))
+                    # после долгого простоя старые напоминания не досылаем
+                    if now - e.fire_at > self.misfire_grace:
+                        self.missed += 1
+                        continue
+                    sent += await self._deliver(e)
+        return sent
+
+    async def _deliver(self, e: _Entry) -> int:
+        if self._send is None:
+            return 0
+        try:
+            await self._send(e.tg_id, REMINDER_TEXT)
+        except Exception:
+            log.exception("reminder %s to %s failed", e.id, e.tg_id)
+            return 0
+        self.fired += 1
+        return 1
+
+    # --- перевзвод при правке настроек ---
+
+    async def set_schedule(
+        self,
+        session: AsyncSession,
+        user: User,
+        weekdays: int,
+        minute_of_day: int,
+        enabled: bool = True,
+    ) -> Reminder:
+        """Создать/изменить расписание пользователя; commit — на вызывающем."""
+        reminder = (await session.exec(select(Reminder).where(Reminder.user_id == user.id))).first()
+        if reminder is None:
+            reminder = Reminder(user_id=user.id)
+        reminder.weekdays = weekdays
+        reminder.minute_of_day = minute_of_day
+        reminder.enabled = enabled and bool(weekdays)
+        reminder.updated_at = datetime.utcnow()
+        session.add(reminder)
+        await self._rearm(session, reminder, user)
+        return reminder
+
+    async def rearm_user(self, session: AsyncSession, user: User) -> None:
+        """Пользователь сменил TZ — пересчитать next_fire_at его напоминания."""
+        reminder = (await session.exec(select(Reminder).where(Reminder.user_id == user.id))).first()
+        if reminder is not None:
+            await self._rearm(session, reminder, user)
+
+    async def _rearm(self, session: AsyncSession, reminder: Reminder, user: User) -> None:
+        now = self._clock()
+        reminder.next_fire_at = (
+            next_fire(now, user.tz, reminder.weekdays, reminder.minute_of_day)
+            if reminder.enabled
+            else None
+        )
+        await session.flush()
+        assert reminder.id is not None
+        reminder_id, fire_at = reminder.id, reminder.next_fire_at
+        entry = None if fire_at is None else _Entry(
+            reminder_id, fire_at, user.tg_id, user.tz, reminder.weekdays, reminder.minute_of_day
+        )
+        # куча меняется только после commit: при откате в БД остаётся старое время,
+        # и срабатывать должно оно
+        after_commit(session, lambda: self._rearm_entry(reminder_id, entry))
+
+    def _rearm_entry(self, reminder_id: int, entry: _Entry | None) -> None:
+        # старая запись в куче станет «устаревшей» и будет пропущена в _pop_due
+        self._entries.pop(reminder_id, None)
+        until = self._loaded_until
+        if entry is not None and until is not None and entry.fire_at <= until:
+            self._push(entry)
+            self._wakeup.set()
+
+    # --- фоновый цикл ---
+
+    async def run(self, send: Sender, max_sleep: float = 60) -> None:
+        self._send = send
+        while True:
+            try:
+                await self.tick()
+            except Exception:
+                log.exception("reminder tick failed")
+            now = self._clock()
+            wait = max_sleep
+            if self._heap:
+                wait = min(wait, (self._heap[0][0] - now).total_seconds())
+            if self._loaded_until is not None:
+                wait = min(wait, (self._loaded_until - self.horizon / 2 - now).total_seconds())
+            await sleep_or_wakeup(self._wakeup, max(wait, 0.01))
+
+    async def start(self, bot: Any) -> None:
+        """dp.startup-хук: aiogram передаёт bot. Отправка — через очередь исходящих, полоса BULK."""
+        from app.telegram.outbound import BULK, outbound
+
+        async def send(chat_id: int, text: str) -> None:
+            outbound.send_message(bot, chat_id, text, priority=BULK, coalesce=True)
+
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(send))
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "armed": len(self._entries),
+            "heap": len(self._heap),
+            "fired": self.fired,
+            "missed": self.missed,
+            "pages_loaded": self.pages_loaded,
+        }
+
+
+reminder_scheduler = ReminderScheduler(
+    horizon=settings.REMINDER_HORIZON_SEC,
+    page_size=settings.REMINDER_PAGE_SIZE,
+    misfire_grace=settings.REMINDER_MISFIRE_GRACE_SEC,
+)
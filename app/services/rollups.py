@@ -0,0 +1,264 @@
+# app/services/rollups.py
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+from collections.abc import Callable, Iterable, Sequence
+from datetime import date as date_type, datetime, timedelta
+from typing import Any
+
+from sqlalchemy import delete, insert, select as sa_select
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.cache import TTLLRUCache
+from app.core.tz import to_local
+from app.db.dialect import upsert
+from app.db.models import Exercise, SetLog, User, WeeklyMuscleVolume, WorkoutItem
+from app.db.session import async_session_factory
+
+log = logging.getLogger(__name__)
+
+_table = WeeklyMuscleVolume.__table__  # type: ignore[attr-defined]
+
+# (user_id, week_start, muscle) -> [sets, reps, tonnage]
+Deltas = dict[tuple[int, date_type, str], list[float]]
+
+
+def local_week_start(ts: datetime, tz: str | None) -> date_type:
+    """Понедельник ISO-недели, в которую ts (naive UTC) попадает по часам пользователя."""
+    d = to_local(ts, tz).date()
+    return d - timedelta(days=d.weekday())
+
+
+def aggregate(rows: Iterable[Sequence[Any]], sign: int = 1, into: Deltas | None = None) -> Deltas:
+    """
+    (user_id, week_start, ts, tz, muscle, reps, weight) -> дельты по ключам rollup'а.
+    week_start — сохранённый в set_logs; None (старые строки) — по ts в TZ пользователя.
+    """
+    out: Deltas = {} if into is None else into
+    for user_id, week, ts, tz, muscle, reps, weight in rows:
+        key = (user_id, week or local_week_start(ts, tz), muscle or "")
+        acc = out.setdefault(key, [0, 0, 0.0])
+        acc[0] += sign
+        acc[1] += sign * reps
+        acc[2] += sign * reps * float(weight)
+    return out
+
+
+class WeeklyRollups:
+    """
+    Таблица weekly_muscle_volume: sets/reps/tonnage на (user, неделя в User.tz, мышца).
+
+    Обновляется дельтами в той же транзакции, что и запись SetLog
+    (tx-хук SetLogWriter, update_set_log для правок), поэтому чтение недели —
+    это поиск по уникальному индексу, а не агрегат по всей истории.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession] = async_session_factory,
+        cache_size: int = 100_000,
+        tz_ttl: float = 300,
+    ) -> None:
+        self._session_factory = session_factory
+        self._muscle_by_item: TTLLRUCache[int, str] = TTLLRUCache(maxsize=cache_size)
+        # TZ пользователь может поменять в /settings — держим недолго
+        self._tz_by_user: TTLLRUCache[int, str] = TTLLRUCache(maxsize=cache_size, ttl=tz_ttl)
+
+    async def _muscles(self, conn: AsyncConnection, item_ids: set[int]) -> dict[int, str]:
+        out = {i: m for i in item_ids if (m := self._muscle_by_item.get(i)) is not None}
+        missing = item_ids - out.keys()
+        if missing:
+            rows = await conn.execute(
+                select(WorkoutItem.id, Exercise.muscle)
+                .join(Exercise, col(Exercise.id) == col(WorkoutItem.exercise_id))
+                .where(col(WorkoutItem.id).in_(missing))
+            )
+            for item_id, muscle in rows:
+                out[item_id] = muscle or ""
+                self._muscle_by_item.set(item_id, out[item_id])
+        return out
+
+    async def _tzs(self, conn: AsyncConnection, user_ids: set[int]) -> dict[int, str]:
+        out = {u: tz for u in user_ids if (tz := self._tz_by_user.get(u)) is not None}
+        missing = user_ids - out.keys()
+        if missing:
+            users = await conn.execute(select(User.id, User.tz).where(col(User.id).in_(missing)))
+            for user_id, tz in users:
+                out[user_id] = tz
+                self._tz_by_user.set(user_id, tz)
+        return out
+
+    async def stamp_weeks(self, conn: AsyncConnection, rows: list[dict[str, Any]]) -> None:
+        """
+        Row-хук SetLogWriter: week_start по ts в TZ пользователя строкам без него —
+        в dict'ах до INSERT, без отдельного UPDATE по set_logs.
+        """
+        todo = [r for r in rows if r.get("week_start") is None]
+        if not todo:
+            return
+        tzs = await self._tzs(conn, {r["user_id"] for r in todo})
+        for r in todo:
+            r["week_start"] = local_week_start(r["ts"], tzs.get(r["user_id"]))
+
+    async def apply(self, conn: AsyncConnection, rows: list[dict[str, Any]], sign: int = 1) -> None:
+        """Добавить (sign=1) или вычесть (sign=-1) сеты из rollup'а; commit — на вызывающем."""
+        if not rows:
+            return
+        item_ids = {r["workout_item_id"] for r in rows if r.get("workout_item_id")}
+        muscles = await self._muscles(conn, item_ids)
+        # TZ нужна только строкам без сохранённой недели
+        tzs = await self._tzs(conn, {r["user_id"] for r in rows if r.get("week_start") is None})
+        deltas = aggregate(
+            (
+                (
+                    r["user_id"], r.get("week_start"), r["ts"], tzs.get(r["user_id"]),
+                    muscles.get(r.get("workout_item_id") or 0), r["reps"], r["weight_kg"],
+                )
+                for r in rows
+            ),
+            sign=sign,
+        )
+        stmt = upsert(conn.dialect.name, _table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "week_start", "muscle"],
+            set_={
+                "sets": _table.c.sets + stmt.excluded.sets,
+                "reps": _table.c.reps + stmt.excluded.reps,
+                "tonnage_kg": _table.c.tonnage_kg + stmt.excluded.tonnage_kg,
+            },
+        )
+        await conn.execute(stmt, _delta_rows(deltas))
+
+    async def on_sets(self, conn: AsyncConnection, rows: list[dict[str, Any]]) -> None:
+        await self.apply(conn, rows, sign=1)
+
+    async def update_set_log(
+        self, session: AsyncSession, set_log: SetLog, **changes: Any
+    ) -> SetLog:
+        """
+        Правка сета: минус старые значения из той недели, куда сет был посчитан
+        (set_logs.week_start), плюс новые — в транзакции вызывающего. Неделя
+        пересчитывается (по текущей TZ) только если сменилось время сета.
+        """
+        fields = ("user_id", "workout_item_id", "ts", "weight_kg", "reps", "week_start")
+        conn = await session.connection()
+        before = {f: getattr(set_log, f) for f in fields}
+        await self.stamp_weeks(conn, [before])
+        after = {**before, **{k: v for k, v in changes.items() if k in fields}}
+        after["week_start"] = None if after["ts"] != before["ts"] else before["week_start"]
+        await self.stamp_weeks(conn, [after])
+        # неделя уходит тем же UPDATE, что и сама правка
+        for k, v in {**changes, "week_start": after["week_start"]}.items():
+            setattr(set_log, k, v)
+        session.add(set_log)
+        await session.flush()
+
+        await self.apply(conn, [before], sign=-1)
+        await self.apply(conn, [after], sign=1)
+        return set_log
+
+    async def get_volume(
+        self, session: AsyncSession, user_id: int, week_start: date_type, muscle: str = ""
+    ) -> WeeklyMuscleVolume | None:
+        return (
+            await session.exec(
+                select(WeeklyMuscleVolume).where(
+                    WeeklyMuscleVolume.user_id == user_id,
+                    WeeklyMuscleVolume.week_start == week_start,
+                    WeeklyMuscleVolume.muscle == muscle,
+                )
+            )
+        ).first()
+
+    async def get_week(
+        self, session: AsyncSession, user_id: int, week_start: date_type
+    ) -> list[WeeklyMuscleVolume]:
+        return list(
+            await session.exec(
+                select(WeeklyMuscleVolume).where(
+                    WeeklyMuscleVolume.user_id == user_id,
+                    WeeklyMuscleVolume.week_start == week_start,
+                )
+            )
+        )
+
+    async def rebuild(self, users_per_chunk: int = 500) -> int:
+        """
+        Пересобрать rollup из set_logs: пачки пользователей, каждая — своя транзакция.
+        Строки читаются серверным курсором и агрегируются по мере чтения — в памяти
+        только дельты (пользователи x недели x мышцы), а не история сетов.
+        """
+        total = 0
+        last_user_id = 0
+        while True:
+            async with self._session_factory() as s:
+                user_ids: list[int] = [
+                    u for u in await s.exec(
+                        select(User.id)
+                        .where(col(User.id) > last_user_id)
+                        .order_by(col(User.id))
+                        .limit(users_per_chunk)
+                    )
+                    if u is not None
+                ]
+                if not user_ids:
+                    break
+
+                stream = await s.stream(
+                    # select из sqlalchemy: у sqlmodel.select перегрузки только до 4 колонок
+                    sa_select(
+                        col(SetLog.user_id), col(SetLog.week_start), col(SetLog.ts), col(User.tz),
+                        col(Exercise.muscle), col(SetLog.reps), col(SetLog.weight_kg),
+                    )
+                    .join(User, col(User.id) == col(SetLog.user_id))
+                    .outerjoin(WorkoutItem, col(WorkoutItem.id) == col(SetLog.workout_item_id))
+                    .outerjoin(Exercise, col(Exercise.id) == col(WorkoutItem.exercise_id))
+                    .where(col(SetLog.user_id).in_(user_ids))
+                    .execution_options(yield_per=5000)
+                )
+                deltas: Deltas = {}
+                async for partition in stream.partitions(5000):
+                    aggregate(partition, into=deltas)
+
+                conn = await s.connection()
+                await conn.execute(delete(_table).where(_table.c.user_id.in_(user_ids)))
+                if deltas:
+                    await conn.execute(insert(_table), _delta_rows(deltas))
+                await s.commit()
+
+            total += len(deltas)
+            last_user_id = user_ids[-1]
+            log.info("rollup rebuild: users <= %s done, %d rows so far", last_user_id, total)
+
+        self._tz_by_user.clear()
+        return total
+
+
+def _delta_rows(deltas: Deltas) -> list[dict[str, Any]]:
+    return [
+        {
+            "user_id": u, "week_start": w, "muscle": m,
+            "sets": int(sets), "reps": int(reps), "tonnage_kg": round(tonnage, 2),
+        }
+        for (u, w, m), (sets, reps, tonnage) in deltas.items()
+    ]
+
+
+weekly_rollups = WeeklyRollups()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild weekly per-muscle volume rollups")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--chunk", type=int, default=500, help="users per transaction")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    n = asyncio.run(WeeklyRollups().rebuild(users_per_chunk=args.chunk))
+    log.info("rollup rebuild finished: %d rows", n)
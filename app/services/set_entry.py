@@ -0,0 +1,49 @@
+# app/services/set_entry.py
+from __future__ import annotations
+
+import re
+from typing import NamedTuple
+
+# «100x5x3 @8»: вес × повторы [× подходы] [@RPE]; x/х/*/× — любой разделитель,
+# дробные — через точку или запятую. Несколько записей — через «;» или перенос строки.
+_NUM = r"\d+(?:[.,]\d+)?"
+SET_ENTRY_RE = re.compile(
+    rf"^\s*(?P<weight>{_NUM})\s*[xх×*]\s*(?P<reps>\d+)"
+    rf"(?:\s*[xх×*]\s*(?P<sets>\d+))?"
+    rf"(?:\s*@\s*(?P<rpe>{_NUM}))?\s*$",
+    re.IGNORECASE,
+)
+
+MAX_SETS_PER_ENTRY = 20
+
+
+class SetEntry(NamedTuple):
+    weight_kg: float
+    reps: int
+    rpe: float | None
+
+
+def _num(s: str) -> float:
+    return float(s.replace(",", "."))
+
+
+def parse_set_entry(text: str) -> list[SetEntry] | None:
+    """
+    Разбирает сообщение в список сетов (по одному на подход).
+    None — если хоть одна часть не похожа на запись сета.
+    """
+    parts = [p for p in re.split(r"[;\n]", text or "") if p.strip()]
+    if not parts:
+        return None
+
+    out: list[SetEntry] = []
+    for part in parts:
+        m = SET_ENTRY_RE.match(part)
+        if m is None:
+            return None
+        sets = int(m["sets"] or 1)
+        rpe = _num(m["rpe"]) if m["rpe"] else None
+        if not 1 <= sets <= MAX_SETS_PER_ENTRY or (rpe is not None and rpe > 10):
+            return None
+        out.extend([SetEntry(_num(m["weight"]), int(m["reps"]), rpe)] * sets)
+    return out
@@ -0,0 +1,197 @@
+# app/services/set_log_writer.py
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.db.models import SetLog
+from app.db.routing import ReadRouter
+from app.db.session import async_session_factory, db_router
+
+log = logging.getLogger(__name__)
+
+_table = SetLog.__table__  # type: ignore[attr-defined]
+_columns = [c.name for c in _table.columns if c.name != "id"]
+
+# слушатель получает записанные строки (dict колонок вместе с id) после commit;
+# результат слушателя (например, побитые рекорды PR-движка) не используется
+Listener = Callable[[list[dict[str, Any]]], Awaitable[Any]]
+# tx-хук — те же строки, но до commit и в той же транзакции (агрегаты и т.п.)
+TxHook = Callable[[AsyncConnection, list[dict[str, Any]]], Awaitable[None]]
+# row-хук — строки до INSERT (ещё без id): дописать вычисляемые колонки в dict'ы
+RowHook = TxHook
+
+
+# одна пачка строк от одного submit() и её future (id строк в том же порядке)
+_Submit = tuple[list[dict[str, Any]], asyncio.Future[list[int]]]
+
+
+class SetLogWriter:
+    """
+    Буферизованная запись SetLog: строки от разных пользователей копятся и
+    уходят одним multi-row INSERT (insertmanyvalues) + одним COMMIT — по
+    достижении max_batch строк или через max_delay секунд после первой.
+
+    submit() возвращает id строк только после commit — это и есть «durable ack»:
+    подтверждение пользователю отправляется после него.
+    Row-хуки (add_row_hook) дописывают колонки до INSERT, tx-хуки (add_tx_hook)
+    выполняются после него — всё в одной транзакции.
+    Если общая транзакция упала (плохая строка, ошибка хука), каждый submit
+    повторяется в своей — ошибку получает только виновный.
+    После ack пачка отдаётся слушателям (PR-движок и т.п.) фоновыми задачами,
+    см. add_listener().
+
+    Записавших пользователей writer сам отмечает в ReadRouter до ack: INSERT идёт
+    не через сессию апдейта, и DbSessionMiddleware (по query_usage) этой записи
+    не видит — а журнал сразу после сета должен читаться с primary.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession] = async_session_factory,
+        max_batch: int = 500,
+        max_delay: float = 0.05,
+        router: ReadRouter = db_router,
+    ) -> None:
+        self._session_factory = session_factory
+        self._router = router
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._buffer: list[_Submit] = []
+        self._buffered_rows = 0
+        self._timer: asyncio.TimerHandle | None = None
+        self._flush_lock = asyncio.Lock()
+        self._pending: set[asyncio.Task[None]] = set()
+        self._listeners: list[Listener] = []
+        self._row_hooks: list[RowHook] = []
+        self._tx_hooks: list[TxHook] = []
+        self.flushes = 0
+        self.rows_written = 0
+        self.retries = 0
+
+    def add_listener(self, listener: Listener) -> None:
+        self._listeners.append(listener)
+
+    def add_row_hook(self, hook: RowHook) -> None:
+        self._row_hooks.append(hook)
+
+    def add_tx_hook(self, hook: TxHook) -> None:
+        self._tx_hooks.append(hook)
+
+    async def submit(self, rows: list[SetLog]) -> list[int]:
+        if not rows:
+            return []
+        loop = asyncio.get_running_loop()
+        fut: asyncio.Future[list[int]] = loop.create_future()
+        self._buffer.append(([row.model_dump(include=set(_columns)) for row in rows], fut))
+        self._buffered_rows += len(rows)
+
+        if self._buffered_rows >= self.max_batch:
+            self._schedule_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._schedule_flush)
+        return await fut
+
+    def _schedule_flush(self) -> None:
+        self._track(self.flush())
+
+    def _track(self, coro: Awaitable[None]) -> None:
+        task = asyncio.ensure_future(coro)
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            while self._buffer:
+                # submit не дробим: пачка — целые submit'ы, пока не наберётся max_batch строк
+                size, n = len(self._buffer[0][0]), 1
+                while n < len(self._buffer) and size + len(self._buffer[n][0]) <= self.max_batch:
+                    size += len(self._buffer[n][0])
+                    n += 1
+                batch, self._buffer = self._buffer[:n], self._buffer[n:]
+                self._buffered_rows -= size
+                await self._write(batch)
+
+    async def _insert(self, batch: list[_Submit]) -> list[dict[str, Any]]:
+        stmt = insert(_table).returning(_table.c.id, sort_by_parameter_order=True)
+        rows = [row for submit_rows, _ in batch for row in submit_rows]
+        async with self._session_factory() as s:
+            conn = await s.connection()
+            for row_hook in self._row_hooks:
+                await row_hook(conn, rows)
+            result = await conn.execute(stmt, rows)
+            ids = result.scalars()
+            written = [{**row, "id": row_id} for row, row_id in zip(rows, ids, strict=True)]
+            for hook in self._tx_hooks:
+                await hook(conn, written)
+            await s.commit()
+        return written
+
+    async def _write(self, batch: list[_Submit]) -> None:
+        try:
+            written = await self._insert(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                log.exception("set log flush failed (%d rows)", len(batch[0][0]))
+                if not batch[0][1].done():
+                    batch[0][1].set_exception(e)
+                return
+            # одна строка или хук валит всю пачку: повторяем по submit'ам
+            log.warning(
+                "set log batch of %d submits failed, retrying one by one", len(batch), exc_info=True
+            )
+            self.retries += 1
+            for submit in batch:
+                await self._write([submit])
+            return
+
+        self.flushes += 1
+        self.rows_written += len(written)
+        for user_id in {row["user_id"] for row in written}:
+            self._router.mark_write(user_id)
+        offset = 0
+        for submit_rows, fut in batch:
+            if not fut.done():
+                fut.set_result([row["id"] for row in written[offset : offset + len(submit_rows)]])
+            offset += len(submit_rows)
+
+        # слушатели — после ack и не задерживая следующую пачку; ошибки только логируем
+        for listener in self._listeners:
+            self._track(self._notify(listener, written))
+
+    @staticmethod
+    async def _notify(listener: Listener, written: list[dict[str, Any]]) -> None:
+        try:
+            await listener(written)
+        except Exception:
+            log.exception("set log listener %r failed", listener)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "buffered": self._buffered_rows,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "retries": self.retries,
+        }
+
+    async def close(self) -> None:
+        # на остановке дописываем всё, что осталось в буфере, и дожидаемся слушателей
+        await self.flush()
+        while self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+
+set_log_writer = SetLogWriter(
+    max_batch=settings.SETLOG_BATCH_SIZE,
+    max_delay=settings.SETLOG_FLUSH_DELAY_SEC,
+)
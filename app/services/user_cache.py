@@ -0,0 +1,107 @@
+# app/services/user_cache.py
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any
+
+from app.core.cache import TTLLRUCache
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.db.models import User
+
+log = logging.getLogger(__name__)
+
+Snapshot = dict[str, Any]
+
+
+class UserProfileCache:
+    """
+    Кэш профилей по tg_id: L1 — TTL+LRU в процессе, L2 — Redis (если задан REDIS_URL).
+
+    Храним не ORM-объекты, а json-снимки колонок: объект User привязан к своей
+    сессии, а снимок можно смёржить в любую (см. DbSessionMiddleware).
+    Запись — write-through: после commit новый снимок кладётся в оба уровня.
+    """
+
+    key_prefix = "gymcoach:user:"
+
+    def __init__(
+        self,
+        redis_url: str | None = None,
+        maxsize: int = 10_000,
+        local_ttl: float = 60,
+        redis_ttl: int = 600,
+    ) -> None:
+        self._local: TTLLRUCache[int, Snapshot] = TTLLRUCache(maxsize=maxsize, ttl=local_ttl)
+        self._redis_url = redis_url
+        self._redis: Any = None
+        self.redis_ttl = redis_ttl
+        self.redis_hits = 0
+        self.misses = 0
+
+    @property
+    def redis(self) -> Any:
+        if self._redis is None and self._redis_url:
+            self._redis = get_redis(self._redis_url)
+        return self._redis
+
+    def _key(self, tg_id: int) -> str:
+        return f"{self.key_prefix}{tg_id}"
+
+    async def get(self, tg_id: int) -> Snapshot | None:
+        snap = self._local.get(tg_id)
+        if snap is not None:
+            return snap
+
+        if self.redis is not None:
+            try:
+                raw = await self.redis.get(self._key(tg_id))
+            except Exception:  # Redis недоступен — просто идём в БД
+                log.warning("user cache: redis get failed", exc_info=True)
+                raw = None
+            if raw is not None:
+                snap = json.loads(raw)
+                self._local.set(tg_id, snap)
+                self.redis_hits += 1
+                return snap
+
+        self.misses += 1
+        return None
+
+    async def put(self, user: User) -> None:
+        snap = user.model_dump(mode="json")
+        self._local.set(user.tg_id, snap)
+        if self.redis is not None:
+            try:
+                await self.redis.set(self._key(user.tg_id), json.dumps(snap), ex=self.redis_ttl)
+            except Exception:
+                log.warning("user cache: redis set failed", exc_info=True)
+
+    async def invalidate(self, tg_id: int) -> None:
+        self._local.pop(tg_id)
+        if self.redis is not None:
+            try:
+                await self.redis.delete(self._key(tg_id))
+            except Exception:
+                log.warning("user cache: redis delete failed", exc_info=True)
+
+    @staticmethod
+    def to_user(snap: Snapshot) -> User:
+        return User.model_validate(snap)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "local_hits": self._local.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "local_size": len(self._local),
+        }
+
+
+user_cache = UserProfileCache(
+    redis_url=settings.REDIS_URL,
+    maxsize=settings.USER_CACHE_MAXSIZE,
+    local_ttl=settings.USER_CACHE_LOCAL_TTL_SEC,
+    redis_ttl=settings.USER_CACHE_REDIS_TTL_SEC,
+)
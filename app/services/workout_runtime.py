@@ -0,0 +1,490 @@
+# app/services/workout_runtime.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import sys
+import time
+from collections.abc import Awaitable, Callable, Hashable, Sequence
+from datetime import datetime, timedelta
+from typing import Any, Generic, NamedTuple, TypeVar
+
+from sqlalchemy import Table, func, update
+from sqlalchemy import select as sa_select
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.aio import sleep_or_wakeup
+from app.core.config import settings
+from app.core.tz import to_local
+from app.db.models import SetLog, User, WorkoutSession
+from app.db.session import async_session_factory
+from app.services.plan_cache import CachedItem, CachedPlan, plan_cache
+from app.services.set_entry import SetEntry
+
+log = logging.getLogger(__name__)
+
+K = TypeVar("K", bound=Hashable)
+
+# (chat_id, text) -> доставка; в боте — очередь исходящих, полоса INTERACTIVE
+Sender = Callable[[int, str], Awaitable[Any]]
+
+
+# --------- колесо таймеров ----------
+
+class TimerWheel(Generic[K]):
+    """
+    Хешированное колесо таймеров: slots ячеек по tick секунд, на ключ — не больше
+    одного таймера. schedule/cancel — O(1), advance обходит только наступившие
+    ячейки. Таймер дальше одного оборота лежит в своей ячейке до нужного круга.
+    """
+
+    def __init__(self, tick: float = 1.0, slots: int = 512, start: float = 0.0) -> None:
+        self.tick = tick
+        self._slots: list[dict[K, float]] = [{} for _ in range(slots)]
+        self._slot_of: dict[K, int] = {}
+        # номер следующего необработанного тика
+        self._cursor = math.floor(start / tick) + 1
+
+    def schedule(self, key: K, deadline: float) -> None:
+        self.cancel(key)
+        t = max(math.ceil(deadline / self.tick), self._cursor)
+        slot = t % len(self._slots)
+        self._slots[slot][key] = deadline
+        self._slot_of[key] = slot
+
+    def cancel(self, key: K) -> bool:
+        slot = self._slot_of.pop(key, None)
+        if slot is None:
+            return False
+        del self._slots[slot][key]
+        return True
+
+    def deadline(self, key: K) -> float | None:
+        slot = self._slot_of.get(key)
+        return None if slot is None else self._slots[slot][key]
+
+    def advance(self, now: float) -> list[K]:
+        """Снять все таймеры с deadline <= now."""
+        last = math.floor(now / self.tick)
+        # за оборот и больше — каждую ячейку достаточно пройти один раз
+        end = min(last, self._cursor + len(self._slots) - 1)
+        due: list[K] = []
+        for t in range(self._cursor, end + 1):
+            bucket = self._slots[t % len(self._slots)]
+            if not bucket:
+                continue
+            fired = [key for key, deadline in bucket.items() if deadline <= now]
+            for key in fired:
+                del bucket[key]
+                del self._slot_of[key]
+            due.extend(fired)
+        self._cursor = max(self._cursor, last + 1)
+        return due
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+
+# --------- состояние тренировки ----------
+
+class LiveSession:
+    """
+    Идущая тренировка: несколько чисел на пользователя. Пункты дня — тот же
+    кортеж, что в plan_cache (не копия); None — ещё не сопоставлены с планом
+    (тренировка поднята из БД после рестарта).
+    """
+
+    __slots__ = (
+        "chat_id", "day_id", "item_id", "items", "last_set_at", "session_id", "set_index",
+        "sets_done", "tonnage_kg", "user_id",
+    )
+
+    def __init__(
+        self, session_id: int, user_id: int, chat_id: int, day_id: int | None,
+        items: tuple[CachedItem, ...] | None = (), item_id: int | None = None, set_index: int = 0,
+        sets_done: int = 0, tonnage_kg: float = 0.0, last_set_at: float = 0.0,
+    ) -> None:
+        self.session_id = session_id
+        self.user_id = user_id
+        self.chat_id = chat_id
+        self.day_id = day_id
+        self.items = items
+        self.item_id = item_id
+        self.set_index = set_index
+        self.sets_done = sets_done
+        self.tonnage_kg = tonnage_kg
+        self.last_set_at = last_set_at
+
+    @property
+    def item(self) -> CachedItem | None:
+        """Текущий пункт плана; None — ad-hoc тренировка или план пройден."""
+        if self.item_id is None or not self.items:
+            return None
+        return next((i for i in self.items if i.id == self.item_id), None)
+
+    def _settle(self) -> None:
+        # подходы пункта выполнены — переходим к следующему по порядку
+        item = self.item
+        if item is None:
+            self.item_id = None
+            return
+        if self.set_index >= item.sets:
+            items = self.items or ()
+            pos = items.index(item) + 1
+            self.item_id = items[pos].id if pos < len(items) else None
+            self.set_index = 0
+
+
+class SessionSummary(NamedTuple):
+    session_id: int
+    started_at: datetime
+    finished_at: datetime
+    sets: int
+    tonnage_kg: float
+
+    @property
+    def duration_min(self) -> int:
+        return round((self.finished_at - self.started_at).total_seconds() / 60)
+
+
+def _today(plan: CachedPlan | None, weekday: int) -> Any:
+    if plan is None:
+        return None
+    return next((d for d in plan.days if d.day_idx % 7 == weekday and d.items), None)
+
+
+class WorkoutRuntime:
+    """
+    Идущие тренировки в памяти процесса + таймеры отдыха на одном колесе и одной задаче.
+
+    Источник правды — БД: live-состояние (текущий пункт, номер подхода, тоннаж)
+    восстанавливается одним запросом по незавершённым WorkoutSession и их
+    последним сетам (recover на старте, open при промахе), конец отдыха —
+    по ts и rest_sec последнего сета. Завершение — один UPDATE с итогами,
+    посчитанными по set_logs в том же запросе.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession] = async_session_factory,
+        default_rest_sec: int = 120,
+        tick: float = 1.0,
+        slots: int = 512,
+        max_age_sec: float = 6 * 3600,
+        clock: Callable[[], float] = time.monotonic,
+        wall_clock: Callable[[], datetime] = datetime.utcnow,
+    ) -> None:
+        self._session_factory = session_factory
+        self.default_rest_sec = default_rest_sec
+        self.max_age = timedelta(seconds=max_age_sec)
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self._live: dict[int, LiveSession] = {}
+        self.wheel: TimerWheel[int] = TimerWheel(tick, slots, start=clock())
+        self._send: Sender | None = None
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self.started = 0
+        self.finished = 0
+        self.recovered = 0
+        self.timers_fired = 0
+
+    # --- загрузка из БД ---
+
+    async def _load(
+        self, session: AsyncSession, *where: Any
+    ) -> list[tuple[LiveSession, datetime | None]]:
+        """Незавершённые тренировки + итоги и последний сет каждой — одним запросом."""
+        where = (col(WorkoutSession.finished_at).is_(None),
+                 col(WorkoutSession.started_at) >= self._wall_clock() - self.max_age, *where)
+        # тренировка LEFT JOIN её сеты -> итоги окном по тренировке,
+        # строка с последним сетом (rn = 1)
+        by_session = col(WorkoutSession.id)
+        last_first = (col(SetLog.ts).desc(), col(SetLog.id).desc())
+        # select из sqlalchemy: у sqlmodel.select перегрузки только до 4 колонок
+        ranked = (
+            sa_select(
+                col(WorkoutSession.id), col(WorkoutSession.user_id), col(User.tg_id),
+                col(WorkoutSession.day_id), col(WorkoutSession.started_at),
+                col(SetLog.workout_item_id), col(SetLog.set_index), col(SetLog.rest_sec),
+                col(SetLog.ts),
+                func.count(col(SetLog.id)).over(partition_by=by_session).label("n"),
+                func.sum(col(SetLog.weight_kg) * col(SetLog.reps)).over(partition_by=by_session)
+                .label("tonnage"),
+                func.row_number().over(partition_by=by_session, order_by=last_first).label("rn"),
+            )
+            .join(User, col(User.id) == col(WorkoutSession.user_id))
+            .outerjoin(SetLog, col(SetLog.session_id) == col(WorkoutSession.id))
+            .where(*where)
+            .subquery()
+        )
+        c = ranked.c
+        conn = await session.connection()
+        rows = await conn.execute(
+            sa_select(c.id, c.user_id, c.tg_id, c.day_id, c.workout_item_id, c.set_index,
+                      c.rest_sec, c.ts, c.n, c.tonnage)
+            .where(c.rn == 1)
+            .order_by(c.started_at, c.id)
+        )
+        now, wall = self._clock(), self._wall_clock()
+        out = []
+        for row in rows:
+            session_id, user_id, tg_id, day_id, item_id, set_index, rest_sec, ts, n, tonnage = row
+            live = LiveSession(
+                session_id, user_id, tg_id, day_id, items=None, item_id=item_id, last_set_at=now
+            )
+            rest_until = None
+            if n:
+                live.set_index = set_index + 1
+                live.sets_done = n
+                live.tonnage_kg = float(tonnage or 0)
+                live.last_set_at = now - (wall - ts).total_seconds()
+                if rest_sec:
+                    rest_until = ts + timedelta(seconds=rest_sec)
+            out.append((live, rest_until))
+        return out
+
+    def _adopt(self, live: LiveSession, rest_until: datetime | None) -> None:
+        self._live[live.user_id] = live
+        if rest_until is not None:
+            left = (rest_until - self._wall_clock()).total_seconds()
+            if left > 0:
+                self._arm(live.user_id, self._clock() + left)
+
+    async def _resolve(self, session: AsyncSession, live: LiveSession) -> None:
+        plan = await plan_cache.get(session, live.user_id)
+        day = None
+        if plan is not None and live.day_id:
+            day = next((d for d in plan.days if d.id == live.day_id), None)
+        live.items = day.items if day else ()
+        if live.item_id is None and live.sets_done == 0 and live.items:
+            live.item_id = live.items[0].id
+        live._settle()
+
+    async def recover(self) -> int:
+        """После рестарта: поднять незавершённые тренировки и перевзвести таймеры отдыха."""
+        async with self._session_factory() as s:
+            loaded = await self._load(s)
+        for live, rest_until in loaded:
+            self._adopt(live, rest_until)
+        self.recovered += len(loaded)
+        return len(loaded)
+
+    # --- тренировка ---
+
+    def get(self, user_id: int) -> LiveSession | None:
+        return self._live.get(user_id)
+
+    async def open(self, session: AsyncSession, user: User) -> LiveSession:
+        """
+        Текущая тренировка: из памяти; нет — незавершённая из БД; нет и её —
+        новая, по сегодняшнему дню плана (если сегодня он есть), иначе ad-hoc.
+
+        Сессию апдейта не коммитит: новая WorkoutSession пишется своей короткой
+        транзакцией (сеты пишет SetLogWriter отдельно — строка нужна в БД сразу).
+        """
+        assert user.id is not None
+        user_id = user.id
+        live = self._live.get(user_id)
+        if live is None:
+            loaded = await self._load(session, col(WorkoutSession.user_id) == user_id)
+            if loaded:
+                self._adopt(*loaded[-1])
+                live = loaded[-1][0]
+        if live is not None:
+            if live.items is None:
+                await self._resolve(session, live)
+            return live
+
+        plan = await plan_cache.get(session, user_id)
+        day = _today(plan, to_local(self._wall_clock(), user.tz).weekday())
+        ws = WorkoutSession(user_id=user_id, day_id=day.id if day else None)
+        async with self._session_factory() as own:
+            own.add(ws)
+            await own.commit()
+        assert ws.id is not None
+        items = day.items if day else ()
+        live = LiveSession(
+            ws.id, user_id, user.tg_id, ws.day_id, items, items[0].id if items else None,
+            last_set_at=self._clock(),
+        )
+        self._live[user_id] = live
+        self.started += 1
+        return live
+
+    def rows(self, live: LiveSession, entries: Sequence[SetEntry]) -> list[SetLog]:
+        """SetLog для записанных подходов: пункт плана, сквозной set_index, отдых — на последнем."""
+        item = live.item
+        rest = item.rest_sec if item is not None else self.default_rest_sec
+        return [
+            SetLog(
+                user_id=live.user_id,
+                session_id=live.session_id,
+                workout_item_id=item.id if item is not None else None,
+                set_index=live.set_index + i,
+                weight_kg=e.weight_kg,
+                reps=e.reps,
+                rpe=e.rpe,
+                rest_sec=rest if i == len(entries) - 1 else None,
+            )
+            for i, e in enumerate(entries)
+        ]
+
+    def record(self, live: LiveSession, rows: Sequence[SetLog]) -> int | None:
+        """Сеты записаны (после ack): сдвинуть состояние, завести таймер отдыха; вернуть секунды."""
+        if not rows:
+            return None
+        live.sets_done += len(rows)
+        live.tonnage_kg += sum(r.weight_kg * r.reps for r in rows)
+        live.set_index += len(rows)
+        live.last_set_at = self._clock()
+        planned = live.item is not None
+        live._settle()
+        rest = rows[-1].rest_sec
+        # план на сегодня пройден — отдыхать больше не к чему
+        if not rest or (planned and live.item is None):
+            self.wheel.cancel(live.user_id)
+            return None
+        self._arm(live.user_id, live.last_set_at + rest)
+        return rest
+
+    def _arm(self, user_id: int, deadline: float) -> None:
+        empty = not self.wheel
+        self.wheel.schedule(user_id, deadline)
+        if empty:
+            self._wakeup.set()
+
+    async def finish(self, session: AsyncSession, user: User) -> SessionSummary | None:
+        """
+        Завершить тренировку: finished_at и итоги (сеты, тоннаж по set_logs) — одним UPDATE
+        в транзакции апдейта (commit — на DbSessionMiddleware).
+        """
+        assert user.id is not None
+        live = self._live.pop(user.id, None)
+        self.wheel.cancel(user.id)
+        if live is not None:
+            session_id = live.session_id
+        else:
+            loaded = await self._load(session, col(WorkoutSession.user_id) == user.id)
+            if not loaded:
+                return None
+            session_id = loaded[-1][0].session_id
+
+        now = self._wall_clock()
+        ws: Table = WorkoutSession.__table__  # type: ignore[attr-defined]
+        conn = await session.connection()
+        row = (await conn.execute(
+            update(ws)
+            .where(ws.c.id == session_id, ws.c.finished_at.is_(None))
+            .values(
+                finished_at=now,
+                updated_at=now,
+                sets_count=select(func.count())
+                .where(SetLog.session_id == session_id)
+                .scalar_subquery(),
+                tonnage_kg=select(func.coalesce(func.sum(SetLog.weight_kg * SetLog.reps), 0))
+                .where(SetLog.session_id == session_id)
+                .scalar_subquery(),
+            )
+            .returning(ws.c.started_at, ws.c.sets_count, ws.c.tonnage_kg)
+        )).first()
+        if row is None:
+            return None
+        self.finished += 1
+        return SessionSummary(
+            session_id, row.started_at, now, row.sets_count, float(row.tonnage_kg)
+        )
+
+    # --- таймеры отдыха ---
+
+    def _rest_text(self, live: LiveSession) -> str:
+        item = live.item
+        if item is None:
+            return "⏱ Отдых закончился — следующий подход!"
+        return (
+            f"⏱ Отдых закончился. Дальше — {item.exercise_name}, "
+            f"подход {live.set_index + 1} из {item.sets}."
+        )
+
+    async def tick(self, now: float | None = None) -> int:
+        """Одна итерация колеса: отправить всем, у кого закончился отдых; вернуть число."""
+        due = self.wheel.advance(self._clock() if now is None else now)
+        sent = 0
+        for user_id in due:
+            live = self._live.get(user_id)
+            if live is None or self._send is None:
+                continue
+            try:
+                await self._send(live.chat_id, self._rest_text(live))
+            except Exception:
+                log.exception("rest timer to %s failed", live.chat_id)
+                continue
+            sent += 1
+        self.timers_fired += sent
+        return sent
+
+    def sweep(self, now: float | None = None) -> int:
+        """Забыть брошенные тренировки (без сетов дольше max_age); в БД остаются незавершёнными."""
+        now = self._clock() if now is None else now
+        limit = self.max_age.total_seconds()
+        stale = [u for u, live in self._live.items() if now - live.last_set_at > limit]
+        for user_id in stale:
+            del self._live[user_id]
+            self.wheel.cancel(user_id)
+        return len(stale)
+
+    # --- фоновый цикл ---
+
+    async def run(self, send: Sender, max_sleep: float = 60) -> None:
+        self._send = send
+        while True:
+            try:
+                await self.tick()
+                self.sweep()
+            except Exception:
+                log.exception("workout timer tick failed")
+            # пока есть таймеры — просыпаемся раз в тик колеса, иначе ждём первого таймера
+            wait = self.wheel.tick if self.wheel else max_sleep
+            await sleep_or_wakeup(self._wakeup, wait)
+
+    async def start(self, bot: Any) -> None:
+        """dp.startup-хук: поднять незавершённые тренировки и запустить колесо."""
+        from app.telegram.outbound import INTERACTIVE, outbound
+
+        async def send(chat_id: int, text: str) -> None:
+            outbound.send_message(bot, chat_id, text, priority=INTERACTIVE, coalesce=True)
+
+        if self._task is None:
+            try:
+                await self.recover()
+            except Exception:
+                log.exception("workout sessions recovery failed")
+            self._task = asyncio.create_task(self.run(send))
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict[str, float]:
+        sample = next(iter(self._live.values()), None)
+        return {
+            "live": len(self._live),
+            "timers": len(self.wheel),
+            "started": self.started,
+            "finished": self.finished,
+            "recovered": self.recovered,
+            "timers_fired": self.timers_fired,
+            "bytes_per_session": sys.getsizeof(sample) if sample is not None else 0,
+        }
+
+
+workout_runtime = WorkoutRuntime(
+    default_rest_sec=settings.WORKOUT_REST_DEFAULT_SEC,
+    tick=settings.WORKOUT_TIMER_TICK_SEC,
+    slots=settings.WORKOUT_TIMER_SLOTS,
+    max_age_sec=settings.WORKOUT_SESSION_MAX_AGE_SEC,
+)
@@ -1,34 +1,158 @@
 import asyncio
 import logging
 import os
+from collections.abc import Callable, Mapping
+from typing import Any
 
 from aiogram import Bot, Dispatcher
+from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 
 from app.core.config import settings
+from app.core.metrics import metrics, serve_metrics
+from app.db.session import db_router
 from app.telegram.handlers.onboarding import router as onboarding_router
 from app.telegram.handlers.root import router as root_router
+from app.telegram.handlers.workout import router as workout_router
+from app.telegram.keyboards.registry import KeyboardCachingSession, keyboards
+from app.telegram.middlewares.db import DbSessionMiddleware, ReadReplicaMiddleware
+from app.telegram.middlewares.dedup import DedupMiddleware
+from app.telegram.middlewares.metrics import HandlerMetricsMiddleware, UpdateMetricsMiddleware
+from app.telegram.middlewares.scheduler import SchedulerMiddleware
+from app.services.exercise_catalog import exercise_catalog
+from app.services.export import exporter
+from app.services.partitions import set_log_partitions
+from app.services.plan_cache import plan_cache
+from app.services.plan_generator import plan_generator
+from app.services.pr_engine import pr_engine
+from app.services.progression import progression_engine
+from app.services.reminders import reminder_scheduler
+from app.services.rollups import weekly_rollups
+from app.services.set_log_writer import set_log_writer
+from app.services.user_cache import user_cache
+from app.services.workout_runtime import workout_runtime
+from app.telegram.outbound import OutboundMiddleware, outbound
+from app.telegram.storage import build_events_isolation, build_fsm_storage
 
-async def main() -> None:
+def build_dispatcher() -> Dispatcher:
+    # порядок апдейтов одного пользователя держит блокировка FSM (состояние читается под ней)
+    storage = build_fsm_storage()
+    dp = Dispatcher(storage=storage, events_isolation=build_events_isolation(storage))
+
+    # ретраи/повторные доставки отсекаем на входе: не занимают место в очереди шарда
+    dedup = DedupMiddleware()
+    dp.update.outer_middleware(dedup)
+    # не больше SHARDS хендлеров одновременно; апдейты одного пользователя — в его шарде
+    scheduler = SchedulerMiddleware()
+    dp.update.outer_middleware(scheduler)
+    dp.shutdown.register(scheduler.scheduler.close)
+    # время апдейта и запросы к БД на апдейт — уже в воркере шарда
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
+    # одна сессия БД и один commit на апдейт
+    dp.update.outer_middleware(DbSessionMiddleware())
+
+    # латентность по хендлерам: inner-middleware родителя действуют и во вложенных роутерах
+    handler_metrics = HandlerMetricsMiddleware()
+    dp.message.middleware(handler_metrics)
+    dp.callback_query.middleware(handler_metrics)
+    # хендлеры с флагом db="replica" читают с реплики (если она настроена)
+    read_replica = ReadReplicaMiddleware()
+    dp.message.middleware(read_replica)
+    dp.callback_query.middleware(read_replica)
+
+    dp.include_router(onboarding_router)
+    dp.include_router(root_router)
+    dp.include_router(workout_router)
+    # неделя сета (по TZ пользователя) пишется вместе со строкой, объёмы по мышцам —
+    # в той же транзакции, что и сами сеты
+    set_log_writer.add_row_hook(weekly_rollups.stamp_weeks)
+    set_log_writer.add_tx_hook(weekly_rollups.on_sets)
+    # рекорды считаются по каждой записанной пачке сетов
+    set_log_writer.add_listener(pr_engine.on_sets)
+    # недописанные сеты сбрасываем в БД при остановке
+    dp.shutdown.register(set_log_writer.close)
+    # месячные секции set_logs создаются заранее (Postgres)
+    dp.startup.register(set_log_partitions.start)
+    dp.shutdown.register(set_log_partitions.close)
+    # каталог упражнений: грузим в память при старте, дальше следим за изменениями
+    dp.startup.register(exercise_catalog.start)
+    # шаблоны планов строятся по загруженному каталогу
+    dp.startup.register(plan_generator.start)
+    dp.shutdown.register(exercise_catalog.close)
+    # напоминания крутятся в том же процессе, что принимает апдейты
+    dp.startup.register(reminder_scheduler.start)
+    dp.shutdown.register(reminder_scheduler.close)
+    # идущие тренировки поднимаются из БД, таймеры отдыха — одна задача на процесс
+    dp.startup.register(workout_runtime.start)
+    dp.shutdown.register(workout_runtime.close)
+    # фоновые выгрузки /privacy отменяем (их файлы удаляются) до закрытия исходящих
+    dp.shutdown.register(exporter.close)
+    # досылаем очередь исходящих до закрытия HTTP-сессии бота
+    dp.shutdown.register(outbound.close)
+
+    # stats() сервисов — gauge'ами в /metrics (читаются только при скрейпе)
+    service_stats: dict[str, Callable[[], Mapping[str, Any]]] = {
+        "scheduler": scheduler.scheduler.stats,
+        "dedup": dedup.dedup.stats,
+        "user_cache": user_cache.stats,
+        "set_log_writer": set_log_writer.stats,
+        "pr_engine": pr_engine.stats,
+        "reminders": reminder_scheduler.stats,
+        "outbound": outbound.stats,
+        "keyboards": keyboards.stats,
+        "exercise_catalog": exercise_catalog.stats,
+        "plan_generator": plan_generator.stats,
+        "progression": progression_engine.stats,
+        "plan_cache": plan_cache.stats,
+        "workout": workout_runtime.stats,
+        "db_router": db_router.stats,
+        "set_log_partitions": set_log_partitions.stats,
+    }
+    for name, stats in service_stats.items():
+        metrics.register_stats(name, stats)
+    return dp
+
+def build_bot() -> Bot:
     token = settings.BOT_TOKEN or os.getenv("BOT_TOKEN")
     if not token:
         raise RuntimeError("BOT_TOKEN is not set. Put it in .env or environment.")
+    # клавиатуры из реестра сериализуются один раз, дальше JSON берётся из кэша
+    bot = Bot(
+        token=token,
+        session=KeyboardCachingSession(),
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    )
+    # все сообщения в чаты — через лимитер (30/с на бота, ~1/с в чат, 429 -> пауза и повтор)
+    bot.session.middleware(OutboundMiddleware(outbound))
+    return bot
 
+async def main() -> None:
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s %(levelname)s %(name)s: %(message)s",
     )
 
-    bot = Bot(token=token, parse_mode=ParseMode.HTML)
+    if settings.WEBHOOK_URL:
+        # в webhook-режиме апдейты принимает API (app.api.main), polling конфликтует
+        raise RuntimeError("WEBHOOK_URL is set: updates are served by app.api.main, not polling.")
 
-    dp = Dispatcher()
+    bot = build_bot()
 
-    dp.include_router(onboarding_router)
-    dp.include_router(root_router)
+    dp = build_dispatcher()
+
+    metrics_runner = await serve_metrics(settings.METRICS_PORT) if settings.METRICS_PORT else None
 
     try:
-        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+        # backpressure на входе: polling не заберёт новые апдейты, пока в работе MAX_IN_FLIGHT
+        await dp.start_polling(
+            bot,
+            allowed_updates=dp.resolve_used_update_types(),
+            tasks_concurrency_limit=settings.UPDATES_MAX_IN_FLIGHT,
+        )
     finally:
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await dp.storage.close()
         await bot.session.close()
 
 if __name__ == "__main__":
@@ -7,9 +7,8 @@ from aiogram.fsm.state import StatesGroup, State
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message
 
-from app.db.session import get_session
 from app.db.models import User
-from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.telegram.keyboards.reply import main_kb
 from app.telegram.keyboards.onboarding import (
@@ -35,15 +34,13 @@ def is_profile_complete(u: User) -> bool:
     # достаточно TZ; остальное можно заполнить позже через /settings
     return bool(u.tz)
 
-async def _get_or_create_user(tg_id: int) -> User:
-    with get_session() as s:
-        u = s.exec(select(User).where(User.tg_id == tg_id)).first()
-        if not u:
-            u = User(tg_id=tg_id, tz="UTC")
-            s.add(u)
-            s.commit()
-            s.refresh(u)
-        return u
+def _get_or_create_user(session: AsyncSession, user: User | None, tg_id: int) -> User:
+    # профиль уже достал DbSessionMiddleware; здесь только создаём недостающий,
+    # INSERT уйдёт вместе с общим commit в конце апдейта
+    if user is None:
+        user = User(tg_id=tg_id, tz="UTC")
+        session.add(user)
+    return user
 
 # публичная функция, чтобы вызывать из /start
 async def start_onboarding(message: Message, state: FSMContext) -> None:
@@ -60,16 +57,14 @@ async def ob_cancel(message: Message, state: FSMContext):
     await message.answer("Онбординг отменён. Можно вернуться позже командой /start.", reply_markup=main_kb())
 
 @router.message(F.chat.type == "private", OnboardingStates.tz)
-async def ob_set_tz(message: Message, state: FSMContext):
+async def ob_set_tz(message: Message, state: FSMContext, session: AsyncSession, user: User | None):
     text = (message.text or "").strip()
-    u = await _get_or_create_user(message.from_user.id)
+    u = _get_or_create_user(session, user, message.from_user.id)
 
     if text == BTN_AUTO_TZ:
         lang = (message.from_user.language_code or "en").lower()
         tz = "Europe/Moscow" if lang.startswith("ru") else "UTC"
-        with get_session() as s:
-            u.tz = tz
-            s.add(u); s.commit()
+        u.tz = tz
         await state.set_state(OnboardingStates.goal)
         await message.answer(f"Ок, ставлю TZ: <b>{tz}</b>. Теперь выбери цель:", reply_markup=goals_kb())
         return
@@ -80,9 +75,7 @@ async def ob_set_tz(message: Message, state: FSMContext):
         return
 
     if "/" in text or text.upper() == "UTC":
-        with get_session() as s:
-            u.tz = text
-            s.add(u); s.commit()
+        u.tz = text
         await state.set_state(OnboardingStates.goal)
         await message.answer(f"TZ установлен: <b>{text}</b>. Теперь цель:", reply_markup=goals_kb())
         return
@@ -100,13 +93,11 @@ async def ob_back_to_tz(message: Message, state: FSMContext):
     await message.answer("Вернулись к выбору часового пояса:", reply_markup=tz_kb())
 
 @router.message(F.chat.type == "private", OnboardingStates.goal)
-async def ob_set_goal(message: Message, state: FSMContext):
+async def ob_set_goal(message: Message, state: FSMContext, session: AsyncSession, user: User | None):
     text = (message.text or "").strip()
-    u = await _get_or_create_user(message.from_user.id)
+    u = _get_or_create_user(session, user, message.from_user.id)
     if text in GOALS or text == BTN_SKIP:
-        with get_session() as s:
-            u.goal = text if text in GOALS else u.goal
-            s.add(u); s.commit()
+        u.goal = text if text in GOALS else u.goal
         await state.set_state(OnboardingStates.level)
         await message.answer("Отлично! Теперь оцени свой опыт:", reply_markup=levels_kb())
     else:
@@ -123,13 +114,11 @@ async def ob_back_to_goal(message: Message, state: FSMContext):
     await message.answer("Вернулись к цели:", reply_markup=goals_kb())
 
 @router.message(F.chat.type == "private", OnboardingStates.level)
-async def ob_set_level(message: Message, state: FSMContext):
+async def ob_set_level(message: Message, state: FSMContext, session: AsyncSession, user: User | None):
     text = (message.text or "").strip()
-    u = await _get_or_create_user(message.from_user.id)
+    u = _get_or_create_user(session, user, message.from_user.id)
     if text in LEVELS or text == BTN_SKIP:
-        with get_session() as s:
-            u.level = text if text in LEVELS else u.level
-            s.add(u); s.commit()
+        u.level = text if text in LEVELS else u.level
         await state.set_state(OnboardingStates.equipment)
         await message.answer("Чем располагаешь для тренировок?", reply_markup=equipment_kb())
     else:
@@ -146,13 +135,11 @@ async def ob_back_to_level(message: Message, state: FSMContext):
     await message.answer("Вернулись к опыту:", reply_markup=levels_kb())
 
 @router.message(F.chat.type == "private", OnboardingStates.equipment)
-async def ob_set_equipment(message: Message, state: FSMContext):
+async def ob_set_equipment(message: Message, state: FSMContext, session: AsyncSession, user: User | None):
     text = (message.text or "").strip()
-    u = await _get_or_create_user(message.from_user.id)
+    u = _get_or_create_user(session, user, message.from_user.id)
     if text in EQUIPMENT or text == BTN_SKIP:
-        with get_session() as s:
-            u.equipment = text if text in EQUIPMENT else u.equipment
-            s.add(u); s.commit()
+        u.equipment = text if text in EQUIPMENT else u.equipment
         await state.set_state(OnboardingStates.injuries)
         await message.answer(
             "Есть ли травмы/ограничения? Опиши кратко одним сообщением или нажми «Пропустить».",
@@ -172,17 +159,13 @@ async def ob_back_to_equipment(message: Message, state: FSMContext):
     await message.answer("Вернулись к выбору оборудования:", reply_markup=equipment_kb())
 
 @router.message(F.chat.type == "private", OnboardingStates.injuries)
-async def ob_set_injuries(message: Message, state: FSMContext):
+async def ob_set_injuries(message: Message, state: FSMContext, session: AsyncSession, user: User | None):
     text = (message.text or "").strip()
-    u = await _get_or_create_user(message.from_user.id)
+    u = _get_or_create_user(session, user, message.from_user.id)
     if text != BTN_SKIP and text not in (BTN_BACK, BTN_CANCEL) and text:
-        with get_session() as s:
-            u.injuries_json = {"text": text[:500]}
-            s.add(u); s.commit()
+        u.injuries_json = {"text": text[:500]}
 
     await state.clear()
-    with get_session() as s:
-        u = s.exec(select(User).where(User.tg_id == message.from_user.id)).first()
 
     summary = (
         "Готово! Профиль сохранён:\n"
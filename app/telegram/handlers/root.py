@@ -1,8 +1,11 @@
 # app/telegram/handlers/root.py
+from datetime import datetime
+from html import escape
+
 from aiogram import Router, F
-from aiogram.filters import Command, CommandStart
+from aiogram.filters import Command, CommandObject, CommandStart
 from aiogram.fsm.context import FSMContext
-from aiogram.types import Message, ReplyKeyboardRemove
+from aiogram.types import CallbackQuery, FSInputFile, Message, ReplyKeyboardRemove
 
 from app.telegram.keyboards.reply import (
     main_kb, settings_kb,
@@ -11,9 +14,17 @@ from app.telegram.keyboards.reply import (
     BTN_REMIND, BTN_LOG, BTN_PRIVACY,
 )
 
-from app.db.session import get_session
+from app.core.tz import to_local
 from app.db.models import User
-from sqlmodel import select
+from app.services.export import FORMATS, exporter, presigned_url
+from app.services.journal import JournalPage, fetch_page
+from app.services.plan_cache import CachedDay, CachedPlan, plan_cache
+from app.services.plan_generator import plan_generator
+from app.services.progression import Target, progression_engine
+from app.services.reminders import WEEKDAY_NAMES, format_schedule, parse_schedule, reminder_scheduler
+from app.telegram.keyboards.journal import CB_LOG_PAGE, journal_kb
+from app.telegram.keyboards.privacy import CB_EXPORT, privacy_kb
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.telegram.handlers.onboarding import start_onboarding, is_profile_complete
 
 router = Router(name="root")
@@ -31,6 +42,49 @@ async def show_main_screen(message: Message) -> None:
     )
     await message.answer(text, reply_markup=main_kb(), parse_mode="Markdown")
 
+def render_journal(page: JournalPage, tz: str | None) -> str:
+    lines = ["📜 <b>Журнал</b>"]
+    for group in page.sessions:
+        started = to_local(group.started_at or group.sets[0].ts, tz)
+        lines.append(f"\n🗓 <b>{started:%d.%m.%Y %H:%M}</b>")
+        for st in group.sets:
+            rpe = f" @{st.rpe:g}" if st.rpe is not None else ""
+            lines.append(f"• {escape(st.exercise or 'Сет')}: {st.weight_kg:g} кг × {st.reps}{rpe}")
+    return "\n".join(lines)
+
+def render_plan(plan: CachedPlan) -> str:
+    lines = [f"📅 <b>{escape(plan.name)}</b> · {plan.weeks} нед."]
+    for day in plan.days:
+        lines.append(f"\n🗓 <b>{WEEKDAY_NAMES[day.day_idx % 7]}</b>")
+        for item in day.items:
+            rir = f", RIR {item.rir_target}" if item.rir_target is not None else ""
+            lines.append(
+                f"• {escape(item.exercise_name)}: {item.sets}×{item.reps_min}–{item.reps_max}{rir}, "
+                f"отдых {item.rest_sec} с"
+            )
+    lines.append("\nНовый план по текущему профилю — <code>/plan new</code>")
+    return "\n".join(lines)
+
+def next_training_day(day_idxs: list[int], weekday: int) -> int:
+    """Сегодняшний день плана, а если сегодня отдых — ближайший следующий по кругу недели."""
+    return min(day_idxs, key=lambda d: (d % 7 - weekday) % 7)
+
+def render_today(day: CachedDay, targets: list[Target], is_today: bool) -> str:
+    name = WEEKDAY_NAMES[day.day_idx % 7]
+    lines = [f"🔥 <b>Сегодня · {name}</b>" if is_today else f"😴 Сегодня отдых. Ближайшая тренировка — <b>{name}</b>:"]
+    for item, t in zip(day.items, targets):
+        line = f"• {escape(item.exercise_name)}: {t.sets}×{t.reps_min}–{t.reps_max}"
+        if t.weight_kg is None:
+            line += " · подбери рабочий вес"
+        else:
+            line += f" · <b>{t.weight_kg:g} кг</b>"
+            if t.deload:
+                line += " (разгрузка)"
+            elif t.delta_kg:
+                line += f" ({t.delta_kg:+g})"
+        lines.append(line)
+    return "\n".join(lines)
+
 async def show_settings_screen(message: Message) -> None:
     text = (
         "⚙️ *Настройки*\n\n"
@@ -44,15 +98,12 @@ async def show_settings_screen(message: Message) -> None:
 # --- Старт/главная ---
 
 @router.message(F.chat.type == "private", CommandStart())
-async def cmd_start(message: Message, state: FSMContext) -> None:
-    # upsert пользователя в БД
-    with get_session() as s:
-        u = s.exec(select(User).where(User.tg_id == message.from_user.id)).first()
-        if not u:
-            u = User(tg_id=message.from_user.id, tz="UTC")
-            s.add(u)
-            s.commit()
-            s.refresh(u)
+async def cmd_start(message: Message, state: FSMContext, session: AsyncSession, user: User | None) -> None:
+    # upsert пользователя в БД (профиль уже достал DbSessionMiddleware, commit — там же)
+    u = user
+    if not u:
+        u = User(tg_id=message.from_user.id, tz="UTC")
+        session.add(u)
 
     # если профиль неполный — запускаем онбординг
     if not is_profile_complete(u):
@@ -87,10 +138,9 @@ async def back_to_main(message: Message, state: FSMContext) -> None:
 
 @router.message(F.chat.type == "private", Command("me"))
 @router.message(F.chat.type == "private", F.text == BTN_ME)
-async def open_profile(message: Message) -> None:
-    # ⬇️ Реально читаем профиль из БД
-    with get_session() as s:
-        u = s.exec(select(User).where(User.tg_id == message.from_user.id)).first()
+async def open_profile(message: Message, user: User | None) -> None:
+    # ⬇️ Профиль из БД прочитан один раз в DbSessionMiddleware
+    u = user
     if not u:
         await message.answer("Профиль не найден. Нажми /start, чтобы создать его.", reply_markup=main_kb())
         return
@@ -109,13 +159,39 @@ async def open_profile(message: Message) -> None:
 
 @router.message(F.chat.type == "private", Command("plan"))
 @router.message(F.chat.type == "private", F.text == BTN_PLAN)
-async def open_plan(message: Message) -> None:
-    await message.answer("📅 План (демо). Тут будет мастер создания/просмотра.", reply_markup=main_kb())
+async def open_plan(
+    message: Message, session: AsyncSession, user: User | None, command: CommandObject | None = None
+) -> None:
+    if user is None or user.id is None:
+        await message.answer("📅 Сначала создай профиль: /start", reply_markup=main_kb())
+        return
+    regenerate = bool(command and (command.args or "").strip().lower() in ("new", "новый"))
+    plan = await plan_cache.get(session, user.id)
+    if plan is None or regenerate:
+        await plan_generator.create_plan(session, user)
+        plan = await plan_cache.get(session, user.id)
+    if plan is None or not plan.items():
+        await message.answer("📅 В каталоге пока нет упражнений под твой профиль.", reply_markup=main_kb())
+        return
+    await message.answer(render_plan(plan), reply_markup=main_kb())
 
 @router.message(F.chat.type == "private", Command("today"))
 @router.message(F.chat.type == "private", F.text == BTN_TODAY)
-async def open_today(message: Message) -> None:
-    await message.answer("🔥 Сегодня (демо). Запуск тренировки и карточки упражнений.", reply_markup=main_kb())
+async def open_today(message: Message, session: AsyncSession, user: User | None) -> None:
+    if user is None or user.id is None:
+        await message.answer("🔥 Сначала создай профиль: /start", reply_markup=main_kb())
+        return
+    plan = await plan_cache.get(session, user.id)
+    if plan is None or not plan.days:
+        await message.answer("🔥 Плана пока нет — собери его в /plan.", reply_markup=main_kb())
+        return
+    weekday = to_local(datetime.utcnow(), user.tz).weekday()
+    day = plan.day(next_training_day([d.day_idx for d in plan.days], weekday))
+    # next_training_day выбирает из day_idx самого плана — такой день в нём есть
+    assert day is not None
+    # цели по всем упражнениям дня: история — одним запросом, правила — из кэша
+    targets = await progression_engine.evaluate_day(session, user.id, day.items)
+    await message.answer(render_today(day, targets, day.day_idx == weekday), reply_markup=main_kb())
 
 @router.message(F.chat.type == "private", Command("help"))
 @router.message(F.chat.type == "private", F.text == BTN_HELP)
@@ -125,6 +201,7 @@ async def open_help(message: Message) -> None:
         "/start — главная\n"
         "/today — тренировка сегодня\n"
         "/plan — план\n"
+        "/finish — завершить тренировку\n"
         "/me — профиль\n"
         "/settings — настройки\n",
         parse_mode="Markdown",
@@ -135,15 +212,92 @@ async def open_help(message: Message) -> None:
 
 @router.message(F.chat.type == "private", Command("remind"))
 @router.message(F.chat.type == "private", F.text == BTN_REMIND)
-async def open_remind(message: Message) -> None:
-    await message.answer("⏰ Напоминания (демо). Выбор дней и времени.", reply_markup=settings_kb())
+async def open_remind(
+    message: Message, session: AsyncSession, user: User | None, command: CommandObject | None = None
+) -> None:
+    if user is None:
+        await message.answer("⏰ Сначала создай профиль: /start", reply_markup=settings_kb())
+        return
+    args = (command.args or "").strip() if command else ""
+    if not args:
+        await message.answer(
+            "⏰ <b>Напоминания</b> приходят по твоему времени (TZ: <b>{}</b>).\n\n"
+            "• <code>/remind пн ср пт 07:30</code> — по дням недели\n"
+            "• <code>/remind ежедневно 19:00</code> — каждый день\n"
+            "• <code>/remind off</code> — выключить".format(escape(user.tz)),
+            reply_markup=settings_kb(),
+        )
+        return
 
-@router.message(F.chat.type == "private", Command("log"))
-@router.message(F.chat.type == "private", F.text == BTN_LOG)
-async def open_log(message: Message) -> None:
-    await message.answer("📜 Журнал (демо). Последние тренировки/сеты.", reply_markup=settings_kb())
+    if args.lower() in ("off", "выкл", "стоп"):
+        await reminder_scheduler.set_schedule(session, user, 0, 0, enabled=False)
+        await message.answer("🔕 Напоминания выключены.", reply_markup=settings_kb())
+        return
+    parsed = parse_schedule(args)
+    if parsed is None:
+        await message.answer("Не понял расписание. Пример: <code>/remind пн ср пт 07:30</code>")
+        return
+    await reminder_scheduler.set_schedule(session, user, *parsed)
+    await message.answer(f"⏰ Напомню: {format_schedule(*parsed)}.", reply_markup=settings_kb())
+
+@router.message(F.chat.type == "private", Command("log"), flags={"db": "replica"})
+@router.message(F.chat.type == "private", F.text == BTN_LOG, flags={"db": "replica"})
+async def open_log(message: Message, session: AsyncSession, user: User | None) -> None:
+    if user is None or user.id is None:
+        await message.answer("📜 Журнал пуст. Нажми /start, чтобы создать профиль.", reply_markup=settings_kb())
+        return
+    page = await fetch_page(session, user.id)
+    if not page.sessions:
+        await message.answer("📜 Журнал пуст. Запиши сет, например: <code>100x5x3 @8</code>", reply_markup=settings_kb())
+        return
+    await message.answer(render_journal(page, user.tz), reply_markup=journal_kb(page.next_cursor))
+
+@router.callback_query(F.data.startswith(CB_LOG_PAGE), flags={"db": "replica"})
+async def log_next_page(callback: CallbackQuery, session: AsyncSession, user: User | None) -> None:
+    if user is None or user.id is None or not isinstance(callback.message, Message):
+        await callback.answer()
+        return
+    try:
+        page = await fetch_page(session, user.id, cursor=callback.data[len(CB_LOG_PAGE):])
+    except ValueError:
+        await callback.answer("Ссылка устарела, открой /log заново.")
+        return
+    if not page.sessions:
+        await callback.answer("Это всё 🙂")
+        return
+    await callback.message.edit_text(render_journal(page, user.tz), reply_markup=journal_kb(page.next_cursor))
+    await callback.answer()
 
 @router.message(F.chat.type == "private", Command("privacy"))
 @router.message(F.chat.type == "private", F.text == BTN_PRIVACY)
 async def open_privacy(message: Message) -> None:
-    await message.answer("🔐 Приватность (демо). Экспорт/удаление данных.", reply_markup=settings_kb())
\ No newline at end of file
+    await message.answer(
+        "🔐 <b>Приватность</b>\n\nМожно выгрузить все свои данные: профиль, тренировки, сеты и рекорды.",
+        reply_markup=privacy_kb(),
+    )
+
+@router.callback_query(F.data.startswith(CB_EXPORT))
+async def export_data(callback: CallbackQuery, user: User | None) -> None:
+    fmt = callback.data[len(CB_EXPORT):]
+    if user is None or user.id is None or fmt not in FORMATS or not isinstance(callback.message, Message):
+        await callback.answer()
+        return
+    message = callback.message
+
+    async def deliver(locations: list[str] | None) -> None:
+        if locations is None:
+            await message.answer("😕 Не получилось подготовить выгрузку, попробуй позже.")
+            return
+        for location in locations:
+            if location.startswith("s3://"):
+                url = presigned_url(location)
+                await message.answer(f"📦 Выгрузка готова (ссылка на сутки):\n{url}")
+            else:
+                await message.answer_document(FSInputFile(location))
+
+    # выгрузка идёт в фоне (потоково: серверный курсор + gzip), шард пользователя не занят;
+    # файлы придут отдельными сообщениями
+    if exporter.start_user_export(user.id, fmt, deliver):
+        await callback.answer("Готовлю выгрузку — пришлю, как будет готова.")
+    else:
+        await callback.answer("Выгрузка уже готовится.")
\ No newline at end of file
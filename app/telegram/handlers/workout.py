@@ -0,0 +1,71 @@
+# app/telegram/handlers/workout.py
+from __future__ import annotations
+
+from aiogram import Router, F
+from aiogram.filters import Command
+from aiogram.types import Message
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db.models import User
+from app.services.set_entry import SetEntry, parse_set_entry
+from app.services.set_log_writer import set_log_writer
+from app.services.workout_runtime import workout_runtime
+from app.telegram.keyboards.reply import main_kb
+
+router = Router(name="workout")
+
+NO_PROFILE = "Профиль не найден. Нажми /start, чтобы создать его."
+
+# --------- helpers ----------
+def _fmt_weight(w: float) -> str:
+    return f"{w:g}"
+
+# --------- Логирование сетов: «100x5x3 @8» ----------
+@router.message(F.chat.type == "private", F.text.func(parse_set_entry).as_("entries"))
+async def log_sets(
+    message: Message, entries: list[SetEntry], session: AsyncSession, user: User | None
+) -> None:
+    if user is None or user.id is None:
+        await message.answer(NO_PROFILE, reply_markup=main_kb())
+        return
+
+    # текущая тренировка (или новая по сегодняшнему дню плана) — из памяти процесса
+    live = await workout_runtime.open(session, user)
+    item = live.item
+    rows = workout_runtime.rows(live, entries)
+    # ответ — только после commit пачки (durable ack)
+    await set_log_writer.submit(rows)
+    rest = workout_runtime.record(live, rows)
+
+    lines = []
+    for e in entries:
+        rpe = f" @{e.rpe:g}" if e.rpe is not None else ""
+        lines.append(f"• {_fmt_weight(e.weight_kg)} кг × {e.reps}{rpe}")
+    head = f"✅ Записал сетов: <b>{len(entries)}</b>"
+    if item is not None:
+        head += f" · {item.exercise_name}"
+    tail = [f"Тоннаж тренировки: <b>{_fmt_weight(round(live.tonnage_kg, 1))} кг</b>"]
+    if rest:
+        tail.append(f"⏱ Отдых {rest} с — напомню.")
+    elif item is not None and live.item is None:
+        tail.append("🏁 План на сегодня выполнен — заверши тренировку: /finish")
+    await message.answer("\n".join([head, *lines, *tail]))
+
+# --------- Завершение тренировки ----------
+@router.message(F.chat.type == "private", Command("finish"))
+async def finish_workout(message: Message, session: AsyncSession, user: User | None) -> None:
+    if user is None or user.id is None:
+        await message.answer(NO_PROFILE, reply_markup=main_kb())
+        return
+    summary = await workout_runtime.finish(session, user)
+    if summary is None:
+        await message.answer(
+            "Сейчас нет начатой тренировки — просто запиши сет, например <code>100x5</code>.",
+            reply_markup=main_kb(),
+        )
+        return
+    await message.answer(
+        f"🏁 Тренировка завершена: {summary.duration_min} мин, сетов <b>{summary.sets}</b>, "
+        f"тоннаж <b>{_fmt_weight(round(summary.tonnage_kg, 1))} кг</b>.",
+        reply_markup=main_kb(),
+    )
@@ -0,0 +1,18 @@
+# app/telegram/keyboards/journal.py
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from app.telegram.keyboards.registry import keyboards
+
+# callback_data: "log:<курсор>" — курсор 22 символа, лимит Telegram 64 байта
+CB_LOG_PAGE = "log:"
+BTN_LOG_MORE = "Дальше ▶"
+
+@keyboards.dynamic(maxsize=4096)
+def journal_kb(next_cursor: str | None) -> InlineKeyboardMarkup | None:
+    if not next_cursor:
+        return None
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(text=BTN_LOG_MORE, callback_data=CB_LOG_PAGE + next_cursor)]
+        ]
+    )
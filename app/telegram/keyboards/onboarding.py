@@ -1,5 +1,7 @@
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
 
+from app.telegram.keyboards.registry import keyboards
+
 BTN_BACK = "⬅️ Назад"
 BTN_SKIP = "⏭ Пропустить"
 BTN_CANCEL = "✖️ Отмена"
@@ -14,27 +16,32 @@ GOALS = ["Гипертрофия", "Сила", "Выносливость", "По
 LEVELS = ["Новичок", "Средний", "Продвинутый"]
 EQUIPMENT = ["Дом", "Зал", "Только тело", "Смешанное"]
 
+@keyboards.static
 def tz_kb() -> ReplyKeyboardMarkup:
     rows = [[KeyboardButton(text=t)] for t in COMMON_TZ]
     rows.append([KeyboardButton(text=BTN_AUTO_TZ)])
     rows.append([KeyboardButton(text=BTN_SKIP), KeyboardButton(text=BTN_CANCEL)])
     return ReplyKeyboardMarkup(keyboard=rows, resize_keyboard=True, is_persistent=True)
 
+@keyboards.static
 def goals_kb() -> ReplyKeyboardMarkup:
     rows = [[KeyboardButton(text=g)] for g in GOALS]
     rows.append([KeyboardButton(text=BTN_BACK), KeyboardButton(text=BTN_SKIP), KeyboardButton(text=BTN_CANCEL)])
     return ReplyKeyboardMarkup(keyboard=rows, resize_keyboard=True, is_persistent=True)
 
+@keyboards.static
 def levels_kb() -> ReplyKeyboardMarkup:
     rows = [[KeyboardButton(text=l)] for l in LEVELS]
     rows.append([KeyboardButton(text=BTN_BACK), KeyboardButton(text=BTN_SKIP), KeyboardButton(text=BTN_CANCEL)])
     return ReplyKeyboardMarkup(keyboard=rows, resize_keyboard=True, is_persistent=True)
 
+@keyboards.static
 def equipment_kb() -> ReplyKeyboardMarkup:
     rows = [[KeyboardButton(text=e)] for e in EQUIPMENT]
     rows.append([KeyboardButton(text=BTN_BACK), KeyboardButton(text=BTN_SKIP), KeyboardButton(text=BTN_CANCEL)])
     return ReplyKeyboardMarkup(keyboard=rows, resize_keyboard=True, is_persistent=True)
 
+@keyboards.static
 def injuries_kb() -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup(
         keyboard=[
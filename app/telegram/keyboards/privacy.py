@@ -0,0 +1,15 @@
+# app/telegram/keyboards/privacy.py
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from app.telegram.keyboards.registry import keyboards
+
+CB_EXPORT = "export:"
+
+@keyboards.static
+def privacy_kb() -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[[
+            InlineKeyboardButton(text="📦 Экспорт JSON", callback_data=CB_EXPORT + "jsonl"),
+            InlineKeyboardButton(text="📦 Экспорт CSV", callback_data=CB_EXPORT + "csv"),
+        ]]
+    )
@@ -0,0 +1,104 @@
+# app/telegram/keyboards/registry.py
+from __future__ import annotations
+
+import functools
+from collections.abc import Callable
+from typing import Any, TypeVar
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import TelegramMethod
+from aiogram.types import InlineKeyboardMarkup, InputFile, ReplyKeyboardMarkup
+from aiohttp import FormData
+from pydantic import ConfigDict, PrivateAttr
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class FrozenReplyKeyboard(ReplyKeyboardMarkup):
+    """Неизменяемая reply-клавиатура: строится один раз, JSON кэшируется при первой отправке."""
+
+    model_config = ConfigDict(frozen=True)
+    _payload: str | None = PrivateAttr(default=None)
+
+
+class FrozenInlineKeyboard(InlineKeyboardMarkup):
+    model_config = ConfigDict(frozen=True)
+    _payload: str | None = PrivateAttr(default=None)
+
+
+FROZEN = (FrozenReplyKeyboard, FrozenInlineKeyboard)
+
+
+def freeze(markup: Any) -> Any:
+    if markup is None or isinstance(markup, FROZEN):
+        return markup
+    if isinstance(markup, ReplyKeyboardMarkup):
+        return FrozenReplyKeyboard(**dict(markup))
+    if isinstance(markup, InlineKeyboardMarkup):
+        return FrozenInlineKeyboard(**dict(markup))
+    return markup
+
+
+class KeyboardRegistry:
+    """
+    Реестр клавиатур. Статические (без аргументов) собираются один раз,
+    динамические (страницы, выбор упражнения) — кэшируются по аргументам с LRU.
+    Разметку из кэша не меняем: один и тот же объект уходит всем пользователям.
+    """
+
+    def __init__(self) -> None:
+        self._builders: dict[str, Any] = {}
+
+    def static(self, builder: F) -> F:
+        cached = functools.wraps(builder)(functools.cache(lambda: freeze(builder())))
+        self._builders[builder.__qualname__] = cached
+        return cached  # type: ignore[return-value]
+
+    def dynamic(self, maxsize: int = 1024) -> Callable[[F], F]:
+        def decorator(builder: F) -> F:
+            cached = functools.wraps(builder)(functools.lru_cache(maxsize=maxsize)(
+                lambda *args, **kw: freeze(builder(*args, **kw))
+            ))
+            self._builders[builder.__qualname__] = cached
+            return cached  # type: ignore[return-value]
+        return decorator
+
+    def clear(self) -> None:
+        for cached in self._builders.values():
+            cached.cache_clear()
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {
+            name: {"hits": info.hits, "misses": info.misses, "size": info.currsize}
+            for name, info in ((n, c.cache_info()) for n, c in self._builders.items())
+        }
+
+
+keyboards = KeyboardRegistry()
+
+
+class KeyboardCachingSession(AiohttpSession):
+    """
+    AiohttpSession, который не сериализует замороженную клавиатуру на каждый
+    запрос: JSON считается штатным prepare_value один раз и хранится в самой разметке.
+    """
+
+    def build_form_data(self, bot: Bot, method: TelegramMethod[Any]) -> FormData:
+        markup = getattr(method, "reply_markup", None)
+        if not isinstance(markup, FROZEN):
+            return super().build_form_data(bot, method)
+
+        form = FormData(quote_fields=False)
+        files: dict[str, InputFile] = {}
+        for key, value in method.model_dump(warnings=False, exclude={"reply_markup"}).items():
+            value = self.prepare_value(value, bot=bot, files=files)
+            if not value:
+                continue
+            form.add_field(key, value)
+        if markup._payload is None:
+            markup._payload = self.prepare_value(markup, bot=bot, files=files)
+        form.add_field("reply_markup", markup._payload)
+        for key, value in files.items():
+            form.add_field(key, value.read(bot), filename=value.filename or key)
+        return form
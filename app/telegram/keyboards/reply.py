@@ -1,6 +1,8 @@
 # app/telegram/keyboards/reply.py
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
 
+from app.telegram.keyboards.registry import keyboards
+
 # --- Тексты кнопок (удобно держать в одном месте) ---
 BTN_ME       = "/me"
 BTN_PLAN     = "/plan"
@@ -14,6 +16,7 @@ BTN_LOG      = "/log"
 BTN_PRIVACY  = "/privacy"
 BTN_BACK     = "⬅️ Назад"
 
+@keyboards.static
 def main_kb() -> ReplyKeyboardMarkup:
     """
     Постоянная «нижняя панель» — главные действия. Кнопки с / запускают команды,
@@ -30,6 +33,7 @@ def main_kb() -> ReplyKeyboardMarkup:
         input_field_placeholder="Выбери действие…",
     )
 
+@keyboards.static
 def settings_kb() -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup(
         keyboard=[
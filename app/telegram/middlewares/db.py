@@ -0,0 +1,121 @@
+# app/telegram/middlewares/db.py
+from __future__ import annotations
+
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import TelegramObject, User as TgUser
+from sqlalchemy import event
+from sqlalchemy.orm import Session, UOWTransaction, make_transient_to_detached
+from sqlalchemy.orm.attributes import instance_state
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db.metrics import query_usage
+from app.db.models import User
+from app.db.session import db_router, get_async_session
+from app.services.reminders import reminder_scheduler
+from app.services.user_cache import user_cache
+
+Handler = Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]]
+
+# session.info: id(User) -> (User, сменилась ли TZ) — изменённые за апдейт профили
+_TOUCHED_USERS = "touched_users"
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_touched_users(session: Session, flush_context: UOWTransaction, instances: Any) -> None:
+    # autoflush (перед любым запросом хендлера) сбрасывает new/dirty и историю
+    # атрибутов — поэтому изменённые профили собираем на каждом flush, а не в конце
+    touched = session.info.get(_TOUCHED_USERS)
+    if touched is None:
+        return
+    new = set(map(id, session.new))
+    for obj in (*session.new, *session.dirty):
+        if isinstance(obj, User):
+            tz_changed = id(obj) not in new and instance_state(obj).attrs.tz.history.has_changes()
+            seen = touched.get(id(obj))
+            touched[id(obj)] = (obj, tz_changed or (seen is not None and seen[1]))
+
+
+async def _resolve_user(session: AsyncSession, tg_id: int) -> User | None:
+    snap = await user_cache.get(tg_id)
+    if snap is not None:
+        # снимок -> detached-объект -> в сессию без SELECT; изменённые
+        # хендлером поля уйдут обычным UPDATE при commit
+        cached = user_cache.to_user(snap)
+        make_transient_to_detached(cached)
+        session.add(cached)
+        return cached
+
+    user = (await session.exec(select(User).where(User.tg_id == tg_id))).first()
+    if user is not None:
+        await user_cache.put(user)
+    return user
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """
+    Одна сессия = один апдейт (unit of work).
+
+    Открывает AsyncSession, один раз достаёт профиль по tg_id (через
+    user_cache, в БД — только при промахе) и кладёт в kwargs хендлера
+    `session` и `user` (None, если профиля ещё нет).
+    Хендлеры только меняют атрибуты/добавляют объекты — commit один, в конце.
+    """
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: dict[str, Any]) -> Any:
+        tg_user: TgUser | None = data.get("event_from_user")
+
+        async with get_async_session() as session:
+            user: User | None = None
+            if tg_user is not None:
+                user = await _resolve_user(session, tg_user.id)
+
+            data["session"] = session
+            data["user"] = user
+            session.info[_TOUCHED_USERS] = {}
+            try:
+                result = await handler(event, data)
+                # последний flush — _collect_touched_users видит и оставшиеся изменения
+                await session.flush()
+            except Exception:
+                await session.rollback()
+                raise
+
+            # write-through: новые/изменённые профили обновляем в кэше после commit
+            touched = list(session.info.pop(_TOUCHED_USERS).values())
+            # сменили TZ — напоминания перевзводятся в той же транзакции
+            for u, tz_changed in touched:
+                if tz_changed:
+                    await reminder_scheduler.rearm_user(session, u)
+            await session.commit()
+            for u, _ in touched:
+                await user_cache.put(u)
+            # апдейт что-то записал — следующие чтения пользователя ещё какое-то время с primary;
+            # сеты пишет SetLogWriter вне этой сессии — их отмечает он сам
+            usage = query_usage.get()
+            if user is not None and user.id is not None and (usage is None or usage.writes):
+                db_router.mark_write(user.id)
+            return result
+
+
+class ReadReplicaMiddleware(BaseMiddleware):
+    """
+    Inner-middleware на dp.message / dp.callback_query: хендлерам с флагом
+    db="replica" (только чтение — журнал и т.п.) подменяет `session` сессией
+    реплики. Профиль и commit остаются на сессии DbSessionMiddleware; недавно
+    писавших пользователей ReadRouter оставляет на primary.
+    """
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: dict[str, Any]) -> Any:
+        if get_flag(data, "db") != "replica":
+            return await handler(event, data)
+        user: User | None = data.get("user")
+        if not db_router.use_replica(user.id if user is not None else None):
+            return await handler(event, data)
+        async with db_router.replica_session() as session:
+            data["session"] = session
+            return await handler(event, data)
@@ -0,0 +1,95 @@
+# app/telegram/middlewares/dedup.py
+from __future__ import annotations
+
+import logging
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from app.core.config import settings
+from app.core.redis import get_redis
+
+log = logging.getLogger(__name__)
+
+Handler = Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]]
+
+
+class UpdateDeduplicator:
+    """
+    Дедупликация по update_id.
+
+    L1 — скользящее окно последних `window` id (set + deque для вытеснения),
+    L2 — общий для реплик Redis: SET NX EX, первый записавший «владеет» апдейтом.
+    """
+
+    key_prefix = "gymcoach:upd:"
+
+    def __init__(self, window: int = 10_000, redis: Any = None, ttl: int = 3600) -> None:
+        self.window = window
+        self.redis = redis
+        self.ttl = ttl
+        self._seen: set[int] = set()
+        self._order: deque[int] = deque()
+        self.duplicates = 0
+
+    def _remember(self, update_id: int) -> None:
+        self._seen.add(update_id)
+        self._order.append(update_id)
+        if len(self._order) > self.window:
+            self._seen.discard(self._order.popleft())
+
+    async def seen_before(self, update_id: int) -> bool:
+        """True — дубль (апдейт уже обрабатывается/обработан); иначе помечает id."""
+        if update_id in self._seen:
+            self.duplicates += 1
+            return True
+        self._remember(update_id)
+
+        if self.redis is not None:
+            try:
+                key = f"{self.key_prefix}{update_id}"
+                fresh = await self.redis.set(key, 1, nx=True, ex=self.ttl)
+            except Exception:  # без Redis остаёмся с локальным окном
+                log.warning("dedup: redis set failed", exc_info=True)
+                fresh = True
+            if not fresh:
+                self.duplicates += 1
+                return True
+        return False
+
+    def stats(self) -> dict[str, int]:
+        return {"window": len(self._seen), "duplicates": self.duplicates}
+
+    async def forget(self, update_id: int) -> None:
+        # обработка упала — даём повторной доставке шанс
+        self._seen.discard(update_id)
+        if self.redis is not None:
+            try:
+                await self.redis.delete(f"{self.key_prefix}{update_id}")
+            except Exception:
+                log.warning("dedup: redis delete failed", exc_info=True)
+
+
+class DedupMiddleware(BaseMiddleware):
+    """Outer-middleware на dp.update: дубли отбрасываются до роутинга и до БД."""
+
+    def __init__(self, dedup: UpdateDeduplicator | None = None) -> None:
+        self.dedup = dedup or UpdateDeduplicator(
+            window=settings.DEDUP_WINDOW, redis=get_redis(), ttl=settings.DEDUP_TTL_SEC
+        )
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: dict[str, Any]) -> Any:
+        if not isinstance(event, Update):
+            return await handler(event, data)
+
+        if await self.dedup.seen_before(event.update_id):
+            log.debug("duplicate update %s dropped", event.update_id)
+            return None
+        try:
+            return await handler(event, data)
+        except Exception:
+            await self.dedup.forget(event.update_id)
+            raise
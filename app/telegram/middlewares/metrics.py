@@ -0,0 +1,79 @@
+# app/telegram/middlewares/metrics.py
+from __future__ import annotations
+
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from app.core.metrics import COUNT_BUCKETS, metrics
+from app.db.metrics import QueryUsage, query_usage
+
+Handler = Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]]
+
+UPDATE_SECONDS = metrics.histogram("update_seconds", "Update processing time (after shard queue)")
+UPDATE_ERRORS = metrics.counter("update_errors_total", "Updates that raised")
+UPDATE_DB_QUERIES = metrics.histogram(
+    "update_db_queries", "SQL statements per update", buckets=COUNT_BUCKETS
+)
+UPDATE_DB_SECONDS = metrics.histogram("update_db_seconds", "Time in SQL per update")
+HANDLER_SECONDS = metrics.histogram("handler_seconds", "Handler latency", ("handler",))
+HANDLER_ERRORS = metrics.counter("handler_errors_total", "Handlers that raised", ("handler",))
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """
+    Outer-middleware на dp.update: время апдейта и сколько он сделал запросов к БД.
+    Ставить после SchedulerMiddleware — счётчик запросов живёт в контексте задачи,
+    которая выполняет хендлер (воркер шарда).
+    """
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: dict[str, Any]) -> Any:
+        usage = QueryUsage()
+        token = query_usage.set(usage)
+        t0 = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            UPDATE_ERRORS.inc()
+            raise
+        finally:
+            UPDATE_SECONDS.observe(time.perf_counter() - t0)
+            UPDATE_DB_QUERIES.observe(usage.queries)
+            UPDATE_DB_SECONDS.observe(usage.seconds)
+            query_usage.reset(token)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Inner-middleware на dp.message / dp.callback_query (наследуется вложенными роутерами):
+    латентность по хендлеру, метка — «роутер.функция», например onboarding.ob_set_tz.
+    """
+
+    def __init__(self) -> None:
+        # callback -> (гистограмма, счётчик ошибок) с уже выбранными метками
+        self._children: dict[Any, tuple[Any, Any]] = {}
+
+    def _for(self, data: dict[str, Any]) -> tuple[Any, Any]:
+        callback = data["handler"].callback
+        children = self._children.get(callback)
+        if children is None:
+            router = data.get("event_router")
+            router_name = router.name if router is not None else "?"
+            name = f"{router_name}.{getattr(callback, '__name__', 'handler')}"
+            children = (HANDLER_SECONDS.labels(name), HANDLER_ERRORS.labels(name))
+            self._children[callback] = children
+        return children
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: dict[str, Any]) -> Any:
+        seconds, errors = self._for(data)
+        t0 = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            seconds.observe(time.perf_counter() - t0)
@@ -0,0 +1,140 @@
+# app/telegram/middlewares/scheduler.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import Chat, TelegramObject, Update, User as TgUser
+
+from app.core.config import settings
+
+log = logging.getLogger(__name__)
+
+Handler = Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]]
+_Job = tuple[Handler, TelegramObject, dict[str, Any], "asyncio.Future[Any]", float]
+
+
+class UserShardScheduler:
+    """
+    N очередей-шардов, пользователь -> шард по from_user.id % N.
+
+    У каждого шарда один воркер: разные пользователи идут параллельно, но не
+    больше N хендлеров одновременно (пул соединений БД не выбирается до дна).
+    Порядок апдейтов одного пользователя гарантирует не шард, а блокировка FSM
+    (Dispatcher(events_isolation=...), см. build_events_isolation): до шарда
+    апдейт доходит, уже прочитав состояние под ней. Ограничение на входе —
+    UPDATES_MAX_IN_FLIGHT (polling/webhook), очереди здесь лишь страхуют.
+    """
+
+    def __init__(self, shards: int = 16, queue_size: int = 100) -> None:
+        self.shards = shards
+        self.queue_size = queue_size
+        self._queues: list[asyncio.Queue[_Job]] = []
+        self._workers: list[asyncio.Task[None]] = []
+        self._closing = False
+        # метрики ожидания в очереди
+        self.processed = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _ensure_started(self) -> None:
+        if self._workers:
+            return
+        self._closing = False
+        self._queues = [asyncio.Queue(maxsize=self.queue_size) for _ in range(self.shards)]
+        self._workers = [self._spawn(i) for i in range(self.shards)]
+
+    def _spawn(self, i: int) -> asyncio.Task[None]:
+        task = asyncio.create_task(self._worker(self._queues[i]), name=f"shard-{i}")
+        task.add_done_callback(lambda t: self._on_worker_done(i, t))
+        return task
+
+    def _on_worker_done(self, i: int, task: asyncio.Task[None]) -> None:
+        # воркер не должен завершаться сам: без него очередь шарда встанет навсегда
+        if self._closing or task.cancelled() or not self._workers:
+            return
+        log.error("shard %d worker died, restarting", i, exc_info=task.exception())
+        self._workers[i] = self._spawn(i)
+
+    def shard_of(self, key: int) -> int:
+        return key % self.shards
+
+    async def submit(
+        self, key: int, handler: Handler, event: TelegramObject, data: dict[str, Any]
+    ) -> Any:
+        self._ensure_started()
+        fut: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        await self._queues[self.shard_of(key)].put((handler, event, data, fut, time.perf_counter()))
+        return await fut
+
+    async def _worker(self, queue: asyncio.Queue[_Job]) -> None:
+        while True:
+            handler, event, data, fut, enqueued_at = await queue.get()
+            waited = time.perf_counter() - enqueued_at
+            self.processed += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            try:
+                result = await handler(event, data)
+            except BaseException as e:
+                # любой исход (и CancelledError из хендлера) — в future, иначе submit висит
+                if not fut.done():
+                    fut.set_exception(e)
+                task = asyncio.current_task()
+                if (task is not None and task.cancelling()) or not isinstance(
+                    e, Exception | asyncio.CancelledError
+                ):
+                    raise  # отменили сам воркер (close) или KeyboardInterrupt/SystemExit
+            else:
+                if not fut.done():
+                    fut.set_result(result)
+            finally:
+                queue.task_done()
+
+    def depths(self) -> list[int]:
+        return [q.qsize() for q in self._queues]
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "queued": sum(self.depths()),
+            "processed": self.processed,
+            "wait_avg_sec": self.wait_total / self.processed if self.processed else 0.0,
+            "wait_max_sec": self.wait_max,
+        }
+
+    async def close(self) -> None:
+        self._closing = True
+        for w in self._workers:
+            w.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queues = []
+
+
+class SchedulerMiddleware(BaseMiddleware):
+    """
+    Outer-middleware на dp.update: остаток цепочки (метрики, БД, роутинг)
+    выполняется в шарде пользователя. Регистрировать сразу после дедупа.
+    """
+
+    def __init__(self, scheduler: UserShardScheduler | None = None) -> None:
+        self.scheduler = scheduler or UserShardScheduler(
+            shards=settings.SCHEDULER_SHARDS, queue_size=settings.SCHEDULER_QUEUE_SIZE
+        )
+
+    async def __call__(self, handler: Handler, event: TelegramObject, data: dict[str, Any]) -> Any:
+        user: TgUser | None = data.get("event_from_user")
+        chat: Chat | None = data.get("event_chat")
+        if user is not None:
+            key = user.id
+        elif chat is not None:
+            key = chat.id
+        elif isinstance(event, Update):
+            key = event.update_id
+        else:
+            return await handler(event, data)
+        return await self.scheduler.submit(key, handler, event, data)
@@ -0,0 +1,402 @@
+# app/telegram/outbound.py
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from contextvars import ContextVar
+from typing import Any
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+from aiogram.methods import TelegramMethod
+
+from app.core.aio import sleep_or_wakeup
+from app.core.config import settings
+
+log = logging.getLogger(__name__)
+
+# приоритетные полосы: ответы на действия пользователя идут раньше рассылок
+INTERACTIVE = 0
+BULK = 1
+LANES = (INTERACTIVE, BULK)
+LANE_NAMES = ("interactive", "bulk")
+
+MAX_TEXT_LEN = 4096
+THROUGHPUT_WINDOW_SEC = 10.0
+
+# запрос уже прошёл лимитер (выполняется насосом очереди) — middleware его не трогает
+_dispatching: ContextVar[bool] = ContextVar("outbound_dispatching", default=False)
+
+
+class TokenBucket:
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready_at(self, now: float) -> float:
+        self._refill(now)
+        return now if self.tokens >= 1 else now + (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class _Item:
+    __slots__ = (
+        "attempts", "bot", "call", "coalesce", "enqueued_at",
+        "future", "kwargs", "priority", "text",
+    )
+
+    def __init__(
+        self,
+        priority: int,
+        future: asyncio.Future[Any],
+        enqueued_at: float,
+        call: Callable[[], Awaitable[Any]] | None = None,
+        bot: Bot | None = None,
+        text: str = "",
+        kwargs: dict[str, Any] | None = None,
+        coalesce: bool = False,
+    ) -> None:
+        self.priority = priority
+        self.call = call
+        self.bot = bot
+        self.text = text
+        self.kwargs = kwargs or {}
+        self.coalesce = coalesce
+        self.future = future
+        self.enqueued_at = enqueued_at
+        self.attempts = 0
+
+
+class _Chat:
+    __slots__ = ("bucket", "busy", "lanes", "not_before", "version")
+
+    def __init__(self, bucket: TokenBucket) -> None:
+        self.lanes: tuple[deque[_Item], ...] = tuple(deque() for _ in LANES)
+        self.bucket = bucket
+        self.busy = False
+        self.version = 0
+        self.not_before = 0.0
+
+    def lane(self) -> int | None:
+        return next((i for i in LANES if self.lanes[i]), None)
+
+
+class OutboundQueue:
+    """
+    Исходящие сообщения бота с лимитами Telegram.
+
+    Токен-бакеты: общий (global_rate в секунду) и на чат (chat_rate, с запасом
+    chat_burst). У каждого чата своя FIFO на полосу; чат стоит в куче своей
+    старшей полосы по времени, когда у него появится токен. Насос берёт
+    готовый чат из INTERACTIVE, затем из BULK, списывает токены и запускает
+    отправку фоном (в чате — строго по одной, порядок сохраняется).
+
+    429 (retry_after) — пауза всей отправки и повтор; сетевые/5xx — повтор
+    с бэкоффом по чату; прочие ошибки (бот заблокирован и т.п.) отдаются
+    в future. Подряд идущие coalesce-сообщения одного чата склеиваются в одно.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30,
+        chat_rate: float = 1.0,
+        chat_burst: float = 3,
+        max_attempts: int = 5,
+        max_in_flight: int = 64,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_attempts = max_attempts
+        self.max_in_flight = max_in_flight
+        self._clock = clock
+        # общий бакет без запаса: ровно global_rate в любое скользящее окно в 1 с
+        self._global = TokenBucket(global_rate, 1, clock())
+        self._chats: dict[int, _Chat] = {}
+        self._ready: tuple[list[tuple[float, int, int, int]], ...] = tuple([] for _ in LANES)
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self._in_flight: set[asyncio.Task[None]] = set()
+        self._wakeup: asyncio.Event | None = None
+        self._pump_task: asyncio.Task[None] | None = None
+
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.retry_after = 0
+        self.coalesced = 0
+        self._depth = [0 for _ in LANES]
+        self._lags: tuple[deque[float], ...] = tuple(deque(maxlen=1024) for _ in LANES)
+        self._sent_at: deque[float] = deque()
+
+    # --- постановка в очередь ---
+
+    def submit(
+        self, chat_id: int, call: Callable[[], Awaitable[Any]], priority: int = INTERACTIVE
+    ) -> asyncio.Future[Any]:
+        """Произвольный запрос к API, адресованный чату; результат — в future."""
+        fut = asyncio.get_running_loop().create_future()
+        self._enqueue(chat_id, _Item(priority, fut, self._clock(), call=call))
+        return fut
+
+    def send_message(
+        self,
+        bot: Bot,
+        chat_id: int,
+        text: str,
+        priority: int = BULK,
+        coalesce: bool = False,
+        **kwargs: Any,
+    ) -> asyncio.Future[Any]:
+        """
+        sendMessage через очередь. coalesce=True — сообщение можно склеить с
+        соседними такими же в этом чате (напоминания, сводки), если те ещё не ушли.
+        """
+        fut = asyncio.get_running_loop().create_future()
+        item = _Item(
+            priority, fut, self._clock(), bot=bot, text=text, kwargs=kwargs, coalesce=coalesce
+        )
+        self._enqueue(chat_id, item)
+        return fut
+
+    def _enqueue(self, chat_id: int, item: _Item) -> None:
+        self._ensure_pump()
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst, self._clock())
+            chat = self._chats[chat_id] = _Chat(bucket)
+        chat.lanes[item.priority].append(item)
+        self._depth[item.priority] += 1
+        if not chat.busy:
+            self._schedule(chat_id, chat)
+
+    def _schedule(self, chat_id: int, chat: _Chat) -> None:
+        lane = chat.lane()
+        if lane is None:
+            idle = self.chat_burst / self.chat_rate
+            asyncio.get_running_loop().call_later(idle, self._drop_idle, chat_id)
+            return
+        # старая запись чата в куче (другой полосы) станет неактуальной
+        chat.version += 1
+        now = self._clock()
+        ready_at = max(chat.bucket.ready_at(now), chat.not_before)
+        heapq.heappush(self._ready[lane], (ready_at, next(self._seq), chat_id, chat.version))
+        # _schedule идёт после _enqueue -> _ensure_pump: событие уже создано
+        assert self._wakeup is not None
+        self._wakeup.set()
+
+    def _drop_idle(self, chat_id: int) -> None:
+        chat = self._chats.get(chat_id)
+        if chat is None or chat.busy or chat.lane() is not None:
+            return
+        if chat.bucket.full(self._clock()):
+            del self._chats[chat_id]
+
+    # --- насос ---
+
+    def _ensure_pump(self) -> None:
+        loop = asyncio.get_running_loop()
+        task = self._pump_task
+        if task is None or task.done() or task.get_loop() is not loop:
+            self._wakeup = asyncio.Event()
+            self._pump_task = loop.create_task(self._pump())
+
+    def _top(self, lane: int) -> tuple[float, int, int, int] | None:
+        heap = self._ready[lane]
+        while heap:
+            _, _, chat_id, version = heap[0]
+            chat = self._chats.get(chat_id)
+            if chat is not None and chat.version == version and not chat.busy:
+                return heap[0]
+            heapq.heappop(heap)
+        return None
+
+    async def _pump(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            now = self._clock()
+            wait = max(self._paused_until, self._global.ready_at(now)) - now
+            timeout: float | None = wait
+            if wait <= 0 and len(self._in_flight) < self.max_in_flight:
+                tops = [self._top(lane) for lane in LANES]
+                for lane, top in zip(LANES, tops, strict=True):
+                    if top is not None and top[0] <= now:
+                        heapq.heappop(self._ready[lane])
+                        self._dispatch(top[2], now)
+                        break
+                else:
+                    ready = [t[0] for t in tops if t is not None]
+                    timeout = min(ready) - now if ready else None
+                if timeout is not None and timeout <= 0:
+                    continue
+            elif wait <= 0:
+                timeout = None  # ждём завершения отправки
+            await self._sleep(timeout)
+
+    async def _sleep(self, timeout: float | None) -> None:
+        """До timeout или до _wakeup.set() (новое сообщение, завершённая отправка)."""
+        assert self._wakeup is not None
+        await sleep_or_wakeup(self._wakeup, timeout)
+
+    def _dispatch(self, chat_id: int, now: float) -> None:
+        chat = self._chats[chat_id]
+        lane = chat.lane()
+        assert lane is not None
+        chat.busy = True
+        chat.version += 1
+        chat.bucket.take(now)
+        self._global.take(now)
+
+        queue = chat.lanes[lane]
+        batch = [queue.popleft()]
+        if batch[0].coalesce:
+            size = len(batch[0].text)
+            while queue and queue[0].coalesce and size + 2 + len(queue[0].text) <= MAX_TEXT_LEN:
+                size += 2 + len(queue[0].text)
+                batch.append(queue.popleft())
+        self._depth[lane] -= len(batch)
+
+        task = asyncio.create_task(self._send(chat_id, chat, lane, batch))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _send(self, chat_id: int, chat: _Chat, lane: int, batch: list[_Item]) -> None:
+        _dispatching.set(True)  # контекст задачи — свой, наружу не протекает
+        head = batch[0]
+        try:
+            if head.call is not None:
+                result = await head.call()
+            else:
+                assert head.bot is not None
+                text = "\n\n".join(item.text for item in batch)
+                result = await head.bot.send_message(chat_id, text, **head.kwargs)
+        except TelegramRetryAfter as e:
+            self.retry_after += 1
+            self._paused_until = max(self._paused_until, self._clock() + e.retry_after)
+            log.warning("outbound: flood control, pausing for %ss", e.retry_after)
+            self._retry(chat_id, chat, lane, batch, e)
+        except (TelegramNetworkError, TelegramServerError) as e:
+            chat.not_before = self._clock() + min(2 ** head.attempts, 30)
+            self._retry(chat_id, chat, lane, batch, e)
+        except Exception as e:
+            self._fail(chat_id, batch, e)
+        else:
+            now = self._clock()
+            self.sent += 1
+            self.coalesced += len(batch) - 1
+            self._sent_at.append(now)
+            for item in batch:
+                self._lags[lane].append(now - item.enqueued_at)
+                if not item.future.done():
+                    item.future.set_result(result)
+        finally:
+            chat.busy = False
+            self._schedule(chat_id, chat)
+            assert self._wakeup is not None
+            self._wakeup.set()
+
+    def _retry(
+        self, chat_id: int, chat: _Chat, lane: int, batch: list[_Item], error: Exception
+    ) -> None:
+        head = batch[0]
+        head.attempts += 1
+        if head.attempts >= self.max_attempts:
+            self._fail(chat_id, batch, error)
+            return
+        self.retried += 1
+        for item in batch:
+            item.attempts = head.attempts
+        chat.lanes[lane].extendleft(reversed(batch))
+        self._depth[lane] += len(batch)
+
+    def _fail(self, chat_id: int, batch: list[_Item], error: Exception) -> None:
+        self.failed += len(batch)
+        log.warning("outbound: dropping %d message(s) to %s: %s", len(batch), chat_id, error)
+        for item in batch:
+            if not item.future.done():
+                item.future.set_exception(error)
+                # ошибка уже залогирована: рассылки future не ждут — не шумим «never retrieved»
+                item.future.exception()
+
+    # --- остановка и метрики ---
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """Дождаться отправки очереди (не дольше timeout) и остановить насос."""
+        deadline = self._clock() + timeout
+        while (sum(self._depth) or self._in_flight) and self._clock() < deadline:
+            await asyncio.sleep(0.05)
+        if self._pump_task is not None:
+            self._pump_task.cancel()
+            await asyncio.gather(self._pump_task, return_exceptions=True)
+            self._pump_task = None
+
+    def stats(self) -> dict[str, float]:
+        now = self._clock()
+        while self._sent_at and now - self._sent_at[0] > THROUGHPUT_WINDOW_SEC:
+            self._sent_at.popleft()
+        out: dict[str, float] = {
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "retry_after": self.retry_after,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+            "chats": len(self._chats),
+            "throughput_per_sec": round(len(self._sent_at) / THROUGHPUT_WINDOW_SEC, 2),
+        }
+        for lane, name in zip(LANES, LANE_NAMES, strict=True):
+            lags = sorted(self._lags[lane])
+            out[f"depth_{name}"] = self._depth[lane]
+            out[f"lag_p50_ms_{name}"] = round(lags[len(lags) // 2] * 1000, 1) if lags else 0.0
+            p95 = lags[int(len(lags) * 0.95)] if lags else 0.0
+            out[f"lag_p95_ms_{name}"] = round(p95 * 1000, 1)
+        return out
+
+
+class OutboundMiddleware(BaseRequestMiddleware):
+    """
+    Request-middleware сессии бота: всё, что адресовано чату (ответы хендлеров,
+    send_*/edit_*), идёт через OutboundQueue в полосе INTERACTIVE; остальные
+    методы (answerCallbackQuery, getMe, ...) — напрямую.
+    """
+
+    def __init__(self, queue: OutboundQueue) -> None:
+        self.queue = queue
+
+    async def __call__(
+        self, make_request: NextRequestMiddlewareType[Any], bot: Bot, method: TelegramMethod[Any]
+    ) -> Any:
+        chat_id = getattr(method, "chat_id", None)
+        if _dispatching.get() or not isinstance(chat_id, int):
+            return await make_request(bot, method)
+        return await self.queue.submit(chat_id, lambda: make_request(bot, method), INTERACTIVE)
+
+
+outbound = OutboundQueue(
+    global_rate=settings.OUTBOUND_GLOBAL_RATE,
+    chat_rate=settings.OUTBOUND_CHAT_RATE,
+    chat_burst=settings.OUTBOUND_CHAT_BURST,
+    max_attempts=settings.OUTBOUND_MAX_ATTEMPTS,
+)
@@ -0,0 +1,100 @@
+# app/telegram/storage.py
+from __future__ import annotations
+
+import json
+import logging
+import time
+from collections.abc import Mapping
+from functools import partial
+from typing import Any
+
+from aiogram.fsm.storage.base import BaseEventIsolation, BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage, SimpleEventIsolation
+from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisStorage
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+log = logging.getLogger(__name__)
+
+# Компактная сериализация FSM-данных: без пробелов и без \uXXXX-экранирования
+# (кириллица в UTF-8 вдвое короче, чем в escape-последовательностях).
+_dumps = partial(json.dumps, separators=(",", ":"), ensure_ascii=False)
+
+FSM_SECONDS = metrics.histogram("fsm_storage_seconds", "FSM storage call latency", ("op",))
+
+
+class TimedStorage(BaseStorage):
+    """Обёртка над хранилищем FSM: латентность каждой операции — в гистограмму по op."""
+
+    def __init__(self, inner: BaseStorage) -> None:
+        self.inner = inner
+        ops = ("get_state", "set_state", "get_data", "set_data")
+        self._timers = {op: FSM_SECONDS.labels(op) for op in ops}
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        t0 = time.perf_counter()
+        try:
+            await self.inner.set_state(key, state)
+        finally:
+            self._timers["set_state"].observe(time.perf_counter() - t0)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        t0 = time.perf_counter()
+        try:
+            return await self.inner.get_state(key)
+        finally:
+            self._timers["get_state"].observe(time.perf_counter() - t0)
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        t0 = time.perf_counter()
+        try:
+            await self.inner.set_data(key, data)
+        finally:
+            self._timers["set_data"].observe(time.perf_counter() - t0)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        t0 = time.perf_counter()
+        try:
+            return await self.inner.get_data(key)
+        finally:
+            self._timers["get_data"].observe(time.perf_counter() - t0)
+
+    async def close(self) -> None:
+        await self.inner.close()
+
+
+def build_fsm_storage(redis_url: str | None = None) -> BaseStorage:
+    """
+    Redis, если задан REDIS_URL (состояния переживают рестарт и общие для всех
+    реплик бота), иначе — MemoryStorage для локальной разработки.
+    TTL на ключах — чтобы брошенные на середине онбординги сами протухали.
+    Любое из них обёрнуто в TimedStorage (латентность — в /metrics).
+    """
+    redis_url = redis_url if redis_url is not None else settings.REDIS_URL
+    if not redis_url:
+        log.info("FSM storage: memory (REDIS_URL is not set)")
+        return TimedStorage(MemoryStorage())
+
+    log.info("FSM storage: redis")
+    return TimedStorage(RedisStorage.from_url(
+        redis_url,
+        key_builder=DefaultKeyBuilder(prefix=settings.FSM_KEY_PREFIX),
+        state_ttl=settings.FSM_STATE_TTL_SEC,
+        data_ttl=settings.FSM_DATA_TTL_SEC,
+        json_dumps=_dumps,
+        json_loads=json.loads,
+    ))
+
+
+def build_events_isolation(storage: BaseStorage) -> BaseEventIsolation:
+    """
+    Апдейты одного пользователя — строго по одному: FSMContextMiddleware читает
+    состояние уже под этой блокировкой, то есть после того, как предыдущий апдейт
+    его записал (без неё два быстрых нажатия оба видят старое состояние).
+    С Redis-хранилищем блокировка тоже в Redis — общая для всех реплик бота.
+    """
+    inner = storage.inner if isinstance(storage, TimedStorage) else storage
+    if isinstance(inner, RedisStorage):
+        return inner.create_isolation()
+    return SimpleEventIsolation()
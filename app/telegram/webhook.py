@@ -0,0 +1,70 @@
+# app/telegram/webhook.py
+from __future__ import annotations
+
+import asyncio
+import hmac
+import logging
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+log = logging.getLogger(__name__)
+
+
+class WebhookFeeder:
+    """
+    Приём апдейтов через webhook: проверяет secret token, отдаёт апдейт в тот же
+    Dispatcher, что и polling, но обработку запускает фоном — HTTP-ответ
+    Telegram получает сразу, не дожидаясь хендлеров. Если в работе уже
+    max_in_flight апдейтов, feed() ждёт свободного места — ответ задерживается,
+    и Telegram сам притормаживает доставку.
+    """
+
+    def __init__(self, bot: Bot, dp: Dispatcher, secret: str, max_in_flight: int = 1000) -> None:
+        if not secret:
+            raise ValueError("webhook secret token is required")
+        self.bot = bot
+        self.dp = dp
+        self.secret = secret
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._tasks: set[asyncio.Task[Any]] = set()
+
+    def check_secret(self, token: str | None) -> bool:
+        return token is not None and hmac.compare_digest(token, self.secret)
+
+    async def feed(self, payload: dict[str, Any]) -> None:
+        update = Update.model_validate(payload, context={"bot": self.bot})
+        await self._slots.acquire()
+        task = asyncio.create_task(self.dp.feed_update(self.bot, update))
+        self._tasks.add(task)
+        task.add_done_callback(self._on_done)
+
+    def _on_done(self, task: asyncio.Task[Any]) -> None:
+        self._tasks.discard(task)
+        self._slots.release()
+        if not task.cancelled() and task.exception() is not None:
+            log.error("webhook update failed", exc_info=task.exception())
+
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    async def setup(self, url: str, drop_pending_updates: bool = False) -> None:
+        # как и в polling: startup-хуки (шедулер напоминаний и т.п.)
+        await self.dp.emit_startup(bot=self.bot)
+        # регистрируем всегда, даже если URL уже тот же: getWebhookInfo не показывает
+        # secret token, и после его смены Telegram слал бы апдейты со старым (403)
+        await self.bot.set_webhook(
+            url,
+            secret_token=self.secret,
+            allowed_updates=self.dp.resolve_used_update_types(),
+            drop_pending_updates=drop_pending_updates,
+        )
+
+    async def shutdown(self) -> None:
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        # как и в polling: закрывает FSM-хранилище, шедулер и прочие shutdown-хуки
+        await self.dp.emit_shutdown(bot=self.bot)
+        await self.bot.session.close()
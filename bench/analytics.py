@@ -0,0 +1,102 @@
+"""
+Бенчмарк app.services.analytics: векторные метрики против наивного цикла по строкам.
+
+    python -m bench.analytics [--sets 1000000]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.services import analytics
+from app.services.pr_engine import estimate_1rm
+
+MUSCLES = ["chest", "back", "legs", "shoulders", "arms", None]
+
+
+def synthetic_rows(n: int, seed: int = 0) -> list[tuple]:
+    rng = np.random.default_rng(seed)
+    start = datetime(2020, 1, 1)
+    seconds = np.sort(rng.integers(0, 5 * 365 * 86400, n))
+    weights = np.round(rng.uniform(20, 180, n) / 2.5) * 2.5
+    reps = rng.integers(1, 16, n)
+    rpe = np.where(rng.random(n) < 0.3, np.nan, np.round(rng.uniform(6, 10, n) * 2) / 2)
+    ex = rng.integers(1, 60, n)
+    return [
+        (
+            start + timedelta(seconds=int(s)), float(w), int(r),
+            None if np.isnan(p) else float(p), int(e), MUSCLES[int(e) % len(MUSCLES)],
+        )
+        for s, w, r, p, e in zip(seconds, weights, reps, rpe, ex, strict=True)
+    ]
+
+
+def naive(rows: list[tuple]) -> tuple:
+    trend: dict = defaultdict(dict)
+    tonnage: dict = defaultdict(float)
+    muscle: dict = defaultdict(lambda: {"sets": 0, "reps": 0, "tonnage": 0.0})
+    rpe: dict = defaultdict(int)
+    for ts, w, r, p, ex, m in rows:
+        est = estimate_1rm(w, r)
+        day = ts.date()
+        if est > 0 and est > trend[ex].get(day, 0.0):
+            trend[ex][day] = est
+        week = day - timedelta(days=day.weekday())
+        tonnage[week] += w * r
+        mv = muscle[m or ""]
+        mv["sets"] += 1
+        mv["reps"] += r
+        mv["tonnage"] += w * r
+        if p is not None:
+            rpe[round(p / 0.5) * 0.5] += 1
+    return trend, tonnage, muscle, rpe
+
+
+def vectorized(cols: analytics.SetColumns) -> tuple:
+    return (
+        analytics.e1rm_trend(cols),
+        analytics.weekly_tonnage(cols),
+        analytics.muscle_volume(cols),
+        analytics.rpe_distribution(cols),
+    )
+
+
+def _timeit(fn, *args, repeat: int = 3) -> tuple[float, object]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sets", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.sets)
+    t_cols, cols = _timeit(analytics.to_columns, rows, repeat=1)
+    t_naive, (n_trend, n_tonnage, n_muscle, n_rpe) = _timeit(naive, rows)
+    t_vec, (v_trend, v_tonnage, v_muscle, v_rpe) = _timeit(vectorized, cols)
+
+    # результаты должны совпадать
+    for k, mv in v_muscle.items():
+        assert mv["sets"] == n_muscle[k]["sets"] and mv["reps"] == n_muscle[k]["reps"]
+        assert abs(mv["tonnage"] - n_muscle[k]["tonnage"]) < 1e-3 * mv["tonnage"]
+    assert v_rpe == dict(n_rpe)
+    assert np.allclose(v_tonnage[1], [n_tonnage[w] for w in v_tonnage[0].astype(datetime)])
+    assert sum(len(d) for d, _ in v_trend.values()) == sum(len(v) for v in n_trend.values())
+
+    print(f"sets:              {args.sets:,}")
+    print(f"rows -> columns:   {t_cols * 1000:9.1f} ms (one-off, part of loading)")
+    print(f"naive per-row:     {t_naive * 1000:9.1f} ms")
+    print(f"vectorized:        {t_vec * 1000:9.1f} ms  (x{t_naive / t_vec:.1f})")
+
+
+if __name__ == "__main__":
+    main()
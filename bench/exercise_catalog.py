@@ -0,0 +1,104 @@
+"""
+Бенчмарк app.services.exercise_catalog: поиск по каталогу в памяти против
+LIKE '%...%' в БД (SQLite в памяти — нижняя граница для сетевого Postgres).
+
+    python -m bench.exercise_catalog [--exercises 2000] [--queries 20000]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+import tracemalloc
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db.models import Exercise
+from app.services.exercise_catalog import ExerciseCatalog
+
+MOVES = ["Жим", "Тяга", "Разведение", "Подъём", "Сгибание", "Разгибание", "Приседания", "Выпады",
+         "Press", "Row", "Curl", "Deadlift", "Squat", "Fly", "Raise", "Extension"]
+TOOLS = ["штанги", "гантелей", "в тренажёре", "на блоке", "гири", "barbell", "dumbbell", "cable", "machine"]
+ANGLES = ["", "лёжа", "сидя", "стоя", "на наклонной", "обратным хватом", "incline", "single-arm", "wide grip"]
+MUSCLES = ["chest", "back", "legs", "shoulders", "biceps", "triceps", "core"]
+EQUIPMENT = ["barbell", "dumbbell", "machine", "cable", "bodyweight", "kettlebell"]
+
+
+def typo(rng: random.Random, text: str) -> str:
+    if len(text) < 5:
+        return text
+    i = rng.randrange(1, len(text) - 1)
+    return text[:i] + text[i + 1:]  # пропущенная буква
+
+
+async def run(n_exercises: int, n_queries: int) -> None:
+    rng = random.Random(0)
+    names: set[str] = set()
+    while len(names) < n_exercises:
+        names.add(" ".join(filter(None, [rng.choice(MOVES), rng.choice(TOOLS), rng.choice(ANGLES)]))
+                  + f" #{len(names)}")
+    rows = [
+        {"id": i, "name": name, "muscle": rng.choice(MUSCLES), "equipment": rng.choice(EQUIPMENT)}
+        for i, name in enumerate(sorted(names), 1)
+    ]
+
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.execute(insert(Exercise.__table__), rows)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    catalog = ExerciseCatalog(session_factory=factory)
+    t0 = time.perf_counter()
+    await catalog.load()
+    t_load = time.perf_counter() - t0
+    # память индекса — отдельной загрузкой: под tracemalloc время не показательно
+    tracemalloc.start()
+    probe = ExerciseCatalog(session_factory=factory)
+    await probe.load()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del probe
+
+    queries = [typo(rng, " ".join(r["name"].split()[:2])) for r in rng.choices(rows, k=n_queries)]
+    t0 = time.perf_counter()
+    for q in queries:
+        catalog.search(q, limit=5)
+    t_mem = (time.perf_counter() - t0) / n_queries
+
+    t0 = time.perf_counter()
+    for q in queries[:1000]:
+        catalog.search(q, muscle="chest", limit=5)
+    t_filtered = (time.perf_counter() - t0) / 1000
+
+    n_db = min(n_queries, 2000)
+    t0 = time.perf_counter()
+    async with factory() as s:
+        for q in queries[:n_db]:
+            # «как было»: подстрока в БД, опечатку не находит вовсе
+            (await s.exec(select(Exercise).where(col(Exercise.name).ilike(f"%{q}%")).limit(5))).all()
+    t_db = (time.perf_counter() - t0) / n_db
+    await engine.dispose()
+
+    print(f"exercises:              {n_exercises:,}")
+    print(f"load + index:           {t_load * 1000:8.1f} ms, {size / 1024 / 1024:.1f} MiB")
+    print(f"search (fuzzy):         {t_mem * 1e6:8.1f} us/query")
+    print(f"search + muscle filter: {t_filtered * 1e6:8.1f} us/query")
+    print(f"ILIKE in SQLite:        {t_db * 1e6:8.1f} us/query (no typo tolerance)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--exercises", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=20_000)
+    args = parser.parse_args()
+    asyncio.run(run(args.exercises, args.queries))
+
+
+if __name__ == "__main__":
+    main()
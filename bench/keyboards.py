@@ -0,0 +1,68 @@
+"""
+Микробенчмарк клавиатур: сборка разметки + подготовка тела запроса sendMessage.
+
+Сравниваем «как было» (новая ReplyKeyboardMarkup на каждое сообщение и
+сериализация в AiohttpSession) с реестром (один замороженный объект и готовый
+JSON в KeyboardCachingSession). Печатаем время и выделенную память на сообщение.
+
+    python -m bench.keyboards [--messages 20000]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import SendMessage
+
+from app.telegram.keyboards import reply
+from app.telegram.keyboards.registry import KeyboardCachingSession
+
+fresh_main_kb = reply.main_kb.__wrapped__  # исходный билдер, мимо кэша
+
+
+def measure(n: int, build: Callable[[], Any], session: AiohttpSession, bot: Bot) -> tuple[float, float]:
+    def one(i: int) -> None:
+        session.build_form_data(bot, SendMessage(chat_id=i, text="Выбери действие", reply_markup=build()))
+
+    for i in range(100):  # прогрев: кэши, ленивые схемы pydantic
+        one(i)
+
+    t0 = time.perf_counter()
+    for i in range(n):
+        one(i)
+    elapsed = time.perf_counter() - t0
+
+    # пик памяти внутри одного сообщения (всё временное освобождается после отправки)
+    tracemalloc.start()
+    peaks = 0
+    for i in range(1000):
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        one(i)
+        peaks += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return elapsed / n * 1e6, peaks / 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=20_000)
+    args = parser.parse_args()
+
+    bot = Bot("42:BENCH")
+    before = measure(args.messages, fresh_main_kb, AiohttpSession(), bot)
+    after = measure(args.messages, reply.main_kb, KeyboardCachingSession(), bot)
+
+    print(f"messages:               {args.messages:,}")
+    print(f"fresh kb + serialize:   {before[0]:7.1f} us/msg, peak {before[1]:7.0f} B/msg")
+    print(f"registry + cached JSON: {after[0]:7.1f} us/msg, peak {after[1]:7.0f} B/msg")
+    print(f"speedup:                {before[0] / after[0]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Нагрузочный прогон app.telegram.outbound против локального фейкового Bot API.
+
+Фейковый сервер (aiohttp) отвечает на sendMessage и, как Telegram, возвращает
+429 c retry_after при превышении лимитов (global/с, на чат/с). Сценарий —
+рассылка по N чатам (часть сообщений склеиваемые) и поток интерактивных
+ответов поверх неё; печатаем пропускную способность, лаг по полосам и число 429.
+
+    python -m bench.outbound [--chats 300] [--per-chat 3] [--rate 30]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from collections import defaultdict, deque
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiohttp import web
+
+from app.telegram.outbound import BULK, OutboundMiddleware, OutboundQueue
+
+
+class FakeBotAPI:
+    def __init__(self, global_rate: int, chat_limit: int) -> None:
+        self.global_rate = global_rate
+        self.chat_limit = chat_limit
+        self._global: deque[float] = deque()
+        self._chats: dict[int, deque[float]] = defaultdict(deque)
+        self.accepted = 0
+        self.rejected = 0
+
+    @staticmethod
+    def _window(q: deque[float], now: float) -> int:
+        while q and now - q[0] >= 1.0:
+            q.popleft()
+        return len(q)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        data = await request.post()
+        chat_id = int(data["chat_id"])
+        now = time.monotonic()
+        if self._window(self._global, now) >= self.global_rate or self._window(self._chats[chat_id], now) >= self.chat_limit:
+            self.rejected += 1
+            return web.json_response({
+                "ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1",
+                "parameters": {"retry_after": 1},
+            })
+        self._global.append(now)
+        self._chats[chat_id].append(now)
+        self.accepted += 1
+        return web.json_response({"ok": True, "result": {
+            "message_id": self.accepted, "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"}, "text": data.get("text", ""),
+        }})
+
+
+async def run(chats: int, per_chat: int, rate: int) -> None:
+    api = FakeBotAPI(global_rate=rate, chat_limit=3)
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", api.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+
+    session = AiohttpSession(api=TelegramAPIServer.from_base(f"http://127.0.0.1:{port}"))
+    bot = Bot("42:BENCH", session=session)
+    queue = OutboundQueue(global_rate=rate, chat_rate=1.0, chat_burst=3)
+    bot.session.middleware(OutboundMiddleware(queue))
+
+    t0 = time.perf_counter()
+    bulk = [
+        queue.send_message(bot, chat, f"напоминание {i}", priority=BULK, coalesce=i > 0)
+        for i in range(per_chat) for chat in range(1, chats + 1)
+    ]
+
+    async def interactive() -> list[float]:
+        lags = []
+        for i in range(20):
+            await asyncio.sleep(0.25)
+            t = time.perf_counter()
+            await bot.send_message(100_000 + i, "ответ")  # через middleware -> INTERACTIVE
+            lags.append(time.perf_counter() - t)
+        return lags
+
+    lags, *_ = await asyncio.gather(interactive(), *bulk, return_exceptions=True)
+    elapsed = time.perf_counter() - t0
+    stats = queue.stats()
+    await queue.close()
+    await bot.session.close()
+    await runner.cleanup()
+
+    lags = sorted(lags) if isinstance(lags, list) else []
+    print(f"bulk messages:         {len(bulk):,} to {chats:,} chats")
+    print(f"api calls accepted:    {api.accepted:,}  (coalesced {stats['coalesced']:.0f}), 429s: {api.rejected}")
+    print(f"wall time:             {elapsed:8.2f} s  -> {api.accepted / elapsed:.1f} calls/s (limit {rate}/s)")
+    print(f"bulk lag p50/p95:      {stats['lag_p50_ms_bulk']:.0f} / {stats['lag_p95_ms_bulk']:.0f} ms")
+    if lags:
+        print(f"interactive p50/max:   {lags[len(lags) // 2] * 1000:.0f} / {lags[-1] * 1000:.0f} ms (under bulk load)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=300)
+    parser.add_argument("--per-chat", type=int, default=3)
+    parser.add_argument("--rate", type=int, default=30)
+    args = parser.parse_args()
+    asyncio.run(run(args.chats, args.per_chat, args.rate))
+
+
+if __name__ == "__main__":
+    main()
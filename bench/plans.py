@@ -0,0 +1,112 @@
+"""
+Бенчмарк app.services.plan_generator: 10k планов на SQLite в памяти.
+
+Генерация: шаблон на каждый план заново против кэша шаблонов (copy-and-personalize).
+Запись: пачками через PlanGenerator.save против ORM с flush на каждый WorkoutItem
+(ORM меряем на части планов — он на порядки медленнее).
+
+    python -m bench.plans [--plans 10000] [--batch 1000]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+
+from sqlalchemy import func, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db.models import Exercise, Plan, User, WorkoutDay, WorkoutItem
+from app.services.exercise_catalog import ExerciseCatalog
+from app.services.plan_generator import EQUIPMENT_SETS, GOAL_SCHEMES, SPLITS, PlanGenerator
+
+MUSCLES = ["chest", "back", "legs", "shoulders", "biceps", "triceps", "core"]
+EQUIPMENT = ["barbell", "dumbbell", "machine", "cable", "kettlebell", "band", None]
+INJURIES = [None, None, None, {"text": "колено"}, {"text": "поясница"}, {"text": "плечо и спина"}]
+
+
+async def run(n_plans: int, batch: int) -> None:
+    rng = random.Random(0)
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.execute(insert(Exercise.__table__), [
+            {"id": i, "name": f"Упражнение {i}", "muscle": MUSCLES[i % len(MUSCLES)],
+             "equipment": rng.choice(EQUIPMENT)}
+            for i in range(1, 301)
+        ])
+        await conn.execute(insert(User.__table__), [
+            {"id": i, "tg_id": i, "goal": rng.choice(list(GOAL_SCHEMES)), "level": rng.choice(list(SPLITS)),
+             "equipment": rng.choice(list(EQUIPMENT_SETS)), "injuries_json": rng.choice(INJURIES)}
+            for i in range(1, n_plans + 1)
+        ])
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as s:
+        users = list((await s.exec(select(User).order_by(User.id))).all())
+
+    catalog = ExerciseCatalog(session_factory=factory)
+    await catalog.load()
+    gen = PlanGenerator(catalog=catalog)
+
+    t0 = time.perf_counter()
+    for u in users:
+        gen._templates.clear()  # «как без кэша»: шаблон строится на каждый план
+        gen.generate(u)
+    t_cold = time.perf_counter() - t0
+
+    gen.precompute()
+    t0 = time.perf_counter()
+    for u in users:
+        gen.generate(u)
+    t_cached = time.perf_counter() - t0
+    drafts = [gen.generate(u) for u in users]
+
+    t0 = time.perf_counter()
+    for i in range(0, len(drafts), batch):
+        async with factory() as s:
+            await gen.save(s, drafts[i:i + batch])
+            await s.commit()
+    t_bulk = time.perf_counter() - t0
+
+    n_orm = min(500, n_plans)
+    t0 = time.perf_counter()
+    async with factory() as s:
+        for d in drafts[:n_orm]:
+            plan = Plan(user_id=d.user_id, name=d.name, weeks=d.weeks, split_type=d.split_type)
+            s.add(plan)
+            await s.flush()
+            for day_idx, rows in d.days:
+                day = WorkoutDay(plan_id=plan.id, day_idx=day_idx)
+                s.add(day)
+                await s.flush()
+                for row in rows:
+                    s.add(WorkoutItem(day_id=day.id, **row))
+                    await s.flush()
+        await s.rollback()
+    t_orm = (time.perf_counter() - t0) / n_orm * n_plans
+
+    async with factory() as s:
+        n_items = (await s.exec(select(func.count()).select_from(WorkoutItem))).one()
+    await engine.dispose()
+
+    print(f"plans:                   {n_plans:,} ({n_items:,} workout items)")
+    print(f"generate, no cache:      {t_cold * 1000:9.1f} ms  ({t_cold / n_plans * 1e6:.0f} us/plan)")
+    print(f"generate, cached tmpl:   {t_cached * 1000:9.1f} ms  ({t_cached / n_plans * 1e6:.0f} us/plan)")
+    print(f"save, bulk x{batch}:        {t_bulk * 1000:9.1f} ms")
+    print(f"save, ORM flush per row: {t_orm * 1000:9.1f} ms  (extrapolated from {n_orm})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--plans", type=int, default=10_000)
+    parser.add_argument("--batch", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(run(args.plans, args.batch))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Бенчмарк app.services.reminders: 100k пользователей с напоминаниями на SQLite в памяти.
+
+Меряем перевзвод всех расписаний (next_fire), загрузку часового окна страницами,
+срабатывание пика «все в 08:00» и память кучи.
+
+    python -m bench.reminders [--users 100000]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+import tracemalloc
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db.models import Reminder, User
+from app.services.reminders import ReminderScheduler, next_fire
+
+TZS = ["Europe/Moscow", "Europe/Berlin", "Asia/Almaty", "America/New_York", "UTC", "Asia/Tokyo"]
+
+
+async def run(n_users: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    rng = random.Random(0)
+    now = datetime(2026, 3, 2, 0, 0)
+    users = [{"id": i, "tg_id": i, "tz": rng.choice(TZS)} for i in range(1, n_users + 1)]
+    # половина — «классика» 08:00 по местному, остальные вразброс
+    schedules = [
+        (u["id"], rng.randrange(1, 128), 480 if rng.random() < 0.5 else rng.randrange(1440)) for u in users
+    ]
+
+    t0 = time.perf_counter()
+    reminders = [
+        {"user_id": uid, "weekdays": days, "minute_of_day": minute, "enabled": True,
+         "next_fire_at": next_fire(now, users[uid - 1]["tz"], days, minute)}
+        for uid, days, minute in schedules
+    ]
+    t_arm = time.perf_counter() - t0
+
+    async with factory() as s:
+        conn = await s.connection()
+        await conn.execute(insert(User.__table__), users)
+        await conn.execute(insert(Reminder.__table__), reminders)
+        await s.commit()
+
+    sent = 0
+
+    async def send(chat_id: int, text: str) -> None:
+        nonlocal sent
+        sent += 1
+
+    sched = ReminderScheduler(factory, horizon=3600, page_size=1000)
+    sched._send = send
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    await sched.tick(now)
+    t_load = time.perf_counter() - t0
+    armed = sched.stats()["armed"]
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # самый плотный час: сдвигаем часы по минуте и отрабатываем всё наступившее
+    t0 = time.perf_counter()
+    for minute in range(1, 24 * 60 + 1):
+        await sched.tick(datetime(2026, 3, 2, minute // 60 % 24, minute % 60) if minute < 1440
+                         else datetime(2026, 3, 3))
+    t_day = time.perf_counter() - t0
+    await engine.dispose()
+
+    print(f"users:                 {n_users:,}")
+    print(f"next_fire for all:     {t_arm * 1000:9.1f} ms")
+    print(f"load 1h window:        {t_load * 1000:9.1f} ms  ({armed:,} armed, {sched.pages_loaded} pages, "
+          f"peak {peak / 1024 / 1024:.1f} MiB)")
+    print(f"simulate 24h (1440 ticks): {t_day * 1000:9.1f} ms  ({sent:,} sent, {sched.missed} missed)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100_000)
+    args = parser.parse_args()
+    asyncio.run(run(args.users))
+
+
+if __name__ == "__main__":
+    main()
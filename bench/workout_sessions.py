@@ -0,0 +1,162 @@
+"""
+Нагрузочный прогон app.services.workout_runtime: N одновременных тренировок на SQLite в памяти.
+
+Каждый пользователь открывает тренировку по дню плана, пишет rounds раз по 3 подхода
+(через SetLogWriter, как бот) и отдыхает; таймеры отдыха крутятся на одном колесе.
+Для сравнения — те же таймеры как asyncio-задача со sleep на каждого пользователя.
+Дальше — рестарт (recover) и завершение всех тренировок.
+
+    python -m bench.workout_sessions [--sessions 10000] [--rounds 3]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+import tracemalloc
+from datetime import datetime
+
+from sqlalchemy import func, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.db.models import Exercise, Plan, User, WorkoutDay, WorkoutItem, WorkoutSession
+from app.services.plan_cache import plan_cache
+from app.services.set_entry import SetEntry
+from app.services.set_log_writer import SetLogWriter
+from app.services.workout_runtime import WorkoutRuntime
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _mem(fn) -> tuple[float, int]:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - t0
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, size
+
+
+async def run(n: int, rounds: int) -> None:
+    rng = random.Random(0)
+    weekday = datetime.utcnow().weekday()
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.execute(insert(Exercise.__table__), [{"id": i, "name": f"Упражнение {i}"} for i in range(1, 51)])
+        await conn.execute(insert(User.__table__), [{"id": i, "tg_id": i} for i in range(1, n + 1)])
+        await conn.execute(insert(Plan.__table__), [{"id": i, "user_id": i, "name": "План"} for i in range(1, n + 1)])
+        await conn.execute(insert(WorkoutDay.__table__), [
+            {"id": i, "plan_id": i, "day_idx": weekday} for i in range(1, n + 1)
+        ])
+        await conn.execute(insert(WorkoutItem.__table__), [
+            {"day_id": i, "exercise_id": rng.randint(1, 50), "order_idx": k, "sets": 3,
+             "reps_min": 8, "reps_max": 12, "rest_sec": rng.choice((60, 90, 120, 180))}
+            for i in range(1, n + 1) for k in range(5)
+        ])
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as s:
+        users = list((await s.exec(select(User).order_by(User.id))).all())
+
+    clock = Clock()
+    runtime = WorkoutRuntime(factory, clock=clock)
+    writer = SetLogWriter(session_factory=factory, max_batch=1000, max_delay=0.01)
+
+    t0 = time.perf_counter()
+    lives = []
+    for u in users:
+        async with factory() as s:
+            lives.append(await runtime.open(s, u))
+    t_open = time.perf_counter() - t0
+    plan_cache._plans.clear()
+
+    fired = 0
+    t_sets = t_ticks = 0.0
+    ticks = 0
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        batches = [runtime.rows(live, [SetEntry(rng.choice((60, 80, 100)), 8, None)] * 3) for live in lives]
+        await asyncio.gather(*(writer.submit(rows) for rows in batches))
+        for live, rows in zip(lives, batches, strict=True):
+            runtime.record(live, rows)
+        t_sets += time.perf_counter() - t0
+        # секунда за секундой до конца самого длинного отдыха
+        t0 = time.perf_counter()
+        for _ in range(181):
+            clock.now += 1
+            fired += len(runtime.wheel.advance(clock.now))
+            ticks += 1
+        t_ticks += time.perf_counter() - t0
+    await writer.close()
+
+    # память таймеров: колесо + live-состояние против задачи со sleep на каждого
+    def arm_wheel() -> None:
+        for live in lives:
+            runtime._arm(live.user_id, clock.now + 120)
+
+    runtime.wheel = type(runtime.wheel)(runtime.wheel.tick, len(runtime.wheel._slots), start=clock.now)
+    t_wheel, mem_wheel = _mem(arm_wheel)
+    tasks: list[asyncio.Task[None]] = []
+    t_tasks, mem_tasks = _mem(lambda: tasks.extend(asyncio.create_task(asyncio.sleep(120)) for _ in lives))
+    await asyncio.sleep(0)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    tracemalloc.start()
+    snapshot = [type(live)(live.session_id, live.user_id, live.chat_id, live.day_id, live.items, live.item_id,
+                           live.set_index, live.sets_done, live.tonnage_kg, live.last_set_at) for live in lives]
+    mem_live, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del snapshot
+
+    restarted = WorkoutRuntime(factory, clock=clock)
+    t0 = time.perf_counter()
+    recovered = await restarted.recover()
+    t_recover = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for u in users:
+        async with factory() as s:
+            await restarted.finish(s, u)
+            await s.commit()
+    t_finish = time.perf_counter() - t0
+
+    async with factory() as s:
+        done, sets = (await s.exec(
+            select(func.count(), func.sum(WorkoutSession.sets_count)).where(WorkoutSession.finished_at.is_not(None))
+        )).one()
+    await engine.dispose()
+
+    print(f"sessions:                {n:,}  ({sets:,} sets, {done:,} finished)")
+    print(f"open (1 commit each):    {t_open * 1000:9.1f} ms  ({t_open / n * 1e6:.0f} us/session)")
+    print(f"log {rounds}x3 sets, writer:   {t_sets * 1000:9.1f} ms")
+    print(f"wheel ticks:             {t_ticks * 1000:9.1f} ms  ({ticks} ticks, {fired:,} rest timers fired, "
+          f"{t_ticks / ticks * 1e6:.0f} us/tick)")
+    print(f"arm {n:,} timers, wheel:  {t_wheel * 1000:9.1f} ms  {mem_wheel / n:6.0f} B/timer")
+    print(f"arm {n:,} sleep tasks:    {t_tasks * 1000:9.1f} ms  {mem_tasks / n:6.0f} B/timer")
+    print(f"live state:              {mem_live / n:9.0f} B/session")
+    print(f"recover after restart:   {t_recover * 1000:9.1f} ms  ({recovered:,} sessions, 1 query)")
+    print(f"finish (1 UPDATE each):  {t_finish * 1000:9.1f} ms  ({t_finish / n * 1e6:.0f} us/session)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(run(args.sessions, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""initial schema
+
+Схема как в app.db.models на момент появления миграций. Имена FK и unique —
+как их выдал бы Postgres при create_all, чтобы следующие ревизии могли
+их адресовать (и базу, созданную create_all, можно было пометить
+`alembic stamp 0001`).
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _timestamps() -> list[sa.Column]:
+    return [
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    ]
+
+
+def upgrade() -> None:
+    op.create_table(
+        "exercises",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("muscle", sa.String(), nullable=True),
+        sa.Column("equipment", sa.String(), nullable=True),
+        sa.Column("video_url", sa.String(), nullable=True),
+        sa.Column("cues_text", sa.String(), nullable=True),
+    )
+    op.create_index("ix_exercises_name", "exercises", ["name"], unique=True)
+    op.create_index("ix_exercises_muscle", "exercises", ["muscle"])
+    op.create_index("ix_exercises_equipment", "exercises", ["equipment"])
+
+    op.create_table(
+        "users",
+        *_timestamps(),
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("tg_id", sa.Integer(), nullable=False),
+        sa.Column("tz", sa.String(), nullable=False),
+        sa.Column("level", sa.String(), nullable=True),
+        sa.Column("goal", sa.String(), nullable=True),
+        sa.Column("equipment", sa.String(), nullable=True),
+        sa.Column("injuries_json", sa.JSON(), nullable=True),
+    )
+    op.create_index("ix_users_tg_id", "users", ["tg_id"], unique=True)
+
+    op.create_table(
+        "plans",
+        *_timestamps(),
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("weeks", sa.Integer(), nullable=False),
+        sa.Column("split_type", sa.String(), nullable=True),
+        sa.Column("state", sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], name="plans_user_id_fkey"),
+    )
+    op.create_index("ix_plans_user_id", "plans", ["user_id"])
+
+    op.create_table(
+        "prs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("exercise_id", sa.Integer(), nullable=False),
+        sa.Column("one_rm", sa.Numeric(7, 2), server_default="0", nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.UniqueConstraint("user_id", "exercise_id", "date", name="uq_pr_user_exercise_date"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], name="prs_user_id_fkey"),
+        sa.ForeignKeyConstraint(["exercise_id"], ["exercises.id"], name="prs_exercise_id_fkey"),
+    )
+    op.create_index("ix_prs_user_id", "prs", ["user_id"])
+    op.create_index("ix_prs_exercise_id", "prs", ["exercise_id"])
+    op.create_index("ix_prs_date", "prs", ["date"])
+
+    op.create_table(
+        "reminders",
+        *_timestamps(),
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("weekdays", sa.Integer(), nullable=False),
+        sa.Column("minute_of_day", sa.Integer(), nullable=False),
+        sa.Column("enabled", sa.Boolean(), nullable=False),
+        sa.Column("next_fire_at", sa.DateTime(), nullable=True),
+        sa.CheckConstraint("minute_of_day >= 0 AND minute_of_day < 1440", name="ck_reminder_minute"),
+        sa.CheckConstraint("weekdays >= 0 AND weekdays < 128", name="ck_reminder_weekdays"),
+        sa.UniqueConstraint("user_id", name="reminders_user_id_key"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], name="reminders_user_id_fkey"),
+    )
+    op.create_index("ix_reminders_enabled_next_fire", "reminders", ["enabled", "next_fire_at", "id"])
+
+    op.create_table(
+        "weekly_muscle_volume",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("week_start", sa.Date(), nullable=False),
+        sa.Column("muscle", sa.String(), nullable=False),
+        sa.Column("sets", sa.Integer(), nullable=False),
+        sa.Column("reps", sa.Integer(), nullable=False),
+        sa.Column("tonnage_kg", sa.Numeric(14, 2), server_default="0", nullable=False),
+        sa.UniqueConstraint("user_id", "week_start", "muscle", name="uq_weekly_volume_user_week_muscle"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], name="weekly_muscle_volume_user_id_fkey"),
+    )
+
+    op.create_table(
+        "workout_days",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("plan_id", sa.Integer(), nullable=False),
+        sa.Column("day_idx", sa.Integer(), nullable=False),
+        sa.UniqueConstraint("plan_id", "day_idx", name="uq_workout_day_plan_idx"),
+        sa.ForeignKeyConstraint(["plan_id"], ["plans.id"], name="workout_days_plan_id_fkey"),
+    )
+    op.create_index("ix_workout_days_plan_id", "workout_days", ["plan_id"])
+    op.create_index("ix_workout_days_day_idx", "workout_days", ["day_idx"])
+
+    op.create_table(
+        "workout_items",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("day_id", sa.Integer(), nullable=False),
+        sa.Column("exercise_id", sa.Integer(), nullable=False),
+        sa.Column("order_idx", sa.Integer(), nullable=False),
+        sa.Column("sets", sa.Integer(), nullable=False),
+        sa.Column("reps_min", sa.Integer(), nullable=False),
+        sa.Column("reps_max", sa.Integer(), nullable=False),
+        sa.Column("rir_target", sa.Integer(), nullable=True),
+        sa.Column("rest_sec", sa.Integer(), nullable=False),
+        sa.Column("progression_json", sa.JSON(), server_default="{}", nullable=False),
+        sa.UniqueConstraint("day_id", "order_idx", name="uq_workout_item_day_order"),
+        sa.CheckConstraint("sets >= 1", name="ck_workout_item_sets"),
+        sa.CheckConstraint("reps_min >= 1 AND reps_max >= reps_min", name="ck_workout_item_reps"),
+        sa.CheckConstraint("rest_sec >= 0", name="ck_workout_item_rest"),
+        sa.ForeignKeyConstraint(["day_id"], ["workout_days.id"], name="workout_items_day_id_fkey"),
+        sa.ForeignKeyConstraint(["exercise_id"], ["exercises.id"], name="workout_items_exercise_id_fkey"),
+    )
+    op.create_index("ix_workout_items_day_id", "workout_items", ["day_id"])
+    op.create_index("ix_workout_items_exercise_id", "workout_items", ["exercise_id"])
+
+    op.create_table(
+        "workout_sessions",
+        *_timestamps(),
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("day_id", sa.Integer(), nullable=True),
+        sa.Column("notes", sa.String(), nullable=True),
+        sa.Column("sets_count", sa.Integer(), nullable=True),
+        sa.Column("tonnage_kg", sa.Numeric(10, 2), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], name="workout_sessions_user_id_fkey"),
+        sa.ForeignKeyConstraint(
+            ["day_id"], ["workout_days.id"], name="workout_sessions_day_id_fkey", ondelete="SET NULL"
+        ),
+    )
+    op.create_index("ix_workout_sessions_user_id", "workout_sessions", ["user_id"])
+    op.create_index("ix_workout_sessions_day_id", "workout_sessions", ["day_id"])
+
+    op.create_table(
+        "set_logs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("session_id", sa.Integer(), nullable=False),
+        sa.Column("workout_item_id", sa.Integer(), nullable=True),
+        sa.Column("ts", sa.DateTime(), nullable=False),
+        sa.Column("set_index", sa.Integer(), nullable=False),
+        sa.Column("weight_kg", sa.Numeric(7, 2), server_default="0", nullable=False),
+        sa.Column("reps", sa.Integer(), nullable=False),
+        sa.Column("rpe", sa.Float(), nullable=True),
+        sa.Column("rest_sec", sa.Integer(), nullable=True),
+        sa.Column("notes", sa.String(), nullable=True),
+        sa.CheckConstraint("reps >= 0", name="ck_setlog_reps"),
+        sa.CheckConstraint("weight_kg >= 0", name="ck_setlog_weight_nonneg"),
+        sa.CheckConstraint("(rpe IS NULL) OR (rpe >= 0 AND rpe <= 10)", name="ck_setlog_rpe_0_10"),
+        sa.CheckConstraint("(rest_sec IS NULL) OR (rest_sec >= 0)", name="ck_setlog_rest_nonneg"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], name="set_logs_user_id_fkey"),
+        sa.ForeignKeyConstraint(["session_id"], ["workout_sessions.id"], name="set_logs_session_id_fkey"),
+        sa.ForeignKeyConstraint(
+            ["workout_item_id"], ["workout_items.id"], name="set_logs_workout_item_id_fkey", ondelete="SET NULL"
+        ),
+    )
+    op.create_index("ix_set_logs_user_id", "set_logs", ["user_id"])
+    op.create_index("ix_set_logs_session_id", "set_logs", ["session_id"])
+    op.create_index("ix_set_logs_workout_item_id", "set_logs", ["workout_item_id"])
+    op.create_index("ix_set_logs_user_session", "set_logs", ["user_id", "session_id"])
+    op.create_index("ix_set_logs_user_ex_date", "set_logs", ["user_id", "workout_item_id", "ts"])
+    op.create_index("ix_set_logs_user_ts_id", "set_logs", ["user_id", "ts", "id"])
+
+
+def downgrade() -> None:
+    for table in (
+        "set_logs", "workout_sessions", "workout_items", "workout_days", "weekly_muscle_volume",
+        "reminders", "prs", "plans", "users", "exercises",
+    ):
+        op.drop_table(table)
@@ -0,0 +1,48 @@
+"""ON DELETE CASCADE on user-owned data
+
+Удаление пользователя (в том числе пачкой) одним DELETE FROM users: планы,
+тренировки, сеты, рекорды, агрегаты и напоминания уходят вместе с ним.
+Все ссылающиеся колонки проиндексированы — каскад не сканирует таблицы целиком.
+Ссылки на exercises остаются RESTRICT: упражнение из каталога с историей не удаляется.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# (таблица, колонка, ссылается на)
+CASCADES = (
+    ("plans", "user_id", "users"),
+    ("workout_days", "plan_id", "plans"),
+    ("workout_items", "day_id", "workout_days"),
+    ("workout_sessions", "user_id", "users"),
+    ("set_logs", "user_id", "users"),
+    ("set_logs", "session_id", "workout_sessions"),
+    ("prs", "user_id", "users"),
+    ("weekly_muscle_volume", "user_id", "users"),
+    ("reminders", "user_id", "users"),
+)
+
+
+def _recreate(ondelete: str | None) -> None:
+    for table, column, referent in CASCADES:
+        name = f"{table}_{column}_fkey"
+        with op.batch_alter_table(table) as batch:
+            batch.drop_constraint(name, type_="foreignkey")
+            batch.create_foreign_key(name, referent, [column], ["id"], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    _recreate("CASCADE")
+
+
+def downgrade() -> None:
+    _recreate(None)
@@ -0,0 +1,138 @@
+"""set_logs: monthly range partitions on ts, BRIN on ts
+
+set_logs только растёт. В Postgres таблица становится секционированной по месяцам
+(RANGE по ts): старые месяцы не трогаются вакуумом и индексами горячих данных,
+архивируются DETACH PARTITION, а не DELETE.
+
+- PK — (id, ts): ключ секционирования обязан входить в уникальные ограничения;
+  id по-прежнему из set_logs_id_seq, так что RETURNING id и журнал не меняются.
+- Пер-пользовательские B-tree остаются. «Последние сеты пользователя» по
+  ix_set_logs_user_ts_id (user_id, ts, id) идут ordered append'ом с последней
+  секции и останавливаются на LIMIT — старые месяцы не читаются.
+- BRIN по ts — для сканов по времени (rollups/бэкфилл PR/выгрузки): сеты пишутся
+  в порядке времени, индекс в тысячи раз меньше B-tree.
+- set_logs_ensure_partitions(months_ahead, since, until) создаёт недостающие
+  месячные секции; вызывается здесь и периодически из бота (app.services.partitions).
+- DEFAULT-секции нет намеренно: INSERT с ts вне созданных месяцев падает
+  («no partition of relation "set_logs" found for row»), а не копит строки в
+  секции, которая потом мешала бы создать месяц. Сеты пишутся с текущим ts,
+  секции держатся на PARTITIONS_AHEAD месяцев вперёд; импорт истории старше
+  первой секции — сначала set_logs_ensure_partitions(0, <min ts>).
+
+Данные переливаются INSERT ... SELECT в одной транзакции: для таблицы на сотни
+миллионов строк это окно обслуживания (или заранее перенести историю пачками).
+На других СУБД секционирования нет — только индекс по ts.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+PARTITIONS_AHEAD = 3
+
+ENSURE_PARTITIONS = """
+CREATE OR REPLACE FUNCTION set_logs_ensure_partitions(
+    months_ahead integer DEFAULT 3,
+    since timestamp DEFAULT NULL,
+    until timestamp DEFAULT NULL
+) RETURNS integer LANGUAGE plpgsql AS $$
+DECLARE
+    now_utc timestamp := now() AT TIME ZONE 'UTC';
+    m date := date_trunc('month', coalesce(least(since, now_utc), now_utc))::date;
+    last date := date_trunc(
+        'month', greatest(now_utc + make_interval(months => months_ahead), coalesce(until, now_utc))
+    )::date;
+    part text;
+    created integer := 0;
+BEGIN
+    -- несколько процессов бота вызывают функцию одновременно
+    PERFORM pg_advisory_xact_lock(hashtext('set_logs_ensure_partitions'));
+    WHILE m <= last LOOP
+        part := 'set_logs_' || to_char(m, 'YYYY_MM');
+        IF to_regclass(part) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF set_logs FOR VALUES FROM (%L) TO (%L)',
+                part, m, (m + interval '1 month')::date
+            );
+            created := created + 1;
+        END IF;
+        m := (m + interval '1 month')::date;
+    END LOOP;
+    RETURN created;
+END
+$$
+"""
+
+# после 0002: каскады с users и workout_sessions, SET NULL с workout_items
+FOREIGN_KEYS = (
+    "ADD CONSTRAINT set_logs_user_id_fkey FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE",
+    "ADD CONSTRAINT set_logs_session_id_fkey FOREIGN KEY (session_id) "
+    "REFERENCES workout_sessions (id) ON DELETE CASCADE",
+    "ADD CONSTRAINT set_logs_workout_item_id_fkey FOREIGN KEY (workout_item_id) "
+    "REFERENCES workout_items (id) ON DELETE SET NULL",
+)
+
+BTREE_INDEXES = (
+    ("ix_set_logs_user_id", "user_id"),
+    ("ix_set_logs_session_id", "session_id"),
+    ("ix_set_logs_workout_item_id", "workout_item_id"),
+    ("ix_set_logs_user_session", "user_id, session_id"),
+    ("ix_set_logs_user_ex_date", "user_id, workout_item_id, ts"),
+    ("ix_set_logs_user_ts_id", "user_id, ts, id"),
+)
+
+BRIN_INDEX = "CREATE INDEX ix_set_logs_ts_brin ON set_logs USING brin (ts) WITH (pages_per_range = 32)"
+
+
+def _rebuild(old: str, partitioned: bool) -> None:
+    """set_logs -> old, новая set_logs той же структуры, перенос данных, ключи и индексы."""
+    op.execute(f"ALTER TABLE set_logs RENAME TO {old}")
+    op.execute(
+        f"CREATE TABLE set_logs (LIKE {old} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        + (" PARTITION BY RANGE (ts)" if partitioned else "")
+    )
+    # последовательность id переезжает к новой таблице, иначе DROP старой её удалит
+    op.execute("ALTER SEQUENCE set_logs_id_seq OWNED BY set_logs.id")
+    if partitioned:
+        op.execute(ENSURE_PARTITIONS)
+        op.execute(
+            f"SELECT set_logs_ensure_partitions({PARTITIONS_AHEAD}, "
+            f"(SELECT min(ts) FROM {old}), (SELECT max(ts) FROM {old}))"
+        )
+    op.execute(f"INSERT INTO set_logs SELECT * FROM {old}")
+    # индексы и ключи — после переливки (и после DROP: имена индексов общие на схему).
+    # Без CASCADE: если от старой таблицы что-то зависит (view, чужой FK), миграция
+    # должна упасть, а не молча снести зависимость.
+    op.execute(f"DROP TABLE {old}")
+
+    op.execute(f"ALTER TABLE set_logs ADD CONSTRAINT set_logs_pkey PRIMARY KEY ({'id, ts' if partitioned else 'id'})")
+    for fk in FOREIGN_KEYS:
+        op.execute(f"ALTER TABLE set_logs {fk}")
+    for name, columns in BTREE_INDEXES:
+        op.execute(f"CREATE INDEX {name} ON set_logs ({columns})")
+    if partitioned:
+        op.execute(BRIN_INDEX)
+    op.execute("ANALYZE set_logs")
+
+
+def upgrade() -> None:
+    if op.get_context().dialect.name != "postgresql":
+        op.create_index("ix_set_logs_ts_brin", "set_logs", ["ts"])
+        return
+    _rebuild("set_logs_unpartitioned", partitioned=True)
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name != "postgresql":
+        op.drop_index("ix_set_logs_ts_brin", table_name="set_logs")
+        return
+    _rebuild("set_logs_partitioned", partitioned=False)
+    op.execute("DROP FUNCTION IF EXISTS set_logs_ensure_partitions(integer, timestamp, timestamp)")
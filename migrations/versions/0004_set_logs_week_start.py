@@ -0,0 +1,30 @@
+"""set_logs.week_start: rollup week key stored with the set
+
+Неделя weekly_muscle_volume, в которую сет был посчитан (по User.tz на момент
+записи). Правка сета и rebuild берут ключ отсюда, а не пересчитывают по текущей
+TZ пользователя. Старые строки остаются NULL — для них неделя считается по TZ,
+как раньше. В Postgres колонка добавляется на секционированную таблицу и
+наследуется секциями; ADD COLUMN без DEFAULT не переписывает данные.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("set_logs", sa.Column("week_start", sa.Date(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("set_logs") as batch:
+        batch.drop_column("week_start")
@@ -0,0 +1,31 @@
+import asyncio
+
+from app.core.aio import sleep_or_wakeup
+
+
+async def test_sleep_or_wakeup_returns_on_timeout_or_event():
+    event = asyncio.Event()
+    event.set()  # set() до вызова не будит
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    await sleep_or_wakeup(event, 0.05)
+    assert loop.time() - started >= 0.04
+
+    waiter = asyncio.create_task(sleep_or_wakeup(event, None))
+    await asyncio.sleep(0)
+    assert not waiter.done()
+    event.set()
+    await asyncio.wait_for(waiter, 1)
+
+
+async def test_sleep_or_wakeup_cancel_is_not_lost():
+    event = asyncio.Event()
+    waiter = asyncio.create_task(sleep_or_wakeup(event, 10))
+    await asyncio.sleep(0)
+    event.set()
+    waiter.cancel()  # событие и cancel() в одном витке цикла
+    try:
+        await waiter
+    except asyncio.CancelledError:
+        pass
+    assert waiter.cancelled()
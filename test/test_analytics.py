@@ -0,0 +1,36 @@
+from datetime import datetime
+
+import numpy as np
+
+from app.db.models import Exercise, Plan, SetLog, User, WorkoutDay, WorkoutItem
+from app.services import analytics
+
+async def test_metrics_over_user_sets(db_factory):
+    async with db_factory() as s:
+        s.add_all([User(id=1, tg_id=1), Exercise(id=1, name="Жим", muscle="chest"), Plan(id=1, user_id=1)])
+        s.add(WorkoutDay(id=1, plan_id=1, day_idx=0))
+        s.add(WorkoutItem(id=1, day_id=1, exercise_id=1))
+        s.add_all([
+            SetLog(user_id=1, session_id=1, workout_item_id=1, weight_kg=100, reps=5, rpe=8, ts=datetime(2026, 3, 2, 10)),
+            SetLog(user_id=1, session_id=1, workout_item_id=1, weight_kg=105, reps=3, rpe=9, ts=datetime(2026, 3, 2, 10, 5)),
+            SetLog(user_id=1, session_id=2, weight_kg=20, reps=10, ts=datetime(2026, 3, 10, 9)),  # ad-hoc
+            SetLog(user_id=2, session_id=3, weight_kg=999, reps=1, ts=datetime(2026, 3, 2)),       # чужой
+        ])
+        await s.commit()
+
+    async with db_factory() as s:
+        cols = await analytics.load_user_sets(s, user_id=1)
+    assert len(cols) == 3
+
+    days, best = analytics.e1rm_trend(cols)[1]
+    assert days.tolist() == [np.datetime64("2026-03-02")]
+    assert best.tolist() == [116.67]
+
+    weeks, tonnage = analytics.weekly_tonnage(cols)
+    assert weeks.astype(str).tolist() == ["2026-03-02", "2026-03-09"]
+    assert tonnage.tolist() == [815.0, 200.0]
+
+    volume = analytics.muscle_volume(cols)
+    assert volume["chest"] == {"sets": 2, "reps": 8, "tonnage": 815.0}
+    assert volume[analytics.NO_MUSCLE]["sets"] == 1
+    assert analytics.rpe_distribution(cols) == {8.0: 1, 9.0: 1}
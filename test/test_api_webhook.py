@@ -0,0 +1,62 @@
+import time
+
+import pytest
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+from fastapi.testclient import TestClient
+
+from app.api.main import app
+from app.core.config import Settings
+from app.telegram.webhook import WebhookFeeder
+
+UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 1,
+        "date": 1_700_000_000,
+        "chat": {"id": 42, "type": "private"},
+        "from": {"id": 42, "is_bot": False, "first_name": "T"},
+        "text": "ping",
+    },
+}
+
+def _feeder(seen: list) -> WebhookFeeder:
+    router = Router()
+
+    @router.message()
+    async def on_message(message: Message) -> None:
+        seen.append(message.text)
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    return WebhookFeeder(Bot("42:TEST"), dp, secret="s3cret")
+
+def test_webhook_checks_secret_and_feeds_dispatcher():
+    seen: list = []
+    with TestClient(app) as client:
+        app.state.webhook = _feeder(seen)
+
+        r = client.post("/telegram/webhook", json=UPDATE)
+        assert r.status_code == 403
+
+        r = client.post(
+            "/telegram/webhook", json=UPDATE,
+            headers={"X-Telegram-Bot-Api-Secret-Token": "s3cret"},
+        )
+        assert r.status_code == 200
+
+        deadline = time.time() + 2
+        while not seen and time.time() < deadline:
+            time.sleep(0.01)
+        app.state.webhook = None
+    assert seen == ["ping"]
+
+def test_webhook_disabled_without_config():
+    with TestClient(app) as client:
+        assert client.post("/telegram/webhook", json=UPDATE).status_code == 404
+
+def test_webhook_refuses_to_start_without_secret():
+    with pytest.raises(ValueError, match="WEBHOOK_SECRET"):
+        Settings(_env_file=None, WEBHOOK_URL="https://bot.example.com")
+    with pytest.raises(ValueError):
+        WebhookFeeder(Bot("42:TEST"), Dispatcher(), secret="")
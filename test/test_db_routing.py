@@ -0,0 +1,65 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.pool import PINGS, engine_options, install_idle_ping
+from app.db.routing import ReadRouter
+
+def test_reads_go_to_replica_unless_user_wrote_recently():
+    now = [0.0]
+    router = ReadRouter(lambda: "primary", lambda: "replica", sticky_sec=5, clock=lambda: now[0])
+
+    assert router.session(1) == "replica"
+    router.mark_write(1)
+    assert router.session(1) == "primary"  # read-your-writes
+    assert router.session(2) == "replica"
+    assert router.session() == "replica"
+
+    now[0] = 6.0
+    router.mark_write(2)  # заодно выметает протухшую отметку пользователя 1
+    assert router.session(1) == "replica"
+    assert router.session(2) == "primary"
+    assert router.stats() == {"replica": 1, "replica_reads": 4, "sticky_reads": 2, "sticky_users": 1}
+
+def test_without_replica_everything_reads_primary():
+    router = ReadRouter(lambda: "primary")
+    router.mark_write(1)
+    assert router.session(1) == "primary" and router.session() == "primary"
+    assert router.stats()["sticky_users"] == 0
+    with pytest.raises(RuntimeError):
+        router.replica_session()
+
+def test_engine_options():
+    pg = engine_options(
+        "postgresql+psycopg://u:p@db/app", pool_size=5, max_overflow=2,
+        pool_timeout=3, pool_recycle=600, pre_ping="idle",
+    )
+    assert pg["pool_size"] == 5 and pg["max_overflow"] == 2 and pg["pool_pre_ping"] is False
+    lite = engine_options(
+        "sqlite+aiosqlite://", pool_size=5, max_overflow=2, pool_timeout=3, pool_recycle=600, pre_ping="always",
+    )
+    assert "pool_size" not in lite and lite["pool_pre_ping"] is True
+    with pytest.raises(ValueError):
+        engine_options("sqlite://", pool_size=1, max_overflow=0, pool_timeout=1, pool_recycle=1, pre_ping="sometimes")
+
+async def test_idle_ping_only_after_idle(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'ping.db'}")
+    pings = PINGS.labels("ok")
+
+    async def checkout() -> None:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    install_idle_ping(engine.sync_engine, idle_sec=3600)
+    before = pings.value
+    for _ in range(3):
+        await checkout()
+    assert pings.value == before  # соединение не простаивало — без лишнего round-trip
+
+    await engine.dispose()
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'ping.db'}")
+    install_idle_ping(engine.sync_engine, idle_sec=0)
+    await checkout()  # первый checkout — свежее соединение
+    await checkout()
+    assert pings.value == before + 1
+    await engine.dispose()
@@ -0,0 +1,15 @@
+from app.telegram.middlewares.dedup import UpdateDeduplicator
+
+async def test_dedup_drops_repeats_within_window():
+    d = UpdateDeduplicator(window=3)
+    assert [await d.seen_before(i) for i in (1, 2, 1, 3, 2)] == [False, False, True, False, True]
+    assert d.duplicates == 2
+
+    await d.seen_before(4)                 # окно 3 -> id 1 вытеснен
+    assert await d.seen_before(1) is False
+
+async def test_dedup_forget_allows_redelivery():
+    d = UpdateDeduplicator()
+    assert await d.seen_before(10) is False
+    await d.forget(10)
+    assert await d.seen_before(10) is False
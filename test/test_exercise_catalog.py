@@ -0,0 +1,60 @@
+from sqlalchemy import insert
+
+from app.db.models import Exercise
+from app.services.exercise_catalog import ExerciseCatalog, canon
+
+def exercises() -> list[Exercise]:
+    return [
+        Exercise(id=1, name="Жим лёжа", muscle="chest", equipment="barbell"),
+        Exercise(id=2, name="Жим гантелей на наклонной", muscle="chest", equipment="dumbbell"),
+        Exercise(id=3, name="Приседания со штангой", muscle="legs", equipment="barbell"),
+        Exercise(id=4, name="Romanian deadlift", muscle="legs", equipment="barbell"),
+        Exercise(id=5, name="Подтягивания", muscle="back", equipment=None),
+    ]
+
+def test_canon_transliterates():
+    assert canon("Жим  лёжа!") == canon("zhim lezha") == "zhim lezha"
+
+async def test_search_typos_prefixes_and_filters(db_factory):
+    async with db_factory() as s:
+        s.add_all(exercises())
+        await s.commit()
+    catalog = ExerciseCatalog(session_factory=db_factory)
+    await catalog.load()
+
+    assert catalog.search("жим лежа")[0].id == 1
+    assert catalog.search("zhim lezha")[0].id == 1
+    assert catalog.search("присидания")[0].id == 3      # опечатка
+    assert catalog.search("подтяг")[0].id == 5          # префикс
+    assert catalog.search("romanian dedlift")[0].id == 4
+    assert [e.id for e in catalog.search("жим", equipment="dumbbell")] == [2]
+    assert {e.id for e in catalog.search("", muscle="legs")} == {3, 4}
+    assert catalog.search("плавание") == []
+    assert catalog.get(4).name == "Romanian deadlift"
+
+async def test_reloads_on_orm_commit_and_raw_changes(db_factory):
+    async with db_factory() as s:
+        s.add_all(exercises())
+        await s.commit()
+    catalog = ExerciseCatalog(session_factory=db_factory)
+    catalog.track_orm_changes()
+    await catalog.load()
+    try:
+        async with db_factory() as s:
+            ex = await s.get(Exercise, 5)
+            ex.name = "Подтягивания широким хватом"
+            await s.commit()
+        assert catalog._stale
+        assert await catalog.refresh()
+        assert catalog.get(5).name == "Подтягивания широким хватом"
+
+        # правка мимо ORM ловится по отпечатку таблицы
+        assert not await catalog.refresh()
+        async with db_factory() as s:
+            conn = await s.connection()
+            await conn.execute(insert(Exercise.__table__), [{"id": 6, "name": "Планка", "muscle": "core"}])
+            await s.commit()
+        assert await catalog.refresh()
+        assert catalog.search("планк")[0].id == 6
+    finally:
+        await catalog.close()
@@ -0,0 +1,105 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+
+from app.db.models import SetLog, User, WorkoutSession
+from app.services.export import Exporter, FileSink, S3MultipartSink
+
+async def _seed(db_factory, n_sets: int) -> None:
+    async with db_factory() as s:
+        s.add_all([User(id=1, tg_id=1, tz="Europe/Moscow", injuries_json={"колено": "лёгкая боль"}), User(id=2, tg_id=2)])
+        s.add(WorkoutSession(id=1, user_id=1))
+        await s.commit()
+        s.add_all([
+            SetLog(user_id=1, session_id=1, set_index=i, weight_kg=50 + i % 100, reps=1 + i % 12,
+                   ts=datetime(2026, 3, 1) + timedelta(minutes=7 * i))
+            for i in range(n_sets)
+        ])
+        s.add(SetLog(user_id=2, session_id=1, weight_kg=1, reps=1, ts=datetime(2026, 3, 1)))
+        await s.commit()
+
+async def test_jsonl_and_csv_exports_stream_in_chunks(db_factory, tmp_path):
+    await _seed(db_factory, n_sets=25)
+    exporter = Exporter(db_factory, lambda name: FileSink(str(tmp_path / name)), chunk_rows=10)
+
+    [path] = await exporter.export_user(1, "jsonl")
+    with gzip.open(path, "rt") as f:
+        lines = [json.loads(line) for line in f]
+    by_table = {t: [r for r in lines if r["table"] == t] for t in ("profile", "sessions", "sets", "prs")}
+    assert by_table["profile"][0]["injuries_json"] == {"колено": "лёгкая боль"}
+    assert len(by_table["sessions"]) == 1 and not by_table["prs"]
+    assert [r["set_index"] for r in by_table["sets"]] == list(range(25))  # чужие сеты не попали
+
+    paths = await exporter.export_user(1, "csv")
+    assert len(paths) == 4
+    with gzip.open(next(p for p in paths if p.endswith("-sets.csv.gz")), "rt") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 25 and float(rows[0]["weight_kg"]) == 50
+    with gzip.open(next(p for p in paths if p.endswith("-profile.csv.gz")), "rt") as f:
+        assert json.loads(next(csv.DictReader(f))["injuries_json"]) == {"колено": "лёгкая боль"}
+
+class FakeS3:
+    def __init__(self) -> None:
+        self.parts: list[bytes] = []
+        self.completed: list[dict] = []
+
+    def create_multipart_upload(self, **kw):
+        return {"UploadId": "u1"}
+
+    def upload_part(self, Body: bytes, PartNumber: int, **kw):
+        self.parts.append(Body)
+        return {"ETag": f"e{PartNumber}"}
+
+    def complete_multipart_upload(self, MultipartUpload: dict, **kw):
+        self.completed.append(MultipartUpload)
+
+async def test_s3_sink_uploads_bounded_parts(db_factory):
+    await _seed(db_factory, n_sets=2000)
+    s3 = FakeS3()
+    exporter = Exporter(db_factory, lambda name: S3MultipartSink(s3, "b", name, part_size=1024), chunk_rows=50)
+
+    [location] = await exporter.export_user(1, "jsonl")
+    assert location.startswith("s3://b/user-1-")
+    assert len(s3.parts) > 1
+    assert all(len(p) == 1024 for p in s3.parts[:-1]) and len(s3.parts[-1]) <= 1024
+    assert [p["PartNumber"] for p in s3.completed[0]["Parts"]] == list(range(1, len(s3.parts) + 1))
+    data = gzip.decompress(b"".join(s3.parts)).decode()
+    assert sum(json.loads(line)["table"] == "sets" for line in io.StringIO(data)) == 2000
+
+class FailingSink(FileSink):
+    async def close(self) -> str:
+        if "-prs." in self.path:
+            raise OSError("disk full")
+        return await super().close()
+
+async def test_partial_csv_export_leaves_no_files(db_factory, tmp_path):
+    await _seed(db_factory, n_sets=5)
+    exporter = Exporter(db_factory, lambda name: FailingSink(str(tmp_path / name)), chunk_rows=10)
+
+    delivered: list = []
+
+    async def deliver(locations):
+        delivered.append(locations)
+
+    assert exporter.start_user_export(1, "csv", deliver)
+    assert not exporter.start_user_export(1, "csv", deliver)  # одна выгрузка на пользователя
+    while exporter._jobs:
+        await asyncio.sleep(0.01)
+    # profile/sessions/sets уже были записаны — удалены вместе с недописанным prs
+    assert delivered == [None] and list(tmp_path.iterdir()) == []
+
+async def test_background_export_delivers_then_removes_files(db_factory, tmp_path):
+    await _seed(db_factory, n_sets=5)
+    exporter = Exporter(db_factory, lambda name: FileSink(str(tmp_path / name)), chunk_rows=10)
+    seen: list = []
+
+    async def deliver(locations):
+        seen.extend(len(gzip.open(p).read()) > 0 for p in locations)
+
+    assert exporter.start_user_export(1, "jsonl", deliver)
+    while exporter._jobs:
+        await asyncio.sleep(0.01)
+    assert seen == [True] and list(tmp_path.iterdir()) == []
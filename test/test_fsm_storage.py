@@ -0,0 +1,79 @@
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage, SimpleEventIsolation
+from aiogram.fsm.storage.redis import RedisStorage
+
+from app.core.config import settings
+from app.telegram import storage as fsm
+from app.telegram.storage import (
+    FSM_SECONDS,
+    TimedStorage,
+    build_events_isolation,
+    build_fsm_storage,
+)
+
+KEY = StorageKey(bot_id=42, chat_id=1, user_id=1)
+
+
+class FakeRedis:
+    """Ровно то, что зовёт RedisStorage: set/get/delete; TTL запоминаем рядом со значением."""
+
+    def __init__(self) -> None:
+        self.values: dict[str, str] = {}
+        self.ttls: dict[str, int | None] = {}
+
+    async def set(self, name: str, value: str, ex: int | None = None) -> None:
+        self.values[name], self.ttls[name] = value, ex
+
+    async def get(self, name: str) -> str | None:
+        return self.values.get(name)
+
+    async def delete(self, *names: str) -> None:
+        for name in names:
+            self.values.pop(name, None)
+
+    async def aclose(self, close_connection_pool: bool = True) -> None:
+        pass
+
+
+async def test_memory_fallback_without_redis_url(monkeypatch):
+    monkeypatch.setattr(settings, "REDIS_URL", None)
+    storage = build_fsm_storage()
+    assert isinstance(storage, TimedStorage) and isinstance(storage.inner, MemoryStorage)
+    assert isinstance(build_events_isolation(storage), SimpleEventIsolation)
+
+    await storage.set_state(KEY, "Onboarding:tz")
+    await storage.set_data(KEY, {"goal": "сила"})
+    assert await storage.get_state(KEY) == "Onboarding:tz"
+    assert await storage.get_data(KEY) == {"goal": "сила"}
+    await storage.close()
+
+
+async def test_redis_storage_uses_prefix_ttl_and_compact_json(monkeypatch):
+    redis = FakeRedis()
+    urls = []
+
+    def from_url(url, **kwargs):
+        urls.append(url)
+        return RedisStorage(redis=redis, **kwargs)
+
+    monkeypatch.setattr(fsm.RedisStorage, "from_url", staticmethod(from_url))
+    storage = build_fsm_storage("redis://cache:6379/0")
+    assert urls == ["redis://cache:6379/0"]
+    assert isinstance(storage, TimedStorage) and isinstance(storage.inner, RedisStorage)
+
+    ops = ("set_state", "get_state", "set_data", "get_data")
+    before = {op: sum(FSM_SECONDS.labels(op).counts) for op in ops}
+    await storage.set_state(KEY, "Onboarding:goal")
+    await storage.set_data(KEY, {"goal": "сила"})
+    assert await storage.get_state(KEY) == "Onboarding:goal"
+    assert await storage.get_data(KEY) == {"goal": "сила"}
+
+    prefix = f"{settings.FSM_KEY_PREFIX}:1:1"  # chat:user, без bot_id
+    assert redis.ttls == {
+        f"{prefix}:state": settings.FSM_STATE_TTL_SEC,
+        f"{prefix}:data": settings.FSM_DATA_TTL_SEC,
+    }
+    assert redis.values[f"{prefix}:data"] == '{"goal":"сила"}'  # без пробелов и \uXXXX
+    # каждая операция прошла через TimedStorage
+    assert all(sum(FSM_SECONDS.labels(op).counts) == n + 1 for op, n in before.items())
+    await storage.close()
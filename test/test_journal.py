@@ -0,0 +1,114 @@
+import base64
+import hashlib
+import hmac
+import json
+import struct
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.deps import read_db_session
+from app.api.main import app
+from app.core.config import settings
+from app.db.models import SetLog, User, WorkoutSession
+from app.services.journal import decode_cursor, encode_cursor, fetch_page
+
+async def _seed(db_factory) -> None:
+    t0 = datetime(2026, 1, 1, 10)
+    async with db_factory() as s:
+        for sid in (1, 2, 3):
+            s.add(WorkoutSession(id=sid, user_id=1, started_at=t0 + timedelta(days=sid)))
+            for i in range(15):
+                # одинаковые ts внутри сессии — порядок добивает id
+                s.add(SetLog(user_id=1, session_id=sid, set_index=i, weight_kg=50, reps=10,
+                             ts=t0 + timedelta(days=sid, minutes=i // 2)))
+        s.add(SetLog(user_id=2, session_id=9, reps=1))
+        s.add(User(id=1, tg_id=111))
+        s.add(User(id=2, tg_id=222))
+        await s.commit()
+
+def test_cursor_roundtrip():
+    ts = datetime(2026, 5, 1, 12, 30, 15, 123456)
+    cursor = encode_cursor(ts, 987654321)
+    assert len(cursor) == 22
+    assert decode_cursor(cursor) == (ts, 987654321)
+    with pytest.raises(ValueError):
+        decode_cursor("garbage!")
+    # micros за пределами datetime — ValueError, а не OverflowError (500 в API)
+    with pytest.raises(ValueError):
+        decode_cursor(base64.urlsafe_b64encode(struct.pack(">qq", 2**62, 1)).decode().rstrip("="))
+
+async def test_keyset_pages_cover_history_once(db_factory):
+    await _seed(db_factory)
+    seen, cursor, pages = [], None, 0
+    async with db_factory() as s:
+        while True:
+            page = await fetch_page(s, 1, cursor=cursor, limit=20)
+            pages += 1
+            seen += [(st.ts, st.id) for g in page.sessions for st in g.sets]
+            if page.next_cursor is None:
+                break
+            cursor = page.next_cursor
+
+    assert pages == 3
+    assert len(seen) == 45 and seen == sorted(seen, reverse=True)
+    first = (await fetch_page(s, 1, limit=20)).sessions
+    assert [g.session_id for g in first] == [3, 2]
+
+def _init_data(bot_token: str, tg_id: int, auth_date: int | None = None) -> str:
+    """initData Mini App, подписанный как это делает Telegram."""
+    fields = {"auth_date": str(auth_date or int(time.time())), "user": json.dumps({"id": tg_id, "first_name": "T"})}
+    check = "\n".join(f"{k}={v}" for k, v in sorted(fields.items()))
+    secret = hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+    fields["hash"] = hmac.new(secret, check.encode(), hashlib.sha256).hexdigest()
+    return urlencode(fields)
+
+async def test_journal_api(db_factory, monkeypatch):
+    await _seed(db_factory)
+    monkeypatch.setattr(settings, "API_TOKEN", "service-token")
+
+    async def override():
+        async with db_factory() as s:
+            yield s
+
+    app.dependency_overrides[read_db_session] = override
+    try:
+        client = TestClient(app, headers={"Authorization": "Bearer service-token"})
+        r = client.get("/users/1/journal", params={"limit": 40})
+        assert r.status_code == 200
+        body = r.json()
+        assert sum(len(g["sets"]) for g in body["sessions"]) == 40
+        r = client.get("/users/1/journal", params={"cursor": body["next_cursor"]})
+        assert sum(len(g["sets"]) for g in r.json()["sessions"]) == 5
+        assert r.json()["next_cursor"] is None
+        assert client.get("/users/1/journal", params={"cursor": "bad"}).status_code == 400
+    finally:
+        app.dependency_overrides.clear()
+
+async def test_journal_api_requires_owner(db_factory, monkeypatch):
+    await _seed(db_factory)
+    monkeypatch.setattr(settings, "API_TOKEN", "service-token")
+    monkeypatch.setattr(settings, "BOT_TOKEN", "42:TEST")
+
+    async def override():
+        async with db_factory() as s:
+            yield s
+
+    app.dependency_overrides[read_db_session] = override
+    try:
+        client = TestClient(app)
+        url = "/users/1/journal"
+        assert client.get(url).status_code == 401
+        assert client.get(url, headers={"Authorization": "Bearer wrong"}).status_code == 401
+        assert client.get(url, headers={"Authorization": f"tma {_init_data('1:OTHER', 111)}"}).status_code == 401
+        stale = _init_data("42:TEST", 111, auth_date=int(time.time()) - settings.WEBAPP_AUTH_MAX_AGE_SEC - 60)
+        assert client.get(url, headers={"Authorization": f"tma {stale}"}).status_code == 401
+        # чужой пользователь с валидной подписью
+        assert client.get(url, headers={"Authorization": f"tma {_init_data('42:TEST', 222)}"}).status_code == 403
+        r = client.get(url, headers={"Authorization": f"tma {_init_data('42:TEST', 111)}"})
+        assert r.status_code == 200 and r.json()["sessions"]
+    finally:
+        app.dependency_overrides.clear()
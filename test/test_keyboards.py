@@ -0,0 +1,45 @@
+import pytest
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import SendMessage
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from pydantic import ValidationError
+
+from app.telegram.keyboards.journal import journal_kb
+from app.telegram.keyboards.registry import KeyboardCachingSession, KeyboardRegistry
+from app.telegram.keyboards.reply import main_kb
+
+def test_static_keyboard_built_once_and_frozen():
+    kb = main_kb()
+    assert main_kb() is kb
+    with pytest.raises(ValidationError):
+        kb.resize_keyboard = False
+
+def test_dynamic_keyboard_lru():
+    registry = KeyboardRegistry()
+
+    @registry.dynamic(maxsize=2)
+    def page_kb(cursor: str) -> InlineKeyboardMarkup:
+        return InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text=">", callback_data=cursor)]])
+
+    a = page_kb("a")
+    assert page_kb("a") is a
+    page_kb("b")
+    page_kb("c")  # вытесняет "a"
+    assert page_kb("a") is not a
+    assert registry.stats()["test_dynamic_keyboard_lru.<locals>.page_kb"]["size"] == 2
+    assert journal_kb(None) is None
+
+async def test_cached_payload_matches_plain_serialization():
+    bot = Bot("42:TEST")
+    kb = main_kb()
+    method = SendMessage(chat_id=1, text="hi", reply_markup=kb)
+
+    plain = AiohttpSession().build_form_data(bot, method)._fields
+    session = KeyboardCachingSession()
+    first = session.build_form_data(bot, method)._fields
+    payload = kb._payload
+    second = session.build_form_data(bot, method)._fields
+
+    assert first == plain == second
+    assert payload is not None and kb._payload is payload
@@ -0,0 +1,76 @@
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message, Update
+from fastapi.testclient import TestClient
+from sqlmodel import select
+
+from app.api.main import app
+from app.core.metrics import Registry, metrics
+from app.db.metrics import QueryUsage, instrument_engine, query_usage
+from app.db.models import User
+from app.telegram.middlewares.metrics import HandlerMetricsMiddleware, UpdateMetricsMiddleware
+from app.telegram.storage import TimedStorage
+
+def test_registry_renders_prometheus_text():
+    reg = Registry(prefix="t")
+    hits = reg.counter("hits_total", "Hits", ("kind",))
+    hits.labels("a").inc()
+    hits.labels("a").inc(2)
+    latency = reg.histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+    for v in (0.05, 0.5, 3):
+        latency.observe(v)
+    reg.register_stats("cache", lambda: {"size": 3, "ok": True, "name": "x", "main_kb": {"hits": 5}})
+    text = reg.render()
+
+    assert 't_hits_total{kind="a"} 3.0' in text
+    assert 't_latency_seconds_bucket{le="0.1"} 1' in text
+    assert 't_latency_seconds_bucket{le="1"} 2' in text
+    assert 't_latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "t_latency_seconds_count 3" in text
+    assert "t_cache_size 3" in text and "t_cache_ok 1" in text and "t_cache_name" not in text
+    assert 't_cache_hits{key="main_kb"} 5' in text
+    assert reg.counter("hits_total", "Hits", ("kind",)) is hits
+
+async def test_query_usage_per_update(db_factory):
+    async with db_factory() as s:
+        engine = (await s.connection()).engine.sync_engine
+    instrument_engine(engine, name="test_db")
+    instrument_engine(engine, name="test_db")  # повторно — без двойного счёта
+
+    usage = QueryUsage()
+    token = query_usage.set(usage)
+    async with db_factory() as s:
+        s.add(User(tg_id=1))
+        await s.commit()
+        (await s.exec(select(User))).all()
+    query_usage.reset(token)
+    assert usage.queries == 2 and usage.seconds > 0
+    assert 'gymcoach_db_queries_total{op="INSERT"}' in metrics.render()
+
+async def test_dispatcher_middlewares_label_handlers():
+    router = Router(name="demo")
+
+    @router.message()
+    async def echo(message: Message) -> None:
+        pass
+
+    dp = Dispatcher(storage=TimedStorage(Dispatcher().storage))
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
+    dp.message.middleware(HandlerMetricsMiddleware())
+    dp.include_router(router)
+    update = Update.model_validate({"update_id": 1, "message": {
+        "message_id": 1, "date": 1_700_000_000, "chat": {"id": 42, "type": "private"},
+        "from": {"id": 42, "is_bot": False, "first_name": "T"}, "text": "hi",
+    }})
+    await dp.feed_update(Bot("42:TEST"), update)
+
+    text = metrics.render()
+    assert 'gymcoach_handler_seconds_count{handler="demo.echo"} 1' in text
+    assert "gymcoach_update_db_queries_count" in text
+    assert 'gymcoach_fsm_storage_seconds_count{op="get_state"}' in text
+
+def test_metrics_endpoint():
+    with TestClient(app) as client:
+        client.get("/healthz")
+        r = client.get("/metrics")
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/plain")
+    assert 'gymcoach_http_request_seconds_count{method="GET",route="/healthz",status="200"}' in r.text
@@ -0,0 +1,79 @@
+import asyncio
+import datetime
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from aiogram.methods import SendMessage
+from aiogram.types import Chat, Message
+
+from app.telegram.outbound import BULK, INTERACTIVE, OutboundMiddleware, OutboundQueue
+
+class FakeSession(BaseSession):
+    def __init__(self, fail: list[Exception] | None = None) -> None:
+        super().__init__()
+        self.sent: list[tuple[int, str]] = []
+        self.fail = fail or []
+
+    async def make_request(self, bot, method, timeout=None):
+        if self.fail:
+            raise self.fail.pop(0)
+        self.sent.append((method.chat_id, method.text))
+        return Message(message_id=len(self.sent), date=datetime.datetime.now(),
+                       chat=Chat(id=method.chat_id, type="private"), text=method.text)
+
+    async def close(self): pass
+
+    async def stream_content(self, *a, **kw):
+        yield b""
+
+async def test_interactive_jumps_ahead_of_bulk_and_chat_rate_holds():
+    session = FakeSession()
+    bot = Bot("42:TEST", session=session)
+    q = OutboundQueue(global_rate=200, chat_rate=20, chat_burst=1)
+    bulk = [q.send_message(bot, chat, f"bulk {chat}") for chat in range(1, 31)]
+    bulk += [q.send_message(bot, 1, "bulk 1 again")]
+    await asyncio.sleep(0)
+    reply = q.submit(99, lambda: bot(SendMessage(chat_id=99, text="reply")), priority=INTERACTIVE)
+    await asyncio.gather(reply, *bulk)
+
+    order = [chat for chat, _ in session.sent]
+    assert order.index(99) < 5
+    assert order[-1] == 1  # второе сообщение в чат 1 ждёт токен чата
+    stats = q.stats()
+    assert stats["sent"] == 32 and stats["depth_bulk"] == 0
+    assert stats["lag_p95_ms_interactive"] <= stats["lag_p95_ms_bulk"]
+    await q.close()
+
+async def test_coalescing_merges_pending_messages_of_one_chat():
+    session = FakeSession()
+    bot = Bot("42:TEST", session=session)
+    q = OutboundQueue(global_rate=200, chat_rate=1, chat_burst=1)
+    first = q.send_message(bot, 7, "first", priority=BULK)
+    rest = [q.send_message(bot, 7, f"reminder {i}", coalesce=True) for i in range(3)]
+    await asyncio.gather(first, *rest)  # first ушёл сразу, остальные дождались токена и склеились
+
+    assert session.sent == [(7, "first"), (7, "reminder 0\n\nreminder 1\n\nreminder 2")]
+    assert len({(await f).message_id for f in rest}) == 1
+    assert q.stats()["coalesced"] == 2
+    await q.close()
+
+async def test_retry_after_pauses_and_retries_permanent_errors_fail():
+    method = SendMessage(chat_id=1, text="x")
+    session = FakeSession(fail=[TelegramRetryAfter(method, "flood", retry_after=0)])
+    bot = Bot("42:TEST", session=session)
+    bot.session.middleware(OutboundMiddleware(q := OutboundQueue(global_rate=200, chat_rate=100)))
+
+    # 429 -> пауза и повтор; 403 -> без повторов, в вызывающего
+    msg = await bot.send_message(1, "hello")
+    assert msg.text == "hello"
+    session.fail = [TelegramForbiddenError(method, "bot was blocked")]
+    try:
+        await bot.send_message(2, "blocked")
+    except TelegramForbiddenError:
+        pass
+    else:
+        raise AssertionError("expected TelegramForbiddenError")
+    stats = q.stats()
+    assert (stats["retry_after"], stats["retried"], stats["failed"], stats["sent"]) == (1, 1, 1, 1)
+    await q.close()
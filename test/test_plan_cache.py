@@ -0,0 +1,95 @@
+from datetime import datetime
+
+from sqlalchemy import event
+
+from app.db.models import Exercise, Plan, User, WorkoutDay, WorkoutItem
+from app.services.plan_cache import ActivePlanCache
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+async def seed(db_factory) -> None:
+    async with db_factory() as s:
+        s.add_all([User(id=1, tg_id=1), Exercise(id=1, name="Жим", muscle="chest"), Exercise(id=2, name="Тяга"),
+                   Plan(id=1, user_id=1, name="Старый", state="archived"),
+                   Plan(id=2, user_id=1, name="Сила", updated_at=datetime(2026, 1, 1))])
+        s.add_all([WorkoutDay(id=1, plan_id=2, day_idx=0), WorkoutDay(id=2, plan_id=2, day_idx=3)])
+        rule = {"type": "double", "step_kg": 2.5}
+        s.add_all([
+            WorkoutItem(id=1, day_id=1, exercise_id=1, order_idx=0, progression_json=rule),
+            WorkoutItem(id=2, day_id=1, exercise_id=2, order_idx=1, progression_json=dict(rule)),
+            WorkoutItem(id=3, day_id=2, exercise_id=2, order_idx=0),
+        ])
+        await s.commit()
+
+async def test_loads_graph_in_one_query_and_validates_by_version(db_factory):
+    await seed(db_factory)
+    clock = Clock()
+    cache = ActivePlanCache(trust_sec=2.0, clock=clock)
+    statements = []
+    async with db_factory() as s:
+        engine = (await s.connection()).engine.sync_engine
+        listener = lambda *a: statements.append(a[2])  # noqa: E731
+        event.listen(engine, "before_cursor_execute", listener)
+
+        plan = await cache.get(s, 1)
+        assert len(statements) == 1
+        assert plan.id == 2 and [d.day_idx for d in plan.days] == [0, 3]
+        bench, row = plan.day(0).items
+        assert (bench.exercise_name, bench.muscle, row.exercise_name) == ("Жим", "chest", "Тяга")
+        assert bench.progression_json is row.progression_json  # одинаковые правила — один объект
+
+        assert await cache.get(s, 1) is plan and len(statements) == 1  # в пределах trust_sec — без запросов
+        clock.now = 5
+        assert await cache.get(s, 1) is plan and len(statements) == 2  # сверка версии
+
+        await cache.touch(s, 2)
+        await s.commit()
+        clock.now = 10
+        fresh = await cache.get(s, 1)
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert fresh is not plan and fresh.updated_at > plan.updated_at
+    stats = cache.stats()
+    assert (stats["plans"], stats["hits"], stats["misses"]) == (1, 2, 2)
+    assert stats["hit_rate"] == 0.5 and stats["bytes_per_plan"] == fresh.nbytes > 0
+
+async def test_missing_plan_is_not_cached(db_factory):
+    async with db_factory() as s:
+        s.add(User(id=1, tg_id=1))
+        await s.commit()
+        cache = ActivePlanCache()
+        assert await cache.get(s, 1) is None
+        assert cache.stats()["plans"] == 0
+
+async def test_plan_change_reaches_cache_only_after_commit(db_factory):
+    await seed(db_factory)
+    cache = ActivePlanCache(trust_sec=60)
+    async with db_factory() as s:
+        assert (await cache.get(s, 1)).id == 2
+
+    async def replace_plan(s) -> None:
+        cache.invalidate(s, 1)
+        (await s.get(Plan, 2)).state = "archived"
+        s.add(Plan(id=3, user_id=1, name="Новый"))
+        await s.flush()
+        # своя сессия видит новый план, но в кэш незакоммиченное не попадает
+        assert (await cache.get(s, 1)).id == 3
+
+    async with db_factory() as s:
+        await replace_plan(s)
+        async with db_factory() as other:
+            assert (await cache.get(other, 1)).id == 2
+        await s.rollback()
+    async with db_factory() as s:
+        assert (await cache.get(s, 1)).id == 2  # откат — кэш как был
+
+    async with db_factory() as s:
+        await replace_plan(s)
+        await s.commit()
+    async with db_factory() as s:
+        assert (await cache.get(s, 1)).id == 3
@@ -0,0 +1,81 @@
+from sqlalchemy import event, func
+from sqlmodel import select
+
+from app.db.models import Exercise, Plan, User, WorkoutDay, WorkoutItem
+from app.services.exercise_catalog import ExerciseCatalog
+from app.services.plan_cache import ActivePlanCache
+from app.services.plan_generator import PlanGenerator
+
+def catalog_rows() -> list[Exercise]:
+    rows = [
+        ("Приседания со штангой", "legs", "barbell"), ("Выпады с гантелями", "legs", "dumbbell"),
+        ("Жим ногами", "legs", "machine"), ("Ягодичный мост", "legs", None),
+        ("Жим лёжа", "chest", "barbell"), ("Отжимания", "chest", None), ("Жим гантелей", "chest", "dumbbell"),
+        ("Подтягивания", "back", None), ("Тяга гантели", "back", "dumbbell"), ("Становая тяга", "back", "barbell"),
+        ("Жим стоя", "shoulders", "barbell"), ("Махи гантелями", "shoulders", "dumbbell"),
+        ("Сгибания на бицепс", "biceps", "dumbbell"), ("Французский жим", "triceps", "barbell"),
+        ("Планка", "core", None),
+    ]
+    return [Exercise(id=i, name=n, muscle=m, equipment=e) for i, (n, m, e) in enumerate(rows, 1)]
+
+async def make_generator(db_factory) -> tuple[PlanGenerator, ExerciseCatalog]:
+    async with db_factory() as s:
+        s.add_all(catalog_rows())
+        s.add_all([
+            User(id=1, tg_id=1, goal="Сила", level="Новичок", equipment="Зал"),
+            User(id=2, tg_id=2, goal="Гипертрофия", level="Средний", equipment="Только тело",
+                 injuries_json={"text": "болит колено"}),
+        ])
+        await s.commit()
+    catalog = ExerciseCatalog(session_factory=db_factory)
+    await catalog.load()
+    return PlanGenerator(catalog=catalog), catalog
+
+async def test_templates_cached_and_personalized(db_factory):
+    gen, catalog = await make_generator(db_factory)
+    async with db_factory() as s:
+        strong, home = await s.get(User, 1), await s.get(User, 2)
+
+    draft = gen.generate(strong)
+    assert gen.template(*gen.profile_key(strong)) is gen.template("Сила", "Новичок", "Зал")
+    assert draft.split_type == "full-body" and [d for d, _ in draft.days] == [0, 2, 4]
+    first_day = draft.days[0][1]
+    assert catalog.get(first_day[0]["exercise_id"]).name == "Приседания со штангой"
+    assert {r["sets"] for r in first_day} == {3}  # 4 подхода на силу, новичку на один меньше
+    assert len({r["exercise_id"] for r in first_day}) == len(first_day)
+
+    # только своё тело + колено: ни штанги, ни приседаний/выпадов
+    ids = {r["exercise_id"] for _, rows in gen.generate(home).days for r in rows}
+    names = {catalog.get(i).name for i in ids}
+    assert "Ягодичный мост" in names
+    assert all(catalog.get(i).equipment is None for i in ids)
+
+    await catalog.load()  # перезагрузка каталога сбрасывает шаблоны
+    gen.generate(strong)
+    assert gen.stats()["template_misses"] == 3
+
+async def test_save_is_bulk_and_archives_previous(db_factory):
+    gen, _ = await make_generator(db_factory)
+    async with db_factory() as s:
+        users = [await s.get(User, 1), await s.get(User, 2)]
+        await gen.create_plan(s, users[0])
+        await s.commit()
+
+    statements = []
+    async with db_factory() as s:
+        engine = (await s.connection()).engine.sync_engine
+        listener = lambda *a: statements.append(a[2])  # noqa: E731
+        event.listen(engine, "before_cursor_execute", listener)
+        plan_ids = await gen.save(s, [gen.generate(u) for u in users])
+        await s.commit()
+        event.remove(engine, "before_cursor_execute", listener)
+
+        # UPDATE (архив) + по INSERT на plans, workout_days, workout_items
+        assert len([st for st in statements if st.split()[0] in ("INSERT", "UPDATE")]) == 4
+        states = dict((await s.exec(select(Plan.id, Plan.state))).all())
+        assert states == {1: "archived", plan_ids[0]: "active", plan_ids[1]: "active"}
+        n_items = (await s.exec(
+            select(func.count()).select_from(WorkoutItem).join(WorkoutDay).where(WorkoutDay.plan_id == plan_ids[0])
+        )).one()
+        plan = await ActivePlanCache().get(s, 1)
+        assert plan.id == plan_ids[0] and len(plan.items()) == n_items == 15
@@ -0,0 +1,59 @@
+from datetime import datetime
+
+import pytest
+from sqlmodel import select
+
+from app.db.models import PR, Exercise, Plan, SetLog, User, WorkoutDay, WorkoutItem
+from app.services.pr_engine import PREngine, estimate_1rm
+
+def test_estimate_1rm_formulas():
+    assert estimate_1rm(100, 1) == 100
+    assert estimate_1rm(100, 5, "epley") == pytest.approx(116.67)
+    assert estimate_1rm(100, 5, "brzycki") == pytest.approx(112.5)
+    assert estimate_1rm(100, 20) == 0.0  # слишком много повторов для оценки
+
+async def _seed(db_factory) -> None:
+    async with db_factory() as s:
+        s.add_all([User(id=1, tg_id=1), Exercise(id=1, name="Присед"), Plan(id=1, user_id=1)])
+        s.add(WorkoutDay(id=1, plan_id=1, day_idx=0))
+        s.add(WorkoutItem(id=1, day_id=1, exercise_id=1))
+        await s.commit()
+
+def _row(weight: float, reps: int, day: int) -> dict:
+    return {"user_id": 1, "workout_item_id": 1, "weight_kg": weight, "reps": reps,
+            "ts": datetime(2026, 1, day, 12)}
+
+async def test_on_sets_writes_only_broken_records(db_factory):
+    await _seed(db_factory)
+    engine = PREngine(session_factory=db_factory)
+
+    assert len(await engine.on_sets([_row(100, 5, 1), _row(90, 5, 1)])) == 1
+    assert await engine.on_sets([_row(95, 5, 2)]) == []          # не рекорд
+    assert len(await engine.on_sets([_row(110, 3, 3)])) == 1
+
+    async with db_factory() as s:
+        prs = (await s.exec(select(PR).order_by(PR.date))).all()
+    assert [float(p.one_rm) for p in prs] == [116.67, 121.0]
+
+async def test_backfill_recomputes_from_set_logs(db_factory):
+    await _seed(db_factory)
+    async with db_factory() as s:
+        for w, d in [(100, 1), (95, 2), (105, 3)]:
+            s.add(SetLog(user_id=1, session_id=1, workout_item_id=1, weight_kg=w, reps=1,
+                         ts=datetime(2026, 1, d)))
+        await s.commit()
+
+    assert await PREngine(session_factory=db_factory).backfill(users_per_chunk=1) == 2
+    async with db_factory() as s:
+        prs = (await s.exec(select(PR).order_by(PR.date))).all()
+    assert [(p.date.day, float(p.one_rm)) for p in prs] == [(1, 100.0), (3, 105.0)]
+
+async def test_stale_best_cache_is_rechecked_against_prs(db_factory):
+    await _seed(db_factory)
+    a, b = PREngine(session_factory=db_factory), PREngine(session_factory=db_factory)
+
+    assert len(await a.on_sets([_row(100, 1, 1)])) == 1
+    assert len(await b.on_sets([_row(120, 1, 2)])) == 1  # другой процесс
+    # кэш `a` ещё помнит 100 — но 110 уже не рекорд
+    assert await a.on_sets([_row(110, 1, 3)]) == []
+    assert len(await a.on_sets([_row(125, 1, 4)])) == 1
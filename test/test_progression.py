@@ -0,0 +1,97 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from app.db.models import Exercise, Plan, SetLog, User, WorkoutDay, WorkoutItem, WorkoutSession
+from app.services.progression import (
+    Deload, ProgressionEngine, ProgressionError, Rule, SetRow, compile_rule,
+)
+
+def item(**kw) -> WorkoutItem:
+    return WorkoutItem(id=1, day_id=1, exercise_id=1, **{"sets": 3, "reps_min": 8, "reps_max": 12, **kw})
+
+def test_compile_is_cached_and_validated():
+    rule = compile_rule({"type": "rpe", "step_kg": 2.5, "target_rpe": 8})
+    assert compile_rule({"target_rpe": 8, "type": "rpe", "step_kg": 2.5}) is rule
+    with pytest.raises(ProgressionError):
+        compile_rule({"type": "double", "step_kg": "2.5"})
+    with pytest.raises(ProgressionError):
+        compile_rule({"type": "linear"})
+
+def test_rules():
+    double = compile_rule({"type": "double", "step_kg": 2.5})
+    done = [[SetRow(80, 12, None)] * 3]
+    not_yet = [[SetRow(80, 12, None), SetRow(80, 10, None), SetRow(80, 9, None)]]
+    assert double.evaluate(item(), done, "epley").weight_kg == 82.5
+    assert double.evaluate(item(), not_yet, "epley").weight_kg == 80
+    assert double.evaluate(item(), [], "epley").weight_kg is None
+
+    rpe = compile_rule({"type": "rpe", "target_rpe": 8, "step_kg": 5})
+    assert rpe.evaluate(item(), [[SetRow(100, 8, 6.5)]], "epley").weight_kg == 105
+    assert rpe.evaluate(item(), [[SetRow(100, 8, 10)]], "epley").weight_kg == 95
+
+    pct = compile_rule({"type": "percent_e1rm", "percent": 80, "round_kg": 2.5})
+    assert pct.evaluate(item(), [[SetRow(100, 5, None)], [SetRow(90, 10, None)]], "epley").weight_kg == 95
+
+    stalled = [[SetRow(100, 6, None)]] * 3
+    target = double.evaluate(item(), stalled, "epley")
+    assert target.deload and target.weight_kg == 90 and target.delta_kg == -10
+
+async def test_evaluate_day_uses_one_history_query(db_factory):
+    async with db_factory() as s:
+        s.add_all([User(id=1, tg_id=1), Exercise(id=1, name="Жим"), Exercise(id=2, name="Тяга"),
+                   Plan(id=1, user_id=1)])
+        s.add(WorkoutDay(id=1, plan_id=1, day_idx=0))
+        s.add_all([
+            WorkoutItem(id=1, day_id=1, exercise_id=1, order_idx=0, sets=2, reps_min=5, reps_max=8,
+                        progression_json={"type": "double", "step_kg": 2.5}),
+            WorkoutItem(id=2, day_id=1, exercise_id=2, order_idx=1, sets=2, reps_min=5, reps_max=8,
+                        progression_json={"type": "bogus"}),
+        ])
+        for sid in range(1, 7):
+            s.add(WorkoutSession(id=sid, user_id=1, started_at=datetime(2026, 3, sid)))
+            # последняя сессия — все подходы до reps_max, до неё — недоборы
+            reps = 8 if sid == 6 else (3 if sid <= 2 else 6)
+            s.add_all([SetLog(user_id=1, session_id=sid, workout_item_id=1, set_index=i,
+                              weight_kg=60 + sid, reps=reps) for i in range(2)])
+        s.add_all([SetLog(user_id=1, session_id=6, workout_item_id=2, set_index=i, weight_kg=50, reps=8)
+                   for i in range(2)])
+        await s.commit()
+
+    engine = ProgressionEngine(history_sessions=4)
+    async with db_factory() as s:
+        items = [await s.get(WorkoutItem, 1), await s.get(WorkoutItem, 2)]
+        selects = []
+        sync_engine = (await s.connection()).engine.sync_engine
+        listener = lambda *a: selects.append(a[2])  # noqa: E731
+        event.listen(sync_engine, "before_cursor_execute", listener)
+        bench, row = await engine.evaluate_day(s, 1, items)
+        event.remove(sync_engine, "before_cursor_execute", listener)
+
+    assert len(selects) == 1
+    assert (bench.weight_kg, bench.delta_kg, bench.deload) == (68.5, 2.5, False)
+    assert row.weight_kg == 52.5  # битое правило -> двойная прогрессия по умолчанию
+    assert engine.stats()["invalid_rules"] == 1
+
+async def test_history_ignores_sessions_outside_window(db_factory):
+    now = datetime(2026, 6, 1)
+    async with db_factory() as s:
+        s.add_all([User(id=1, tg_id=1), Exercise(id=1, name="Жим"), Plan(id=1, user_id=1)])
+        s.add(WorkoutDay(id=1, plan_id=1, day_idx=0))
+        s.add(WorkoutItem(id=1, day_id=1, exercise_id=1, order_idx=0))
+        # год назад — 100 кг, неделю назад — 60 кг
+        for sid, ts, weight in ((1, datetime(2025, 6, 1), 100), (2, datetime(2026, 5, 25), 60)):
+            s.add(WorkoutSession(id=sid, user_id=1, started_at=ts))
+            s.add(SetLog(user_id=1, session_id=sid, workout_item_id=1, weight_kg=weight, reps=5,
+                         ts=ts))
+        await s.commit()
+
+    engine = ProgressionEngine(history_weeks=12, clock=lambda: now)
+    async with db_factory() as s:
+        history = await engine.history(s, 1, [1])
+    assert [[r.weight_kg for r in sess] for sess in history[1]] == [[60]]
+
+def test_rule_is_abstract():
+    with pytest.raises(TypeError):
+        Rule(Deload())
@@ -0,0 +1,119 @@
+from datetime import datetime
+
+from sqlmodel import select
+
+from app.db.models import Reminder, User
+from app.services.reminders import ReminderScheduler, format_schedule, next_fire, parse_schedule
+
+MON_WED_FRI = 0b10101
+
+def test_next_fire_is_local_and_dst_safe():
+    # пн 2026-03-02 10:00 UTC = 13:00 в Москве -> ближайшее 07:30 по Москве — в ср
+    assert next_fire(datetime(2026, 3, 2, 10), "Europe/Moscow", MON_WED_FRI, 7 * 60 + 30) == datetime(2026, 3, 4, 4, 30)
+    # Берлин, переход на летнее время 29.03.2026: 08:00 до — это 07:00 UTC, после — 06:00 UTC
+    daily = 0b1111111
+    assert next_fire(datetime(2026, 3, 28, 0), "Europe/Berlin", daily, 8 * 60) == datetime(2026, 3, 28, 7)
+    assert next_fire(datetime(2026, 3, 28, 8), "Europe/Berlin", daily, 8 * 60) == datetime(2026, 3, 29, 6)
+    # 02:30 в день перехода не существует — срабатываем (сдвинувшись), но не пропускаем день
+    assert next_fire(datetime(2026, 3, 28, 23), "Europe/Berlin", daily, 150).date().isoformat() == "2026-03-29"
+    # осенью 02:30 повторяется — после первого срабатывания следующее уже завтра
+    first = next_fire(datetime(2026, 10, 24, 23), "Europe/Berlin", daily, 150)
+    assert first == datetime(2026, 10, 25, 0, 30)
+    assert next_fire(first, "Europe/Berlin", daily, 150) == datetime(2026, 10, 26, 1, 30)
+    assert next_fire(datetime(2026, 3, 2), "UTC", 0, 0) is None
+
+def test_parse_schedule():
+    assert parse_schedule("пн, ср пт 7:30") == (MON_WED_FRI, 450)
+    assert parse_schedule("ежедневно 19:00") == (0b1111111, 1140)
+    assert parse_schedule("завтра 7:30") is None
+    assert parse_schedule("пн 25:00") is None
+    assert format_schedule(MON_WED_FRI, 450) == "пн ср пт в 07:30"
+
+async def test_scheduler_pages_fires_persists_and_rearms(db_factory):
+    now = datetime(2026, 3, 2, 4, 0)  # пн, 07:00 по Москве
+    async with db_factory() as s:
+        for i in range(1, 8):
+            s.add(User(id=i, tg_id=100 + i, tz="Europe/Moscow"))
+        await s.commit()
+
+    sched = ReminderScheduler(db_factory, horizon=3600, page_size=2, clock=lambda: now)
+    sent: list[int] = []
+
+    async def send(chat_id: int, text: str) -> None:
+        sent.append(chat_id)
+    sched._send = send
+
+    async with db_factory() as s:
+        users = list(await s.exec(select(User)))
+        for u in users[:5]:
+            await sched.set_schedule(s, u, MON_WED_FRI, 7 * 60 + 30)   # через 30 минут
+        await sched.set_schedule(s, users[5], MON_WED_FRI, 12 * 60)    # за окном
+        await s.commit()
+
+    assert await sched.tick(now) == 0
+    assert sched.stats()["armed"] == 5 and sched.pages_loaded == 3  # 5 строк страницами по 2
+
+    # рестарт: новый шедулер поднимает расписание из next_fire_at
+    sched = ReminderScheduler(db_factory, horizon=3600, page_size=2, clock=lambda: now)
+    sched._send = send
+    other = ReminderScheduler(db_factory, horizon=3600, page_size=2, clock=lambda: now)
+    other._send = send
+    fire_at = datetime(2026, 3, 2, 4, 30)
+    await sched.tick(now)
+    await other.tick(now)
+    assert await sched.tick(fire_at) == 5
+    assert await other.tick(fire_at) == 0  # второй процесс проиграл claim
+    assert sorted(sent) == [101, 102, 103, 104, 105]
+
+    async with db_factory() as s:
+        nxt = {r.user_id: r.next_fire_at for r in await s.exec(select(Reminder))}
+        assert nxt[1] == datetime(2026, 3, 4, 4, 30)
+
+        # новое расписание внутри загруженного окна — в кучу сразу, без перезагрузки
+        u = await s.get(User, 7)
+        await sched.set_schedule(s, u, MON_WED_FRI, 7 * 60 + 40)
+        await s.commit()
+    assert await sched.tick(datetime(2026, 3, 2, 4, 40)) == 1
+    assert sent[-1] == 107
+
+async def test_rolled_back_rearm_keeps_persisted_time(db_factory):
+    now = datetime(2026, 3, 2, 4, 0)  # пн, 07:00 по Москве
+    async with db_factory() as s:
+        s.add(User(id=1, tg_id=101, tz="Europe/Moscow"))
+        s.add(Reminder(user_id=1, weekdays=MON_WED_FRI, minute_of_day=7 * 60 + 30,
+                       next_fire_at=datetime(2026, 3, 2, 4, 30)))
+        await s.commit()
+
+    sched = ReminderScheduler(db_factory, horizon=3600, clock=lambda: now)
+    sent: list[int] = []
+
+    async def send(chat_id: int, text: str) -> None:
+        sent.append(chat_id)
+    sched._send = send
+    await sched.tick(now)
+
+    # хендлер перенёс напоминание, но апдейт упал после set_schedule — откат
+    async with db_factory() as s:
+        await sched.set_schedule(s, await s.get(User, 1), MON_WED_FRI, 7 * 60 + 10)
+        await s.rollback()
+    assert await sched.tick(datetime(2026, 3, 2, 4, 10)) == 0
+    assert await sched.tick(datetime(2026, 3, 2, 4, 30)) == 1
+    assert sent == [101]
+
+async def test_missed_reminders_are_not_sent_after_downtime(db_factory):
+    async with db_factory() as s:
+        s.add(User(id=1, tg_id=1, tz="UTC"))
+        s.add(Reminder(user_id=1, weekdays=0b1111111, minute_of_day=8 * 60, next_fire_at=datetime(2026, 3, 1, 8)))
+        await s.commit()
+
+    sched = ReminderScheduler(db_factory, misfire_grace=900)
+    sent = []
+
+    async def send(chat_id: int, text: str) -> None:
+        sent.append(chat_id)
+    sched._send = send
+
+    assert await sched.tick(datetime(2026, 3, 3, 12)) == 0
+    assert sched.missed == 1
+    async with db_factory() as s:
+        assert (await s.get(Reminder, 1)).next_fire_at == datetime(2026, 3, 4, 8)
@@ -0,0 +1,90 @@
+from datetime import date, datetime
+
+from sqlalchemy import event
+from sqlmodel import select
+
+from app.db.models import Exercise, Plan, SetLog, User, WeeklyMuscleVolume, WorkoutDay, WorkoutItem
+from app.services.rollups import WeeklyRollups, local_week_start
+from app.services.set_log_writer import SetLogWriter
+
+def test_week_is_taken_in_user_tz():
+    # вс 23:30 UTC — в Москве уже понедельник следующей недели
+    ts = datetime(2026, 3, 8, 23, 30)
+    assert local_week_start(ts, "UTC") == date(2026, 3, 2)
+    assert local_week_start(ts, "Europe/Moscow") == date(2026, 3, 9)
+    assert local_week_start(ts, "Not/AZone") == date(2026, 3, 2)
+
+async def test_rollup_follows_inserts_corrections_and_rebuild(db_factory):
+    async with db_factory() as s:
+        s.add_all([User(id=1, tg_id=1, tz="Europe/Moscow"), Exercise(id=1, name="Жим", muscle="chest"),
+                   Plan(id=1, user_id=1)])
+        s.add(WorkoutDay(id=1, plan_id=1, day_idx=0))
+        s.add(WorkoutItem(id=1, day_id=1, exercise_id=1))
+        await s.commit()
+
+    rollups = WeeklyRollups(session_factory=db_factory)
+    writer = SetLogWriter(session_factory=db_factory, max_delay=0)
+    writer.add_row_hook(rollups.stamp_weeks)
+    writer.add_tx_hook(rollups.on_sets)
+    ts = datetime(2026, 3, 3, 10)
+    ids = await writer.submit([
+        SetLog(user_id=1, session_id=1, workout_item_id=1, weight_kg=100, reps=5, ts=ts),
+        SetLog(user_id=1, session_id=1, workout_item_id=1, weight_kg=100, reps=5, ts=ts),
+        SetLog(user_id=1, session_id=1, weight_kg=10, reps=10, ts=ts),
+    ])
+    week = date(2026, 3, 2)
+
+    async with db_factory() as s:
+        chest = await rollups.get_volume(s, 1, week, "chest")
+        assert (chest.sets, chest.reps, float(chest.tonnage_kg)) == (2, 10, 1000.0)
+        assert len(await rollups.get_week(s, 1, week)) == 2
+
+        set_log = await s.get(SetLog, ids[0])
+        await rollups.update_set_log(s, set_log, weight_kg=120)
+        await s.commit()
+
+    async with db_factory() as s:
+        chest = await rollups.get_volume(s, 1, week, "chest")
+        assert float(chest.tonnage_kg) == 1100.0
+
+        # «испортим» агрегат — rebuild восстанавливает его из set_logs
+        chest.sets = 0
+        s.add(chest)
+        await s.commit()
+
+    assert await rollups.rebuild() == 2
+    async with db_factory() as s:
+        rows = (await s.exec(select(WeeklyMuscleVolume).order_by(WeeklyMuscleVolume.muscle))).all()
+    assert [(r.muscle, r.sets, float(r.tonnage_kg)) for r in rows] == [("", 1, 100.0), ("chest", 2, 1100.0)]
+
+async def test_correction_after_tz_change_hits_original_week(db_factory):
+    async with db_factory() as s:
+        s.add(User(id=1, tg_id=1, tz="UTC"))
+        await s.commit()
+
+    rollups = WeeklyRollups(session_factory=db_factory)
+    writer = SetLogWriter(session_factory=db_factory, max_delay=0)
+    writer.add_row_hook(rollups.stamp_weeks)
+    writer.add_tx_hook(rollups.on_sets)
+    statements: list[str] = []
+    event.listen(
+        db_factory.kw["bind"].sync_engine, "before_cursor_execute",
+        lambda conn, cursor, sql, *args: statements.append(sql.split()[0]),
+    )
+    # вс 23:30 UTC: по UTC — неделя 2 марта, по Москве — уже 9 марта
+    [set_id] = await writer.submit([SetLog(user_id=1, session_id=1, weight_kg=100, reps=5,
+                                           ts=datetime(2026, 3, 8, 23, 30))])
+    # неделя ушла в самом INSERT: по set_logs отдельного UPDATE нет
+    assert "INSERT" in statements and "UPDATE" not in statements
+
+    async with db_factory() as s:
+        (await s.get(User, 1)).tz = "Europe/Moscow"
+        await s.commit()
+        set_log = await s.get(SetLog, set_id)
+        assert set_log.week_start == date(2026, 3, 2)
+        await rollups.update_set_log(s, set_log, reps=6)
+        await s.commit()
+
+        rows = (await s.exec(select(WeeklyMuscleVolume))).all()
+    assert [(r.week_start, r.sets, r.reps) for r in rows] == [(date(2026, 3, 2), 1, 6)]
+    assert await rollups.rebuild() == 1
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+from aiogram import Bot, Dispatcher, Router
+from aiogram.fsm.context import FSMContext
+from aiogram.types import Message, Update
+
+from app.telegram.middlewares.scheduler import SchedulerMiddleware, UserShardScheduler
+from app.telegram.storage import build_events_isolation, build_fsm_storage
+
+async def test_same_user_runs_in_order_other_users_in_parallel():
+    sched = UserShardScheduler(shards=4, queue_size=10)
+    log: list[tuple[int, int]] = []
+
+    def job(user: int, n: int, delay: float):
+        async def handler(event, data):
+            await asyncio.sleep(delay)
+            log.append((user, n))
+            return n
+        return sched.submit(user, handler, None, {})
+
+    # у пользователя 1 первый апдейт медленный — второй всё равно ждёт его;
+    # пользователь 2 (другой шард) не ждёт пользователя 1
+    results = await asyncio.gather(job(1, 1, 0.05), job(1, 2, 0.0), job(2, 1, 0.0))
+    assert results == [1, 2, 1]
+    assert [e for e in log if e[0] == 1] == [(1, 1), (1, 2)]
+    assert log[0] == (2, 1)
+    assert sched.stats()["processed"] == 3
+    await sched.close()
+
+async def test_handler_errors_propagate_to_caller():
+    sched = UserShardScheduler(shards=1)
+
+    async def boom(event, data):
+        raise ValueError("x")
+
+    with pytest.raises(ValueError):
+        await sched.submit(5, boom, None, {})
+    await sched.close()
+
+async def test_cancelled_handler_does_not_hang_the_shard():
+    sched = UserShardScheduler(shards=1, queue_size=1)
+
+    async def cancelled(event, data):
+        raise asyncio.CancelledError
+
+    async def ok(event, data):
+        return "ok"
+
+    with pytest.raises(asyncio.CancelledError):
+        await asyncio.wait_for(sched.submit(5, cancelled, None, {}), 1)
+    # воркер шарда жив — следующие апдейты не упираются в полную очередь
+    assert await asyncio.wait_for(sched.submit(5, ok, None, {}), 1) == "ok"
+    await sched.close()
+
+def _update(update_id: int, text: str) -> Update:
+    return Update.model_validate({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": 1_700_000_000, "text": text,
+            "chat": {"id": 7, "type": "private"},
+            "from": {"id": 7, "is_bot": False, "first_name": "T"},
+        },
+    })
+
+async def test_second_tap_sees_state_written_by_first():
+    storage = build_fsm_storage(redis_url="")
+    dp = Dispatcher(storage=storage, events_isolation=build_events_isolation(storage))
+    middleware = SchedulerMiddleware(UserShardScheduler(shards=4))
+    dp.update.outer_middleware(middleware)
+    seen: list[tuple[str | None, str | None]] = []
+    router = Router()
+
+    @router.message()
+    async def on_message(message: Message, state: FSMContext, raw_state: str | None) -> None:
+        seen.append((raw_state, message.text))
+        if message.text == "t1":
+            await asyncio.sleep(0.02)
+            await state.set_state("b")
+
+    dp.include_router(router)
+    bot = Bot("42:TEST")
+    await dp.fsm.get_context(bot, chat_id=7, user_id=7).set_state("a")
+    await asyncio.gather(dp.feed_update(bot, _update(1, "t1")), dp.feed_update(bot, _update(2, "t2")))
+
+    assert seen == [("a", "t1"), ("b", "t2")]
+    await middleware.scheduler.close()
+    await bot.session.close()
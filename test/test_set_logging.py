@@ -0,0 +1,79 @@
+import asyncio
+
+from sqlmodel import select
+
+from app.db.models import SetLog
+from app.db.routing import ReadRouter
+from app.services.set_entry import SetEntry, parse_set_entry
+from app.services.set_log_writer import SetLogWriter
+
+def test_parse_set_entry():
+    assert parse_set_entry("100x5x3 @8") == [SetEntry(100.0, 5, 8.0)] * 3
+    assert parse_set_entry("62,5х8; 70 * 6 @9.5") == [SetEntry(62.5, 8, None), SetEntry(70.0, 6, 9.5)]
+    assert parse_set_entry("привет") is None
+    assert parse_set_entry("100x5; привет") is None
+    assert parse_set_entry("100x5 @11") is None
+
+async def test_writer_batches_across_users_and_acks_after_commit(db_factory):
+    writer = SetLogWriter(session_factory=db_factory, max_batch=100, max_delay=0.01)
+
+    def rows(user_id: int) -> list[SetLog]:
+        return [SetLog(user_id=user_id, session_id=1, weight_kg=100, reps=5, set_index=i) for i in range(3)]
+
+    acks = await asyncio.gather(*(writer.submit(rows(u)) for u in (1, 2, 3)))
+    assert [len(a) for a in acks] == [3, 3, 3]
+    assert writer.flushes == 1 and writer.rows_written == 9
+
+    async with db_factory() as s:
+        stored = (await s.exec(select(SetLog).where(SetLog.id.in_(acks[1])))).all()
+    assert {r.user_id for r in stored} == {2}
+
+async def test_every_submitter_in_batch_reads_primary_after_ack(db_factory):
+    # флашит задача из call_later первого submit — отметка не должна зависеть от его контекста
+    router = ReadRouter(lambda: "primary", lambda: "replica", sticky_sec=60)
+    writer = SetLogWriter(session_factory=db_factory, max_batch=100, max_delay=0.01, router=router)
+    await asyncio.gather(*(
+        writer.submit([SetLog(user_id=u, session_id=1, reps=5)])
+        for u in (1, 2)
+    ))
+    assert writer.flushes == 1
+    assert router.session(1) == "primary" and router.session(2) == "primary"
+    assert router.session(3) == "replica"
+
+async def test_writer_flushes_on_close(db_factory):
+    writer = SetLogWriter(session_factory=db_factory, max_batch=100, max_delay=60)
+    task = asyncio.create_task(writer.submit([SetLog(user_id=1, session_id=1, reps=1)]))
+    await asyncio.sleep(0)
+    await writer.close()
+    assert len(await task) == 1
+
+async def test_failed_batch_fails_only_offending_submit(db_factory):
+    writer = SetLogWriter(session_factory=db_factory, max_batch=100, max_delay=0.01)
+
+    async def reject_user_2(conn, rows) -> None:
+        if any(r["user_id"] == 2 for r in rows):
+            raise RuntimeError("bad row")
+
+    writer.add_tx_hook(reject_user_2)
+    results = await asyncio.gather(
+        *(writer.submit([SetLog(user_id=u, session_id=1, reps=5)]) for u in (1, 2, 3)),
+        return_exceptions=True,
+    )
+    assert isinstance(results[1], RuntimeError)
+    assert len(results[0]) == 1 and len(results[2]) == 1
+    assert writer.rows_written == 2 and writer.retries == 1
+
+async def test_listeners_run_after_ack_in_background(db_factory):
+    writer = SetLogWriter(session_factory=db_factory, max_batch=100, max_delay=0.01)
+    release, seen = asyncio.Event(), []
+
+    async def slow_listener(rows) -> None:
+        await release.wait()
+        seen.extend(r["id"] for r in rows)
+
+    writer.add_listener(slow_listener)
+    ids = await asyncio.wait_for(writer.submit([SetLog(user_id=1, session_id=1, reps=5)]), 1)
+    assert seen == []
+    release.set()
+    await writer.close()
+    assert seen == ids
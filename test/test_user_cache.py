@@ -0,0 +1,64 @@
+from aiogram.types import User as TgUser
+from sqlmodel import select
+
+import app.telegram.middlewares.db as db_mw
+from app.core.cache import TTLLRUCache
+from app.db.models import User
+from app.services.user_cache import UserProfileCache
+
+def test_ttl_lru_evicts_least_recently_used():
+    c = TTLLRUCache(maxsize=2)
+    c.set(1, "a")
+    c.set(2, "b")
+    assert c.get(1) == "a"          # 1 стал «свежим»
+    c.set(3, "c")                   # вытесняется 2
+    assert c.get(2) is None
+    assert c.get(1) == "a" and c.get(3) == "c"
+    assert (c.hits, c.misses) == (3, 1)
+
+def test_ttl_lru_expires(monkeypatch):
+    import app.core.cache as cache_mod
+    now = [100.0]
+    monkeypatch.setattr(cache_mod.time, "monotonic", lambda: now[0])
+    c = TTLLRUCache(maxsize=10, ttl=5)
+    c.set("k", 1)
+    now[0] += 6
+    assert c.get("k") is None
+
+async def test_user_cache_write_through_and_stats():
+    cache = UserProfileCache(redis_url=None)
+    assert await cache.get(7) is None
+
+    await cache.put(User(id=1, tg_id=7, tz="Europe/Moscow", goal="Сила"))
+    snap = await cache.get(7)
+    assert snap["tz"] == "Europe/Moscow"
+    assert cache.to_user(snap).goal == "Сила"
+
+    await cache.invalidate(7)
+    assert await cache.get(7) is None
+    assert cache.stats()["local_hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+async def test_middleware_writes_through_autoflushed_profile(db_factory, monkeypatch):
+    async with db_factory() as s:
+        s.add(User(id=1, tg_id=7, tz="UTC"))
+        await s.commit()
+    cache = UserProfileCache(redis_url=None)
+    rearmed: list[int] = []
+
+    async def rearm_user(session, user) -> None:
+        rearmed.append(user.id)
+
+    monkeypatch.setattr(db_mw, "get_async_session", db_factory)
+    monkeypatch.setattr(db_mw, "user_cache", cache)
+    monkeypatch.setattr(db_mw.reminder_scheduler, "rearm_user", rearm_user)
+
+    async def handler(event, data) -> None:
+        data["user"].tz = "Europe/Moscow"
+        # запрос после правки — autoflush сбрасывает new/dirty до конца хендлера
+        await data["session"].exec(select(User.id))
+
+    tg_user = TgUser(id=7, is_bot=False, first_name="T")
+    await db_mw.DbSessionMiddleware()(handler, None, {"event_from_user": tg_user})
+    assert (await cache.get(7))["tz"] == "Europe/Moscow"
+    assert rearmed == [1]
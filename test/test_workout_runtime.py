@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from app.db.models import Exercise, Plan, User, WorkoutDay, WorkoutItem, WorkoutSession
+from app.services.set_entry import SetEntry
+from app.services.workout_runtime import TimerWheel, WorkoutRuntime
+
+MONDAY = datetime(2026, 3, 2, 9, 0)
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def test_timer_wheel():
+    wheel: TimerWheel[int] = TimerWheel(tick=1.0, slots=8, start=0)
+    wheel.schedule(1, 2.5)
+    wheel.schedule(2, 20.0)  # дальше оборота колеса
+    wheel.schedule(3, 3.0)
+    wheel.schedule(3, 4.0)   # перевзвод
+    assert wheel.advance(2.9) == [] and wheel.advance(3) == [1] and len(wheel) == 2  # точность — тик
+    assert wheel.cancel(3) and not wheel.cancel(3)
+    assert wheel.advance(12) == [] and wheel.advance(100) == [2] and not wheel
+
+    # 10k одновременных таймеров: одна ячейка на секунду, одно снятие на тик
+    for user_id in range(10_000):
+        wheel.schedule(user_id, 100 + 60 + user_id % 180)
+    fired = [len(wheel.advance(t)) for t in range(101, 400)]
+    assert sum(fired) == 10_000 and max(fired) <= 56
+
+async def seed(db_factory) -> None:
+    async with db_factory() as s:
+        s.add_all([User(id=1, tg_id=101), Exercise(id=1, name="Жим"), Exercise(id=2, name="Тяга"),
+                   Plan(id=1, user_id=1)])
+        s.add(WorkoutDay(id=1, plan_id=1, day_idx=0))
+        s.add_all([
+            WorkoutItem(id=1, day_id=1, exercise_id=1, order_idx=0, sets=2, rest_sec=90),
+            WorkoutItem(id=2, day_id=1, exercise_id=2, order_idx=1, sets=2, rest_sec=60),
+        ])
+        await s.commit()
+
+async def test_session_follows_plan_fires_rest_and_finishes_in_one_update(db_factory):
+    await seed(db_factory)
+    clock = Clock()
+    runtime = WorkoutRuntime(db_factory, clock=clock, wall_clock=lambda: MONDAY)
+    sent: list[tuple[int, str]] = []
+
+    async def send(chat_id: int, text: str) -> None:
+        sent.append((chat_id, text))
+    runtime._send = send
+
+    async with db_factory() as s:
+        user = await s.get(User, 1)
+        live = await runtime.open(s, user)
+        assert live.day_id == 1 and live.item.exercise_name == "Жим"
+
+        rows = runtime.rows(live, [SetEntry(100, 5, None)] * 2)
+        assert [(r.workout_item_id, r.set_index, r.rest_sec) for r in rows] == [(1, 0, None), (1, 1, 90)]
+        s.add_all(rows)
+        await s.commit()
+        assert runtime.record(live, rows) == 90
+        assert live.item.exercise_name == "Тяга" and live.tonnage_kg == 1000
+
+        assert await runtime.tick(clock.now + 89) == 0
+        assert await runtime.tick(clock.now + 90) == 1
+        assert sent == [(101, "⏱ Отдых закончился. Дальше — Тяга, подход 1 из 2.")]
+
+        rows = runtime.rows(live, [SetEntry(60, 10, None)] * 2)
+        s.add_all(rows)
+        await s.commit()
+        assert runtime.record(live, rows) is None and live.item is None  # план пройден — без таймера
+        assert not runtime.wheel
+
+        statements = []
+        engine = (await s.connection()).engine.sync_engine
+        listener = lambda *a: statements.append(a[2])  # noqa: E731
+        event.listen(engine, "before_cursor_execute", listener)
+        summary = await runtime.finish(s, user)
+        event.remove(engine, "before_cursor_execute", listener)
+        await s.commit()
+
+    assert len(statements) == 1
+    assert (summary.sets, summary.tonnage_kg) == (4, 2200)
+    async with db_factory() as s:
+        ws = await s.get(WorkoutSession, summary.session_id)
+        assert ws.finished_at == MONDAY and ws.sets_count == 4 and float(ws.tonnage_kg) == 2200
+        assert await runtime.finish(s, user) is None
+    assert runtime.stats()["live"] == 0 and runtime.stats()["finished"] == 1
+
+async def test_recover_after_restart(db_factory):
+    await seed(db_factory)
+    clock = Clock()
+    runtime = WorkoutRuntime(db_factory, clock=clock, wall_clock=lambda: MONDAY)
+    async with db_factory() as s:
+        live = await runtime.open(s, await s.get(User, 1))
+        rows = runtime.rows(live, [SetEntry(100, 5, None)])
+        for r in rows:
+            r.ts = MONDAY - timedelta(seconds=30)
+        s.add_all(rows)
+        await s.commit()
+
+    # рестарт: состояние и таймер отдыха поднимаются из БД одним запросом
+    restarted = WorkoutRuntime(db_factory, clock=clock, wall_clock=lambda: MONDAY)
+    assert await restarted.recover() == 1
+    live = restarted.get(1)
+    assert (live.session_id, live.sets_done, live.tonnage_kg, live.items) == (1, 1, 500, None)
+    assert restarted.wheel.deadline(1) == clock.now + 60  # 90 с отдыха, 30 уже прошло
+
+    async with db_factory() as s:
+        assert await restarted.open(s, await s.get(User, 1)) is live
+    assert live.item.exercise_name == "Жим" and live.set_index == 1
+    assert restarted.sweep(clock.now + 7 * 3600) == 1 and restarted.get(1) is None
+
+async def test_open_leaves_handler_session_uncommitted(db_factory):
+    await seed(db_factory)
+    runtime = WorkoutRuntime(db_factory, clock=Clock(), wall_clock=lambda: MONDAY)
+
+    async def no_commit() -> None:
+        raise AssertionError("commit — только на DbSessionMiddleware")
+
+    async with db_factory() as s:
+        s.commit = no_commit
+        live = await runtime.open(s, await s.get(User, 1))
+    async with db_factory() as s:
+        assert (await s.get(WorkoutSession, live.session_id)).day_id == 1